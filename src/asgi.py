@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import os
+from urllib.parse import parse_qsl
+
+import ratelimit
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+ASGI_PORT = int(os.getenv('ASGI_PORT', '0'))                 # 0 = خاموش
+ASGI_HOST = os.getenv('ASGI_HOST', '0.0.0.0')
+PUSH_INTERVAL = float(os.getenv('PUSH_INTERVAL', '0.5'))    # ثانیه؛ تغییرات در این بازه یک رویداد می‌شوند
+PUSH_QUEUE_SIZE = int(os.getenv('PUSH_QUEUE_SIZE', '64'))   # رویداد در صف هر کلاینت
+PUSH_MAX_CLIENTS = int(os.getenv('PUSH_MAX_CLIENTS', '1000'))
+PUSH_KEEPALIVE = 15.0
+
+# اپ ASGI روی همان حلقه ingest اجرا می‌شود؛ handlerها همزمان و بدون thread دیگر وضعیت را می‌خوانند.
+# Flask (و gunicorn) برای بقیه مسیرها سر جایش می‌ماند.
+
+
+class PushHub:
+    """فید SSE: نمادهای تغییرکرده هر PUSH_INTERVAL یک بار، یک رویداد کدشده مشترک برای همه کلاینت‌ها
+
+    کلاینت کند رویدادهایش دور ریخته می‌شود و روی مسیر تیک اثری ندارد."""
+
+    def __init__(self, source, interval=PUSH_INTERVAL, queue_size=PUSH_QUEUE_SIZE):
+        self.source = source            # () -> {symbol: {...}} مثل /api/market
+        self.interval = interval
+        self.queue_size = queue_size
+        self.clients = set()
+        self.dirty = set()
+        self.events = 0
+        self.dropped = 0
+
+    def mark(self, symbol):
+        if self.clients:
+            self.dirty.add(symbol)
+
+    def connect(self):
+        queue = asyncio.Queue(self.queue_size)
+        queue.put_nowait(self._encode(self.source()))
+        self.clients.add(queue)
+        return queue
+
+    def disconnect(self, queue):
+        self.clients.discard(queue)
+
+    @staticmethod
+    def _encode(data):
+        return b'data: ' + json.dumps(data, default=str, separators=(',', ':')).encode() + b'\n\n'
+
+    def flush(self):
+        if not self.dirty or not self.clients:
+            return
+        state = self.source()
+        changed = {sym: state[sym] for sym in self.dirty if sym in state}
+        self.dirty.clear()
+        if not changed:
+            return
+        frame = self._encode(changed)
+        self.events += 1
+        for queue in self.clients:
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def stats(self):
+        return {'clients': len(self.clients), 'events': self.events, 'dropped': self.dropped}
+
+
+class AsgiApp:
+    """اپ ASGI حداقلی: routes = {path: handler(query)}؛ خروجی str -> HTML، dict/list -> JSON،
+    (body, status) برای کد وضعیت دیگر. مسیر stream_path فید SSE از PushHub است.
+
+    limiter (ratelimit.RateLimiter) با همان قواعد مسیرهای Flask برای هر IP اعمال می‌شود و پاسخ
+    مسیرهای cached در cache (ratelimit.TTLCache) با همان کلید مسیر+query مسیرهای Flask مشترک است."""
+
+    def __init__(self, routes, hub=None, stream_path='/stream', limiter=None, cache=None, cached=()):
+        self.routes = routes
+        self.hub = hub
+        self.stream_path = stream_path
+        self.limiter = limiter
+        self.cache = cache
+        self.cached = frozenset(cached)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        path = scope['path']
+        if scope['method'] not in ('GET', 'HEAD'):
+            return await self._respond(send, 405, {'error': 'method not allowed'})
+        is_stream = path == self.stream_path and self.hub is not None
+        handler = self.routes.get(path)
+        if self.limiter is not None:
+            retry_after = self.limiter.check(self._client_ip(scope),
+                                             path if is_stream or handler is not None else '<unmatched>')
+            if retry_after:
+                return await self._respond(
+                    send, 429, {'success': False, 'error': 'rate limited', 'retry_after_sec': round(retry_after, 1)},
+                    [(b'retry-after', str(max(int(retry_after + 0.999), 1)).encode())])
+        if is_stream:
+            return await self._stream(receive, send)
+        if handler is None:
+            return await self._respond(send, 404, {'error': 'not found'})
+        query_string = scope.get('query_string', b'').decode()
+        query = dict(parse_qsl(query_string))
+        try:
+            if self.cache is not None and path in self.cached:
+                # کلید مثل request.full_path در Flask
+                body, status, content_type = self.cache.get_or_compute(
+                    f'{path}?{query_string}', lambda: self._render(handler(query)), wait=False)
+            else:
+                body, status, content_type = self._render(handler(query))
+        except Exception as e:
+            logger.error(f'❌ ASGI {path} error: {e}')
+            return await self._respond(send, 500, {'error': str(e)})
+        await self._send(send, status, body, content_type)
+
+    @staticmethod
+    def _client_ip(scope):
+        client = scope.get('client')
+        forwarded = next((v.decode('latin-1') for k, v in scope.get('headers', ()) if k == b'x-forwarded-for'), None)
+        return ratelimit.client_ip(client[0] if client else None, forwarded)
+
+    @staticmethod
+    def _render(result, status=200):
+        """خروجی handler -> (body, status, content_type) به همان شکل مقادیر status_cache در Flask"""
+        if isinstance(result, tuple):
+            result, status = result
+        if isinstance(result, str):
+            return result.encode(), status, 'text/html; charset=utf-8'
+        return json.dumps(result, default=str).encode(), status, 'application/json'
+
+    async def _respond(self, send, status, result, headers=()):
+        body, _, content_type = self._render(result)
+        await self._send(send, status, body, content_type, headers)
+
+    @staticmethod
+    async def _send(send, status, body, content_type, headers=()):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', content_type.encode()),
+                                (b'content-length', str(len(body)).encode()), *headers]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _stream(self, receive, send):
+        if len(self.hub.clients) >= PUSH_MAX_CLIENTS:
+            return await self._respond(send, 503, {'error': 'too many stream clients'})
+        queue = self.hub.connect()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')]})
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, disconnected}, timeout=PUSH_KEEPALIVE,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    getter.cancel()
+                    return
+                if getter in done:
+                    frame = getter.result()
+                else:
+                    getter.cancel()
+                    frame = b': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+        except OSError:
+            return
+        finally:
+            disconnected.cancel()
+            self.hub.disconnect(queue)
+
+
+async def serve(app, port=ASGI_PORT, host=ASGI_HOST):
+    """اجرای app با uvicorn روی حلقه فعلی (بدون حلقه یا thread جدا)"""
+    try:
+        import uvicorn
+    except ImportError:
+        logger.warning('⚠️ ASGI_PORT is set but uvicorn is not installed; async HTTP disabled')
+        return
+    config = uvicorn.Config(app, host=host, port=port, loop='none', lifespan='off',
+                            log_level='warning', access_log=False)
+    server = uvicorn.Server(config)
+    logger.info(f'⚡ ASGI server on {host}:{port} (ingest loop)')
+    await server.serve()
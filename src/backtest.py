@@ -0,0 +1,174 @@
+"""بک‌تست تنظیمات هشدار و گزارش روی داده تاریخی
+
+    python backtest.py [--data ../market_data.csv] [--threshold 3,5,7] [--cooldown 300,900]
+                       [--min-change-percent 0.1,0.5] [--min-change-volume 0.01,0.05]
+                       [--workers 4] [--out backtest_results.json]
+
+تیک‌ها (از market_data.csv یا ضبط JSONL فریم‌های WebSocket) به ترتیب زمان از همان توابع
+تصمیم‌گیری production در main.py (update_market_state، maybe_alert و report_consumer) عبور می‌کنند؛ clock.SimClock
+با زمان هر تیک جلو می‌رود، پس کول‌داون‌ها و بازه‌های گزارش دقیقاً مثل اجرای زنده رفتار می‌کنند
+و ارسال تلگرام فقط شمرده می‌شود. هر ترکیب از شبکه پارامترها در یک پروسه جدا اجرا می‌شود.
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(HERE, '..', 'market_data.csv')
+
+PARAMS = ('ALERT_THRESHOLD', 'ALERT_COOLDOWN', 'MIN_CHANGE_PERCENT', 'MIN_CHANGE_VOLUME')
+
+_ticks = None       # تیک‌های بارگذاری‌شده در هر پروسه worker
+
+
+# ======== خواندن داده ========
+def load_ticks(path, symbols=None):
+    """لیست Tick مرتب‌شده بر اساس زمان از CSV یا JSONL (فریم‌های combined stream)"""
+    from ticks import Tick
+    wanted = set(symbols) if symbols else None
+    ticks = []
+    if path.endswith('.jsonl'):
+        from exchanges import make_adapter
+        adapter = make_adapter('binance', '')
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                msg = json.loads(line)
+                data = msg.get('data') or msg
+                tick = adapter.normalize(data, data.get('E', 0) / 1000.0) if isinstance(data, dict) else None
+                if tick is not None and (wanted is None or tick.symbol in wanted):
+                    ticks.append(tick)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                if wanted is not None and row['symbol'] not in wanted:
+                    continue
+                ts = datetime.fromisoformat(row['timestamp']).timestamp()
+                ticks.append(Tick(row['symbol'], float(row['price']), float(row['volume']),
+                                  float(row['price_change_percent']), ts))
+    ticks.sort(key=lambda t: t.ts)
+    return ticks
+
+
+# ======== اجرای یک ترکیب ========
+def _init_worker(path, symbols):
+    global _ticks
+    sys.path.insert(0, HERE)
+    logging.getLogger('whale_ws').setLevel(logging.WARNING)
+    _ticks = load_ticks(path, symbols)
+
+
+def run_one(params):
+    """params: dict با کلیدهای PARAMS -> تعداد هشدارها و گزارش‌هایی که ارسال می‌شدند"""
+    import clock
+    import main
+
+    sim = clock.SimClock()
+    previous = clock.use(sim)
+
+    for key in PARAMS:
+        setattr(main, key, params[key])
+    symbols = sorted({t.symbol for t in _ticks})
+    main.SYMBOLS[:] = symbols
+    main.last_alert_time.clear()
+    main.current_data.clear()
+    main.last_report_data = {}
+    main.report_dirty.clear()
+    main.last_report_time = 0
+    main.last_hourly_report_time = 0
+
+    sent = {'alerts': 0, 'messages': 0}
+
+    def count_message(message):
+        sent['messages'] += 1
+        if message.startswith('🚨'):
+            sent['alerts'] += 1
+        return True
+    main.send_to_telegram = count_message
+
+    reports = hourly = 0
+    alerts_by_symbol = dict.fromkeys(symbols, 0)
+    t0 = time.perf_counter()
+    for tick in _ticks:
+        sim.set(tick.ts)
+        main.update_market_state(tick)
+        before = sent['alerts']
+        main.maybe_alert(tick.symbol, tick.price, tick.price_change_percent, tick.ts)
+        if sent['alerts'] != before:
+            alerts_by_symbol[tick.symbol] += 1
+        last_report, last_hourly = main.last_report_time, main.last_hourly_report_time
+        main.report_consumer(tick)
+        reports += main.last_report_time != last_report
+        hourly += main.last_hourly_report_time != last_hourly
+    clock.use(previous)
+    return {
+        **{key.lower(): params[key] for key in PARAMS},
+        'alerts': sent['alerts'],
+        'alerts_by_symbol': alerts_by_symbol,
+        'reports_15m': reports,
+        'reports_hourly': hourly,
+        'ticks': len(_ticks),
+        'elapsed_sec': round(time.perf_counter() - t0, 3),
+    }
+
+
+def run_grid(path, grid, workers=None, symbols=None):
+    combos = [dict(zip(PARAMS, values)) for values in itertools.product(*(grid[k] for k in PARAMS))]
+    if workers == 1:
+        _init_worker(path, symbols)
+        return [run_one(c) for c in combos]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, symbols)) as pool:
+        return list(pool.map(run_one, combos))
+
+
+def _floats(text):
+    return [float(v) for v in text.split(',') if v]
+
+
+def _ints(text):
+    return [int(v) for v in text.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest alert/report settings on recorded ticks')
+    parser.add_argument('--data', default=DEFAULT_DATA, help='market_data.csv or a .jsonl WS recording')
+    parser.add_argument('--symbols', default='', help='comma-separated filter')
+    parser.add_argument('--threshold', type=_floats, default=[3.0, 5.0, 7.0])
+    parser.add_argument('--cooldown', type=_ints, default=[300, 900, 1800])
+    parser.add_argument('--min-change-percent', type=_floats, default=[0.1, 0.5])
+    parser.add_argument('--min-change-volume', type=_floats, default=[0.01, 0.05])
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (1 = in-process)')
+    parser.add_argument('--out', default='', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    grid = {
+        'ALERT_THRESHOLD': args.threshold,
+        'ALERT_COOLDOWN': args.cooldown,
+        'MIN_CHANGE_PERCENT': args.min_change_percent,
+        'MIN_CHANGE_VOLUME': args.min_change_volume,
+    }
+    symbols = [s for s in args.symbols.upper().split(',') if s] or None
+    t0 = time.perf_counter()
+    results = run_grid(args.data, grid, args.workers, symbols)
+    summary = {
+        'data': args.data,
+        'combinations': len(results),
+        'wall_sec': round(time.perf_counter() - t0, 2),
+        'results': sorted(results, key=lambda r: (r['alerts'], r['reports_15m'])),
+    }
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import csv
+import logging
+import os
+from array import array
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+INTERVAL_SECONDS = {'1s': 1, '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+                    '1h': 3600, '4h': 14400, '1d': 86400}
+# بازه‌هایی که از aggTrade ساخته می‌شوند
+BAR_INTERVALS = tuple(i for i in os.getenv('BAR_INTERVALS', '1s,1m,5m').split(',') if i)
+# ظرفیت حلقه برای هر (نماد، بازه)؛ حافظه ثابت می‌ماند
+BAR_CAPACITY = {'1s': 3600, '1m': 1440, '5m': 576}
+DEFAULT_BAR_CAPACITY = int(os.getenv('BAR_CAPACITY', '500'))
+# بازه‌هایی که کندل بسته‌شده‌شان روی دیسک نوشته می‌شود (1s عمداً نه)
+BAR_STORE_INTERVALS = tuple(i for i in os.getenv('BAR_STORE_INTERVALS', '1m,5m').split(',') if i)
+BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', '.')
+# مهلت (ثانیه) بعد از پایان بازه پیش از بستن کندل بی‌معامله در flush_idle؛ معاملات دیررس در این مهلت حساب می‌شوند
+BAR_GRACE = float(os.getenv('BAR_GRACE', '2'))
+
+COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'trades')
+
+
+class BarRing:
+    """حلقه از پیش تخصیص‌یافته ستونی برای کندل‌های بسته‌شده"""
+
+    __slots__ = ('capacity', 'cols', 'head', 'count')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.cols = [array('d', bytes(8 * capacity)) for _ in COLUMNS]
+        self.head = 0      # محل نوشتن بعدی
+        self.count = 0
+
+    def append(self, bar):
+        i = self.head
+        for col, value in zip(self.cols, bar):
+            col[i] = value
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def last(self, n=None):
+        """n کندل آخر به ترتیب زمانی (قدیمی -> جدید)"""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.head - n) % self.capacity
+        return [tuple(col[(start + k) % self.capacity] for col in self.cols) for k in range(n)]
+
+    def column(self, name, n=None):
+        n = self.count if n is None else min(n, self.count)
+        col = self.cols[COLUMNS.index(name)]
+        start = (self.head - n) % self.capacity
+        return [col[(start + k) % self.capacity] for k in range(n)]
+
+
+class BarBuilder:
+    """ساخت کندل OHLCV از معاملات (aggTrade) و نگهداری کندل‌های kline بسته‌شده"""
+
+    def __init__(self, intervals=BAR_INTERVALS, grace=BAR_GRACE):
+        self.grace = grace
+        self.intervals = [(name, INTERVAL_SECONDS[name]) for name in intervals]
+        self.rings = {}      # (symbol, interval) -> BarRing
+        self.current = {}    # (symbol, interval) -> [open_time, o, h, l, c, v, n]
+        self.closed = {}     # (symbol, interval) -> open_time آخرین کندل بسته‌شده
+        self.late = 0        # معاملات دورریخته برای کندل‌های قبلاً بسته‌شده
+        self.listeners = []  # callback(symbol, interval, bar) هنگام بسته شدن کندل
+
+    def ring(self, symbol, interval):
+        key = (symbol, interval)
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = BarRing(BAR_CAPACITY.get(interval, DEFAULT_BAR_CAPACITY))
+        return ring
+
+    def _close(self, symbol, interval, bar):
+        self.closed[(symbol, interval)] = bar[0]
+        self.ring(symbol, interval).append(bar)
+        for listener in self.listeners:
+            listener(symbol, interval, tuple(bar))
+
+    def on_trade(self, symbol, price, qty, ts):
+        for interval, seconds in self.intervals:
+            key = (symbol, interval)
+            bar = self.current.get(key)
+            start = ts - ts % seconds
+            if bar is not None and start > bar[0]:
+                self._close(symbol, interval, bar)
+                bar = None
+            if bar is None:
+                if start <= self.closed.get(key, -1.0):
+                    # معامله دیررس بعد از flush_idle: کندل تکراری با همان open_time ساخته نشود
+                    self.late += 1
+                    continue
+                self.current[key] = [start, price, price, price, price, qty, 1]
+                continue
+            if price > bar[2]:
+                bar[2] = price
+            elif price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += qty
+            bar[6] += 1
+
+    def on_kline(self, symbol, k):
+        """رویداد kline بایننس؛ فقط کندل بسته‌شده (x=True) و فقط بازه‌هایی که از معاملات ساخته نمی‌شوند"""
+        interval = k.get('i')
+        if not k.get('x') or any(interval == name for name, _ in self.intervals):
+            return
+        bar = (k['t'] / 1000.0, float(k['o']), float(k['h']), float(k['l']), float(k['c']),
+               float(k['v']), float(k.get('n', 0)))
+        self._close(symbol, interval, bar)
+
+    def flush_idle(self, now_ts):
+        """بستن کندل‌هایی که زمانشان (به‌علاوه grace) تمام شده ولی معامله جدیدی نیامده (با ساعت
+        محلی؛ معاملات دیررس‌تر از grace بعداً در on_trade دور ریخته می‌شوند)"""
+        for (symbol, interval), bar in list(self.current.items()):
+            if now_ts - bar[0] >= INTERVAL_SECONDS[interval] + self.grace:
+                self._close(symbol, interval, bar)
+                del self.current[(symbol, interval)]
+
+    def drop_symbol(self, symbol):
+        for key in [k for k in self.rings if k[0] == symbol]:
+            del self.rings[key]
+        for key in [k for k in self.current if k[0] == symbol]:
+            del self.current[key]
+        for key in [k for k in self.closed if k[0] == symbol]:
+            del self.closed[key]
+
+
+class BarStore:
+    """نوشتن کندل‌های بسته‌شده به فایل‌های bars_<interval>.csv (به صورت دسته‌ای، خارج از مسیر تیک)"""
+
+    def __init__(self, directory=BAR_STORE_DIR, intervals=BAR_STORE_INTERVALS):
+        self.directory = directory
+        self.intervals = set(intervals)
+        self.pending = []
+
+    def on_close(self, symbol, interval, bar):
+        if interval in self.intervals:
+            self.pending.append((interval, symbol, bar))
+
+    def flush(self):
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        by_interval = {}
+        for interval, symbol, bar in batch:
+            by_interval.setdefault(interval, []).append((symbol, bar))
+        for interval, rows in by_interval.items():
+            path = os.path.join(self.directory, f'bars_{interval}.csv')
+            new_file = not os.path.exists(path)
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                w = csv.writer(f)
+                if new_file:
+                    w.writerow(['open_time', 'symbol', 'open', 'high', 'low', 'close', 'volume', 'trades'])
+                for symbol, bar in rows:
+                    w.writerow([int(bar[0]), symbol, *bar[1:6], int(bar[6])])
+        return len(batch)
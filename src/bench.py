@@ -0,0 +1,275 @@
+"""بنچمارک‌های محلی WhalePulse-Pro
+
+    python bench.py startup [--module main] [--runs 5] [--top 15]
+    python bench.py fanout [--subscribers 10] [--ticks 200000]
+    python bench.py soak [--frames 2000000] [--recording ../config/fixtures/ws_depth_BTCUSDT.jsonl] [--tolerance-mb 8]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ======== startup ========
+def parse_importtime(stderr):
+    """خروجی `-X importtime` -> لیست (module, self_us, cumulative_us)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, rest = line.split(':', 1)
+            self_us, cum_us, name = [p.strip() for p in rest.split('|')]
+            rows.append((name, int(self_us), int(cum_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def run_startup(module, runs, top, code=None):
+    code = code or f'import {module}'
+    env = dict(os.environ, WHALEPULSE_ROLE=os.environ.get('WHALEPULSE_ROLE', 'web'), PYTHONPATH=HERE)
+    walls = []
+    rows = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              cwd=HERE, env=env, capture_output=True, text=True)
+        walls.append((time.perf_counter() - t0) * 1000)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            raise SystemExit(f'startup command failed: {code}')
+        rows = parse_importtime(proc.stderr)
+
+    target = next((r for r in rows if r[0] == module), None)
+    heaviest = sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+    result = {
+        'code': code,
+        'runs': runs,
+        'wall_ms_median': round(statistics.median(walls), 2),
+        'wall_ms_min': round(min(walls), 2),
+        'module_cumulative_ms': round(target[2] / 1000, 2) if target else None,
+        'modules_imported': len(rows),
+        'heaviest_self_ms': [(name, round(self_us / 1000, 2)) for name, self_us, _ in heaviest],
+    }
+    return result
+
+
+# ======== fanout ========
+def _ticks(n, symbols):
+    from ticks import Tick
+    for i in range(n):
+        yield Tick(symbols[i % len(symbols)], 100.0 + i % 7, 1000.0 + i, 0.5, float(i))
+
+
+def run_fanout(subscribers, n_ticks, symbols):
+    """پخش n تیک به subscribers مشترک داخلی و subscribers کلاینت Unix socket"""
+    import asyncio
+    import tempfile
+    import threading
+    sys.path.insert(0, HERE)
+    from bus import BusServer, TickBus, subscribe_remote
+
+    result = {'subscribers': subscribers, 'ticks': n_ticks, 'symbols': len(symbols)}
+
+    # --- داخل پروسه ---
+    bus = TickBus()
+    counts = [0] * subscribers
+    done = threading.Event()
+
+    def make_cb(i):
+        def cb(tick):
+            counts[i] += 1
+            if sum(counts) >= subscribers * n_ticks:
+                done.set()
+        return cb
+    subs = [bus.subscribe(make_cb(i), maxlen=n_ticks, name=f's{i}') for i in range(subscribers)]
+    t0 = time.perf_counter()
+    for tick in _ticks(n_ticks, symbols):
+        bus.publish(tick)
+    publish_s = time.perf_counter() - t0
+    done.wait(60)
+    total_s = time.perf_counter() - t0
+    result['in_process'] = {
+        'publish_ticks_per_s': round(n_ticks / publish_s),
+        'delivered_ticks_per_s': round(sum(counts) / total_s),
+        'dropped': sum(s.dropped for s in subs),
+    }
+    for s in subs:
+        s.close()
+
+    # --- بین پروسه‌ای (Unix socket) ---
+    path = os.path.join(tempfile.mkdtemp(), 'bus.sock')
+    loop = asyncio.new_event_loop()
+    server = BusServer(path, maxlen=n_ticks)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(10)
+
+    received = [0] * subscribers
+
+    def consume(i):
+        for _ in subscribe_remote(path):
+            received[i] += 1
+            if received[i] >= n_ticks:
+                return
+    threads = [threading.Thread(target=consume, args=(i,), daemon=True) for i in range(subscribers)]
+    for t in threads:
+        t.start()
+    while len(server.clients) < subscribers:
+        time.sleep(0.01)
+
+    async def pump():
+        for tick in _ticks(n_ticks, symbols):
+            server.publish(tick)
+            if tick.ts % 1000 == 0:
+                await asyncio.sleep(0)  # به writerهای کلاینت فرصت اجرا بده
+    t0 = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(pump(), loop).result(120)
+    publish_s = time.perf_counter() - t0
+    for t in threads:
+        t.join(120)
+    total_s = time.perf_counter() - t0
+    result['unix_socket'] = {
+        'publish_ticks_per_s': round(n_ticks / publish_s),
+        'delivered_ticks_per_s': round(sum(received) / total_s),
+        'received_per_subscriber_min': min(received),
+        'dropped': sum(c['dropped'] for c in server.stats()),
+    }
+    loop.call_soon_threadsafe(server.close)
+    return result
+
+
+# ======== soak ========
+def _soak_frames(n, universe, recording=None):
+    """فریم‌های combined stream: بازپخش چرخشی یک ضبط JSONL یا تیکر/aggTrade مصنوعی روی universe"""
+    import random
+    if recording:
+        with open(recording, encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        for i in range(n):
+            yield lines[i % len(lines)]
+        return
+    rnd = random.Random(7)
+    prices = {sym: 100.0 for sym in universe}
+    for i in range(n):
+        sym = universe[i % len(universe)]
+        prices[sym] *= 1 + rnd.uniform(-0.002, 0.002)
+        p = prices[sym]
+        if (i // len(universe)) % 4:
+            data = {'e': 'aggTrade', 's': sym, 'p': f'{p:.4f}', 'q': f'{rnd.expovariate(1.0):.4f}',
+                    'T': i * 10, 'm': bool(i & 1)}
+            yield json.dumps({'stream': f'{sym.lower()}@aggTrade', 'data': data})
+        else:
+            data = {'e': '24hrTicker', 's': sym, 'c': f'{p:.4f}', 'v': f'{1000 + i % 997}',
+                    'P': f'{(p / 100 - 1) * 100:.3f}', 'E': i * 10}
+            yield json.dumps({'stream': f'{sym.lower()}@ticker', 'data': data})
+
+
+def run_soak(n_frames, symbols, universe, checkpoints, warmup, tolerance_mb, churn_every, recording=None):
+    """بازپخش n فریم از مسیر واقعی handle_message با ساعت مجازی؛ RSS باید بعد از گرم شدن ثابت بماند"""
+    import gc
+    import tempfile
+    os.environ.setdefault('BUS_SOCKET', '')
+    sys.path.insert(0, HERE)
+    import clock
+    import main as app
+    from memory import rss_bytes
+
+    logging_level = app.logger.level
+    app.logger.setLevel('ERROR')
+    tmp = tempfile.mkdtemp()
+    app.CSV_FILE = os.path.join(tmp, 'market_data.csv')
+    app.bar_store.directory = tmp
+    app.send_to_telegram = lambda message: True
+    app.SYMBOLS[:] = symbols
+    sim = clock.SimClock(1_700_000_000)
+    previous = clock.use(sim)
+
+    step = max(n_frames // checkpoints, 1)
+    series = []
+    active = list(symbols)
+    t0 = time.perf_counter()
+    for i, frame in enumerate(_soak_frames(n_frames, universe, recording)):
+        sim.advance(0.01)
+        app.handle_message(frame, i + 1)
+        if i % 500 == 0:
+            # همان کار bars_flush_loop (هر 5 ثانیه) که در این اجرا بدون حلقه ingest اجرا نمی‌شود
+            app.bar_builder.flush_idle(sim.time())
+            app.bar_store.flush()
+        if churn_every and i and i % churn_every == 0:
+            # چرخش مجموعه نمادها: پاک‌سازی وضعیت نمادهای حذف‌شده هم سنجیده می‌شود
+            k = (i // churn_every) % len(universe)
+            active = [universe[(k + j) % len(universe)] for j in range(len(symbols))]
+            app.apply_symbols(active)
+        if (i + 1) % step == 0:
+            gc.collect()
+            series.append({'frames': i + 1, 'rss_mb': round(rss_bytes() / 2**20, 2)})
+    elapsed = time.perf_counter() - t0
+    clock.use(previous)
+    app.logger.setLevel(logging_level)
+
+    base = series[min(int(len(series) * warmup), len(series) - 1)]['rss_mb']
+    growth = round(series[-1]['rss_mb'] - base, 2)
+    return {
+        'frames': n_frames,
+        'frames_per_s': round(n_frames / elapsed),
+        'simulated_hours': round(n_frames * 0.01 / 3600, 2),
+        'rss_after_warmup_mb': base,
+        'rss_final_mb': series[-1]['rss_mb'],
+        'growth_mb': growth,
+        'tolerance_mb': tolerance_mb,
+        'flat': growth <= tolerance_mb,
+        'buffers': app.memory_monitor.buffer_sizes(),
+        'rss_series': series,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WhalePulse-Pro benchmarks')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('startup', help='import-time cost of an entry point (-X importtime)')
+    p.add_argument('--module', default='main')
+    p.add_argument('--code', default=None, help='python snippet to time instead of a plain import')
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--top', type=int, default=15)
+
+    p = sub.add_parser('fanout', help='tick bus fan-out throughput')
+    p.add_argument('--subscribers', type=int, default=10)
+    p.add_argument('--ticks', type=int, default=200000)
+    p.add_argument('--symbols', default='BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT,ADAUSDT')
+
+    p = sub.add_parser('soak', help='replay frames through handle_message and assert flat RSS')
+    p.add_argument('--frames', type=int, default=2000000)
+    p.add_argument('--symbols', default='BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT,ADAUSDT')
+    p.add_argument('--universe', type=int, default=40, help='synthetic symbols rotated through by --churn-every')
+    p.add_argument('--churn-every', type=int, default=50000, help='frames between symbol-set changes (0 = off)')
+    p.add_argument('--recording', default=None, help='JSONL of WS frames to replay instead of synthetic ones')
+    p.add_argument('--checkpoints', type=int, default=20)
+    p.add_argument('--warmup', type=float, default=0.25, help='fraction of checkpoints before the baseline')
+    p.add_argument('--tolerance-mb', type=float, default=8.0)
+
+    args = parser.parse_args(argv)
+    if args.cmd == 'startup':
+        result = run_startup(args.module, args.runs, args.top, args.code)
+    elif args.cmd == 'fanout':
+        result = run_fanout(args.subscribers, args.ticks, args.symbols.split(','))
+    elif args.cmd == 'soak':
+        symbols = args.symbols.split(',')
+        universe = symbols + [f'SYM{i}USDT' for i in range(max(args.universe - len(symbols), 0))]
+        result = run_soak(args.frames, symbols, universe, args.checkpoints, args.warmup,
+                          args.tolerance_mb, args.churn_every, args.recording)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        if not result['flat']:
+            raise SystemExit(f"RSS grew {result['growth_mb']} MB after warmup (tolerance {args.tolerance_mb} MB)")
+        return
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
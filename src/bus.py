@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+
+from ticks import TICK_SIZE, decode_tick, encode_tick
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+# سوکت یونیکس برای مصرف‌کننده‌های بیرونی (خالی = غیرفعال)
+BUS_SOCKET = os.getenv('BUS_SOCKET', '/tmp/whalepulse_bus.sock' if hasattr(socket, 'AF_UNIX') else '')
+BUS_QUEUE_SIZE = int(os.getenv('BUS_QUEUE_SIZE', '10000'))  # حداکثر تیک در صف هر مشترک
+
+
+class Subscription:
+    """مشترک صف‌دار با thread خودش؛ اگر عقب بماند قدیمی‌ترین تیک‌ها دور ریخته می‌شوند"""
+
+    def __init__(self, callback, symbols=None, maxlen=BUS_QUEUE_SIZE, name=None):
+        self.callback = callback
+        self.symbols = frozenset(symbols) if symbols else None
+        self.queue = deque(maxlen=maxlen)
+        self.name = name or getattr(callback, '__name__', 'subscriber')
+        self.delivered = 0
+        self.dropped = 0
+        self._ready = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'bus-{self.name}', daemon=True)
+        self._thread.start()
+
+    def offer(self, tick):
+        if self.symbols is not None and tick.symbol not in self.symbols:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(tick)
+        self._ready.set()
+
+    def _run(self):
+        while not self._closed:
+            self._ready.wait()
+            self._ready.clear()
+            while self.queue:
+                tick = self.queue.popleft()
+                try:
+                    self.callback(tick)
+                    self.delivered += 1
+                except Exception as e:
+                    logger.error(f'❌ Bus subscriber {self.name} error: {e}')
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    def stats(self):
+        return {'name': self.name, 'delivered': self.delivered, 'dropped': self.dropped,
+                'queued': len(self.queue), 'symbols': sorted(self.symbols) if self.symbols else None}
+
+
+class TickBus:
+    """پخش تیک‌ها: handlerهای همزمان (مسیر اصلی) + مشترک‌های صف‌دار مستقل"""
+
+    def __init__(self):
+        self.handlers = []
+        self.subscriptions = []
+
+    def add_handler(self, handler):
+        """handler روی همان thread و به ترتیب ثبت اجرا می‌شود؛ خطای یکی بقیه را متوقف نمی‌کند"""
+        self.handlers.append(handler)
+        return handler
+
+    def subscribe(self, callback, symbols=None, maxlen=BUS_QUEUE_SIZE, name=None):
+        sub = Subscription(callback, symbols, maxlen, name)
+        self.subscriptions.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        if sub in self.subscriptions:
+            self.subscriptions.remove(sub)
+
+    def publish(self, tick):
+        for handler in self.handlers:
+            try:
+                handler(tick)
+            except Exception as e:
+                logger.error(f'❌ Tick handler {getattr(handler, "__name__", handler)} error: {e}')
+        for sub in self.subscriptions:
+            sub.offer(tick)
+
+    def stats(self):
+        return [s.stats() for s in self.subscriptions]
+
+
+# ======== بین پروسه‌ها (Unix domain socket) ========
+class _Client:
+    def __init__(self, writer, symbols, maxlen):
+        self.writer = writer
+        self.symbols = symbols
+        self.queue = deque(maxlen=maxlen)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.sent = 0
+
+
+class BusServer:
+    """ارسال فریم‌های 48 بایتی به مشترک‌های بیرونی.
+
+    پروتکل: کلاینت بعد از اتصال یک خط JSON می‌فرستد، مثلاً {"symbols": ["BTCUSDT"]}
+    (خط خالی یا {} یعنی همه نمادها)، سپس فقط فریم تیک دریافت می‌کند.
+    """
+
+    def __init__(self, path=BUS_SOCKET, maxlen=BUS_QUEUE_SIZE):
+        self.path = path
+        self.maxlen = maxlen
+        self.clients = set()
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logger.info(f'📣 Tick bus listening on {self.path}')
+        return self
+
+    async def _handle(self, reader, writer):
+        try:
+            line = await asyncio.wait_for(reader.readline(), timeout=10)
+            request = json.loads(line or b'{}') if line.strip() else {}
+        except (asyncio.TimeoutError, ValueError):
+            writer.close()
+            return
+        symbols = request.get('symbols') if isinstance(request, dict) else None
+        if not isinstance(request, dict) or not isinstance(symbols or [], list) or \
+                not all(isinstance(s, str) for s in symbols or []):
+            writer.close()      # JSON معتبر ولی نه {"symbols": [str, ...]}
+            return
+        symbols = frozenset(symbols or []) or None
+        client = _Client(writer, symbols, self.maxlen)
+        self.clients.add(client)
+        try:
+            while not writer.is_closing():
+                await client.ready.wait()
+                client.ready.clear()
+                if not client.queue:
+                    continue
+                batch = b''.join(client.queue)
+                n = len(client.queue)
+                client.queue.clear()
+                writer.write(batch)
+                await writer.drain()   # کلاینت کند فقط صف خودش را پر می‌کند
+                client.sent += n
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def publish(self, tick):
+        if not self.clients:
+            return
+        frame = encode_tick(tick)
+        for client in self.clients:
+            if client.symbols is not None and tick.symbol not in client.symbols:
+                continue
+            if len(client.queue) == client.queue.maxlen:
+                client.dropped += 1
+            client.queue.append(frame)
+            client.ready.set()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def stats(self):
+        return [{'symbols': sorted(c.symbols) if c.symbols else None, 'sent': c.sent,
+                 'dropped': c.dropped, 'queued': len(c.queue)} for c in self.clients]
+
+
+def subscribe_remote(path=BUS_SOCKET, symbols=None):
+    """کلاینت همزمان ساده: ژنراتوری از Tick ها از پروسه ingest"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    sock.sendall(json.dumps({'symbols': list(symbols or [])}).encode() + b'\n')
+    pending = b''
+    try:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return
+            pending += chunk
+            usable = len(pending) - len(pending) % TICK_SIZE
+            for offset in range(0, usable, TICK_SIZE):
+                yield decode_tick(pending, offset)
+            pending = pending[usable:]
+    finally:
+        sock.close()
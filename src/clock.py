@@ -0,0 +1,77 @@
+import re
+import time as _time
+from datetime import datetime, timedelta, timezone
+
+# همه تصمیم‌های زمانی (کول‌داون، بازه گزارش، نمونه‌برداری CSV، کهنگی داده) از این ماژول زمان می‌گیرند
+# تا بازپخش و بنچمارک بتوانند با SimClock سریع‌تر از زمان واقعی و با همان خروجی اجرا شوند.
+
+TZ_RE = re.compile(r'^([+-])(\d{2}):?(\d{2})$')
+
+
+def parse_tz(text):
+    """'+03:30' -> timezone؛ 'UTC' یا خالی -> UTC"""
+    text = (text or '').strip()
+    if text.upper() in ('', 'UTC', 'Z'):
+        return timezone.utc
+    m = TZ_RE.match(text)
+    if not m:
+        raise ValueError(f'invalid UTC offset: {text!r} (expected like +03:30)')
+    sign = -1 if m.group(1) == '-' else 1
+    return timezone(sign * timedelta(hours=int(m.group(2)), minutes=int(m.group(3))))
+
+
+def tz_label(tz):
+    offset = tz.utcoffset(None)
+    minutes = int(offset.total_seconds() // 60)
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}'
+
+
+class RealClock:
+    def time(self):
+        return _time.time()
+
+    def now(self, tz=None):
+        return datetime.now(tz)
+
+
+class SimClock:
+    """ساعت مجازی برای بازپخش: فقط با set/advance جلو می‌رود"""
+
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def time(self):
+        return self.t
+
+    def now(self, tz=None):
+        return datetime.fromtimestamp(self.t, tz)
+
+    def set(self, ts):
+        if ts > self.t:
+            self.t = float(ts)
+
+    def advance(self, seconds):
+        self.t += seconds
+
+
+_clock = RealClock()
+
+
+def use(clock):
+    """جایگزینی ساعت سراسری (مثلاً SimClock در بک‌تست)؛ ساعت قبلی را برمی‌گرداند"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def current():
+    return _clock
+
+
+def time():
+    return _clock.time()
+
+
+def now(tz=None):
+    return _clock.now(tz)
@@ -0,0 +1,266 @@
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+from clock import parse_tz, tz_label
+
+logger = logging.getLogger('whale_ws')
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'config.yaml')
+CONFIG_POLL_INTERVAL = float(os.getenv('CONFIG_POLL_INTERVAL', '2'))  # ثانیه (حالت mtime)
+
+SYMBOL_RE = re.compile(r'^[A-Z0-9]{2,20}$')
+STREAM_KIND_RE = re.compile(r'^(ticker|aggTrade|kline_(1s|1m|3m|5m|15m|30m|1h|4h|1d)|depth(@100ms|@1000ms)?)$')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+# ======== ساختار تنظیمات ========
+@dataclass(frozen=True)
+class TelegramConfig:
+    token: str = ''
+    chat_ids: tuple = ()
+
+
+@dataclass(frozen=True)
+class BinanceConfig:
+    symbols: tuple = ('BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT')
+    websocket_base: str = 'wss://stream.binance.com:443/stream?streams='
+    streams: tuple = ('ticker',)    # نوع استریم‌ها برای هر نماد: ticker, aggTrade, kline_<interval>, depth@100ms
+
+
+@dataclass(frozen=True)
+class AlertConfig:
+    threshold: float = 5.0        # درصد تغییر برای هشدار فوری
+    cooldown: int = 900           # ثانیه
+
+
+@dataclass(frozen=True)
+class ReportConfig:
+    interval: int = 15 * 60
+    hourly_interval: int = 60 * 60
+    min_change_percent: float = 0.1
+    min_change_volume: float = 0.01
+    timezone: str = '+03:30'        # منطقه زمانی نمایش ساعت در گزارش‌ها
+
+
+@dataclass(frozen=True)
+class CsvConfig:
+    file: str = 'market_data.csv'
+    save_interval: int = 30
+
+
+@dataclass(frozen=True)
+class Config:
+    telegram: TelegramConfig = field(default_factory=TelegramConfig)
+    binance: BinanceConfig = field(default_factory=BinanceConfig)
+    alerts: AlertConfig = field(default_factory=AlertConfig)
+    reports: ReportConfig = field(default_factory=ReportConfig)
+    csv: CsvConfig = field(default_factory=CsvConfig)
+
+
+# ======== اعتبارسنجی ========
+def normalize_symbols(symbols):
+    result = []
+    for sym in symbols:
+        sym = str(sym).strip().upper()
+        if not SYMBOL_RE.match(sym):
+            raise ConfigError(f'invalid symbol: {sym!r}')
+        if sym not in result:
+            result.append(sym)
+    if not result:
+        raise ConfigError('symbol list is empty')
+    return result
+
+
+def normalize_streams(kinds):
+    result = []
+    for kind in kinds:
+        kind = str(kind).strip()
+        if not STREAM_KIND_RE.match(kind):
+            raise ConfigError(f'invalid stream kind: {kind!r}')
+        if kind not in result:
+            result.append(kind)
+    if 'ticker' not in result:
+        raise ConfigError('binance.streams must include ticker')
+    return result
+
+
+def _number(section, key, value, cast, minimum=0):
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f'{section}.{key} must be a number, got {value!r}')
+    if value < minimum:
+        raise ConfigError(f'{section}.{key} must be >= {minimum}, got {value!r}')
+    return value
+
+
+def _section(data, name):
+    value = data.get(name) or {}
+    if not isinstance(value, dict):
+        raise ConfigError(f'{name} must be a mapping')
+    return value
+
+
+def _ws_base(url):
+    # websocket_url قدیمی شامل لیست استریم‌هاست؛ فقط پایه را نگه دار
+    if 'streams=' in url:
+        return url[:url.index('streams=') + len('streams=')]
+    # فقط host (مثلاً fixture_server): مسیر combined stream را اضافه کن
+    return url.rstrip('/') + '/stream?streams='
+
+
+def _timezone(text):
+    try:
+        return tz_label(parse_tz(text))
+    except ValueError as e:
+        raise ConfigError(f'reports.timezone: {e}')
+
+
+def _env(name, default):
+    value = os.getenv(name)
+    return default if value in (None, '') else value
+
+
+def parse_config(data):
+    """دیکشنری YAML -> Config اعتبارسنجی‌شده؛ متغیرهای محیطی بر فایل اولویت دارند"""
+    if not isinstance(data, dict):
+        raise ConfigError('config root must be a mapping')
+    d = Config()
+
+    tg = _section(data, 'telegram')
+    chat_ids = _env('TELEGRAM_CHAT_ID', tg.get('chat_ids', tg.get('chat_id', '')))
+    if isinstance(chat_ids, (str, int)):
+        chat_ids = [c for c in str(chat_ids).split(',')]
+    telegram = TelegramConfig(
+        token=str(_env('TELEGRAM_TOKEN', tg.get('token', ''))),
+        chat_ids=tuple(str(c).strip() for c in chat_ids if str(c).strip()),
+    )
+
+    bn = _section(data, 'binance')
+    streams = _env('BINANCE_STREAMS', bn.get('streams') or d.binance.streams)
+    if isinstance(streams, str):
+        streams = streams.split(',')
+    binance = BinanceConfig(
+        symbols=tuple(normalize_symbols(bn.get('symbols') or d.binance.symbols)),
+        websocket_base=_ws_base(str(_env('BINANCE_WS_BASE', bn.get('websocket_base') or bn.get('websocket_url') or d.binance.websocket_base))),
+        streams=tuple(normalize_streams(streams)),
+    )
+
+    al = _section(data, 'alerts')
+    alerts = AlertConfig(
+        threshold=_number('alerts', 'threshold', _env('ALERT_THRESHOLD', al.get('threshold', d.alerts.threshold)), float),
+        cooldown=_number('alerts', 'cooldown', _env('ALERT_COOLDOWN', al.get('cooldown', d.alerts.cooldown)), int),
+    )
+
+    rp = _section(data, 'reports')
+    reports = ReportConfig(
+        interval=_number('reports', 'interval', rp.get('interval', d.reports.interval), int, 1),
+        hourly_interval=_number('reports', 'hourly_interval', rp.get('hourly_interval', d.reports.hourly_interval), int, 1),
+        min_change_percent=_number('reports', 'min_change_percent', rp.get('min_change_percent', d.reports.min_change_percent), float),
+        min_change_volume=_number('reports', 'min_change_volume', rp.get('min_change_volume', d.reports.min_change_volume), float),
+        timezone=_timezone(str(_env('REPORT_TZ', rp.get('timezone', d.reports.timezone)))),
+    )
+
+    cs = _section(data, 'csv')
+    csv_cfg = CsvConfig(
+        file=str(_env('CSV_FILE', cs.get('file', d.csv.file))),
+        save_interval=_number('csv', 'save_interval', _env('CSV_SAVE_INTERVAL', cs.get('save_interval', d.csv.save_interval)), int),
+    )
+    return Config(telegram=telegram, binance=binance, alerts=alerts, reports=reports, csv=csv_cfg)
+
+
+def load_config(path=DEFAULT_CONFIG_FILE):
+    import yaml
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = yaml.safe_load(f) or {}
+    except yaml.YAMLError as e:
+        raise ConfigError(f'YAML parse error in {path}: {e}')
+    return parse_config(data)
+
+
+# ======== پایش فایل ========
+class ConfigWatcher:
+    """پایش تغییرات فایل تنظیمات با inotify (در صورت وجود inotify_simple) یا mtime"""
+
+    def __init__(self, path, on_change, current=None, interval=CONFIG_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.current = current
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._mtime = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            import inotify_simple
+        except ImportError:
+            inotify_simple = None
+        if inotify_simple is not None:
+            try:
+                self._run_inotify(inotify_simple)
+                return
+            except OSError as e:
+                logger.warning(f'⚠️ inotify unavailable ({e}); falling back to mtime polling')
+        self._run_polling()
+
+    def _run_inotify(self, inotify_simple):
+        flags = inotify_simple.flags
+        inotify = inotify_simple.INotify()
+        # پوشه را پایش می‌کنیم چون ویرایشگرها فایل را جایگزین (rename) می‌کنند
+        inotify.add_watch(os.path.dirname(self.path),
+                          flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+        name = os.path.basename(self.path)
+        logger.info(f'👀 Watching {self.path} (inotify)')
+        while not self._stop.is_set():
+            events = inotify.read(timeout=int(self.interval * 1000))
+            if any(e.name == name for e in events):
+                self.check()
+
+    def _run_polling(self):
+        logger.info(f'👀 Watching {self.path} (mtime polling every {self.interval}s)')
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """اگر فایل تغییر کرده، بارگذاری و اعمال کن؛ فایل نامعتبر نادیده گرفته می‌شود"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            new = load_config(self.path)
+        except (OSError, ConfigError) as e:
+            logger.error(f'❌ Config reload rejected: {e}')
+            return False
+        if new == self.current:
+            return False
+        old, self.current = self.current, new
+        logger.info(f'🔧 Config changed: {self.path}')
+        try:
+            self.on_change(new, old)
+        except Exception as e:
+            logger.error(f'❌ Error applying config: {e}')
+        return True
@@ -0,0 +1,183 @@
+import math
+import os
+
+import numpy as np
+
+# ======== تنظیمات ========
+CORR_BUCKET = int(os.getenv('CORR_BUCKET', '60'))               # ثانیه؛ طول هر سطل بازده
+CORR_WINDOW = int(os.getenv('CORR_WINDOW', '60'))               # سطل؛ پنجره کوتاه (پیش‌فرض 1 ساعت)
+CORR_LONG_WINDOW = int(os.getenv('CORR_LONG_WINDOW', '1440'))   # سطل؛ پنجره مرجع (پیش‌فرض 24 ساعت)
+CORR_BREAK = float(os.getenv('CORR_BREAK', '0.5'))              # افت/جهش همبستگی نسبت به پنجره مرجع
+CORR_BENCHMARK = os.getenv('CORR_BENCHMARK', 'BTCUSDT')
+CORR_MIN_BUCKETS = 10
+
+
+class RollingCovariance:
+    """میانگین و ماتریس کوواریانس روی W بردار آخر با به‌روزرسانی Welford (افزودن/حذف)
+
+    هر سطل O(N²) با یک outer product برداری؛ حافظه O(W·N + N²). داده از صفر دوباره محاسبه نمی‌شود.
+    """
+
+    def __init__(self, n, window):
+        self.window = window
+        self.ring = np.zeros((window, n))
+        self.head = 0
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.comoment = np.zeros((n, n))
+        self.total = np.zeros(n)       # مجموع بازده‌ها در پنجره (بازده تجمعی لگاریتمی)
+
+    def push(self, x):
+        if self.count == self.window:
+            y = self.ring[self.head].copy()
+            self.count -= 1
+            if self.count == 0:
+                self.mean[:] = 0
+                self.comoment[:] = 0
+            else:
+                dy = y - self.mean
+                self.mean -= dy / self.count
+                self.comoment -= np.outer(dy, y - self.mean)
+            self.total -= y
+        self.ring[self.head] = x
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        dx = x - self.mean
+        self.mean += dx / self.count
+        self.comoment += np.outer(dx, x - self.mean)
+        self.total += x
+
+    def covariance(self):
+        if self.count < 2:
+            return None
+        return self.comoment / (self.count - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        if cov is None:
+            return None
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        denom = np.outer(std, std)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.where(denom > 0, cov / denom, np.nan)
+        return np.clip(corr, -1.0, 1.0)
+
+    def select(self, keep, n_new):
+        """نگه داشتن ستون‌های keep و افزودن n_new ستون با تاریخچه صفر (با حالت Welford سازگار است)"""
+        pad = ((0, 0), (0, n_new))
+        self.ring = np.pad(self.ring[:, keep], pad)
+        self.mean = np.pad(self.mean[keep], (0, n_new))
+        self.total = np.pad(self.total[keep], (0, n_new))
+        self.comoment = np.pad(self.comoment[np.ix_(keep, keep)], ((0, n_new), (0, n_new)))
+
+
+class CorrelationEngine:
+    """بازده‌های هم‌تراز (سطل‌های CORR_BUCKET ثانیه‌ای) همه نمادها -> همبستگی، قدرت نسبی و شکست همبستگی"""
+
+    def __init__(self, symbols, bucket=CORR_BUCKET, window=CORR_WINDOW, long_window=CORR_LONG_WINDOW,
+                 benchmark=CORR_BENCHMARK):
+        self.bucket = bucket
+        self.benchmark = benchmark
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.short = RollingCovariance(n, window)
+        self.long = RollingCovariance(n, long_window)
+        self.last_price = np.full(n, np.nan)    # آخرین قیمت در سطل جاری
+        self.prev_close = np.full(n, np.nan)    # قیمت پایانی سطل قبلی
+        self.current_bucket = None
+        self.buckets = 0
+
+    def set_symbols(self, symbols):
+        symbols = list(symbols)
+        keep = [self.index[s] for s in symbols if s in self.index]
+        added = [s for s in symbols if s not in self.index]
+        for stats in (self.short, self.long):
+            stats.select(keep, len(added))
+        self.last_price = np.concatenate([self.last_price[keep], np.full(len(added), np.nan)])
+        self.prev_close = np.concatenate([self.prev_close[keep], np.full(len(added), np.nan)])
+        self.symbols = [s for s in symbols if s in self.index] + added
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+
+    def on_tick(self, symbol, price, ts):
+        i = self.index.get(symbol)
+        if i is None or price <= 0:
+            return
+        b = int(ts // self.bucket)
+        if self.current_bucket is None:
+            self.current_bucket = b
+        elif b > self.current_bucket:
+            self._close_bucket()
+            self.current_bucket = b
+        self.last_price[i] = price
+
+    def _close_bucket(self):
+        valid = np.isfinite(self.last_price) & np.isfinite(self.prev_close)
+        returns = np.zeros(len(self.symbols))
+        returns[valid] = np.log(self.last_price[valid] / self.prev_close[valid])
+        seen = np.isfinite(self.last_price)
+        self.prev_close[seen] = self.last_price[seen]
+        self.short.push(returns)
+        self.long.push(returns)
+        self.buckets += 1
+
+    @property
+    def ready(self):
+        return self.short.count >= CORR_MIN_BUCKETS
+
+    # ---- خروجی‌ها ----
+    def correlation_matrix(self):
+        corr = self.short.correlation()
+        if corr is None:
+            return None
+        return [[None if math.isnan(v) else round(float(v), 4) for v in row] for row in corr]
+
+    def relative_strength(self):
+        """بازده تجمعی پنجره کوتاه، اختلاف با بنچمارک، همبستگی و بتا نسبت به بنچمارک"""
+        b = self.index.get(self.benchmark)
+        cov = self.short.covariance()
+        corr = self.short.correlation()
+        if b is None or cov is None:
+            return {}
+        cumulative = np.expm1(self.short.total) * 100
+        result = {}
+        for sym, i in self.index.items():
+            beta = cov[i, b] / cov[b, b] if cov[b, b] > 0 else None
+            c = corr[i, b]
+            result[sym] = {
+                'return_pct': round(float(cumulative[i]), 3),
+                'vs_benchmark_pct': round(float(cumulative[i] - cumulative[b]), 3),
+                'corr': None if math.isnan(c) else round(float(c), 3),
+                'beta': None if beta is None else round(float(beta), 3),
+            }
+        return result
+
+    def top_movers(self, n=3):
+        cumulative = np.expm1(self.short.total) * 100
+        order = np.argsort(cumulative)
+        pick = lambda idx: [(self.symbols[i], round(float(cumulative[i]), 3)) for i in idx]
+        return {'gainers': pick(order[::-1][:n]), 'losers': pick(order[:n])}
+
+    def correlation_breaks(self, threshold=CORR_BREAK):
+        """جفت‌هایی که همبستگی پنجره کوتاه با پنجره مرجع بیشتر از threshold فاصله گرفته"""
+        short, long = self.short.correlation(), self.long.correlation()
+        if short is None or long is None or self.long.count <= self.short.count:
+            return []
+        diff = np.abs(short - long)
+        rows, cols = np.where(np.triu(np.nan_to_num(diff) >= threshold, k=1))
+        return [{'pair': [self.symbols[i], self.symbols[j]], 'now': round(float(short[i, j]), 3),
+                 'baseline': round(float(long[i, j]), 3)} for i, j in zip(rows, cols)]
+
+    def summary(self):
+        return {
+            'symbols': self.symbols,
+            'benchmark': self.benchmark,
+            'bucket_sec': self.bucket,
+            'window_buckets': self.short.window,
+            'buckets_in_window': self.short.count,
+            'ready': self.ready,
+            'correlation': self.correlation_matrix(),
+            'relative_strength': self.relative_strength(),
+            'top_movers': self.top_movers(),
+            'breaks': self.correlation_breaks(),
+        }
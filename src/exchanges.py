@@ -0,0 +1,111 @@
+import json
+import os
+
+from ticks import EXCHANGES, Tick
+
+# ======== تنظیمات ========
+# بایننس مرجع است (وضعیت، CSV، هشدار، گزارش، کندل و دفتر سفارش)؛ صرافی‌های اضافه فقط تیکر برای اسپرد
+EXTRA_EXCHANGES = tuple(e.strip().lower() for e in os.getenv('EXTRA_EXCHANGES', '').split(',')
+                        if e.strip() and e.strip().lower() != 'binance')
+SPREAD_ALERT_PERCENT = float(os.getenv('SPREAD_ALERT_PERCENT', '0.5'))   # اختلاف قیمت بین صرافی‌ها
+SPREAD_MAX_AGE = float(os.getenv('SPREAD_MAX_AGE', '10'))               # قیمت قدیمی‌تر در مقایسه نمی‌آید
+SPREAD_ALERT_COOLDOWN = int(os.getenv('SPREAD_ALERT_COOLDOWN', '600'))
+BYBIT_WS_BASE = os.getenv('BYBIT_WS_BASE', 'wss://stream.bybit.com/v5/public/spot')  # برای تست: fixture_server
+
+
+class ExchangeAdapter:
+    """هر صرافی: ساخت آدرس استریم، پروتکل subscribe و تبدیل پیام به Tick
+
+    normalize مستقیماً از dict پارس‌شده یک Tick می‌سازد (بدون dict میانی)؛ پیام‌های
+    غیر تیکر یا کنترلی None برمی‌گردانند.
+    """
+
+    name = ''
+    streams_in_url = False     # True: آدرس اتصال خودش استریم‌ها را subscribe می‌کند
+    max_control_args = 0       # حداکثر استریم در هر پیام subscribe (0 = بدون محدودیت)
+    heartbeat = None           # پیام ping لایه برنامه (در صورت نیاز صرافی)
+    heartbeat_interval = 20
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.exchange_id = EXCHANGES.index(self.name)
+
+    def streams_for(self, symbol, kinds):
+        raise NotImplementedError
+
+    def url(self, streams):
+        raise NotImplementedError
+
+    def control_message(self, method, streams, request_id):
+        """method: 'SUBSCRIBE' یا 'UNSUBSCRIBE'"""
+        raise NotImplementedError
+
+    def is_control(self, msg):
+        raise NotImplementedError
+
+    def normalize(self, msg, now_ts):
+        raise NotImplementedError
+
+
+class BinanceAdapter(ExchangeAdapter):
+    name = 'binance'
+    streams_in_url = True
+
+    def streams_for(self, symbol, kinds):
+        return [f'{symbol.lower()}@{kind}' for kind in kinds]
+
+    def url(self, streams):
+        return f'{self.base_url}{"/".join(sorted(streams))}'
+
+    def control_message(self, method, streams, request_id):
+        return json.dumps({'method': method, 'params': streams, 'id': request_id})
+
+    def is_control(self, msg):
+        return 'result' in msg or 'error' in msg
+
+    def normalize(self, msg, now_ts):
+        data = msg.get('data') or msg  # multi-stream: {'stream':..., 'data': {...}}
+        if data.get('e') != '24hrTicker':
+            return None
+        return Tick(data['s'], float(data.get('c', 0)), float(data.get('v', 0)),
+                    float(data.get('P', 0)), now_ts, self.exchange_id)
+
+
+class BybitAdapter(ExchangeAdapter):
+    """Bybit v5 public spot: topic = tickers.<SYMBOL>، subscribe با {"op": "subscribe"}"""
+
+    name = 'bybit'
+    max_control_args = 10
+    heartbeat = json.dumps({'op': 'ping'})
+    KINDS = {'ticker': 'tickers'}   # فقط تیکر؛ استریم‌های دیگر بایننسی‌اند
+
+    def streams_for(self, symbol, kinds):
+        return [f'{self.KINDS[kind]}.{symbol.upper()}' for kind in kinds if kind in self.KINDS]
+
+    def url(self, streams):
+        return self.base_url    # همه topicها بعد از اتصال subscribe می‌شوند
+
+    def control_message(self, method, streams, request_id):
+        return json.dumps({'op': method.lower(), 'args': streams, 'req_id': str(request_id)})
+
+    def is_control(self, msg):
+        return 'op' in msg or 'success' in msg
+
+    def normalize(self, msg, now_ts):
+        if not msg.get('topic', '').startswith('tickers.'):
+            return None
+        data = msg['data']
+        return Tick(data['symbol'], float(data['lastPrice']), float(data.get('volume24h', 0)),
+                    float(data.get('price24hPcnt', 0)) * 100, now_ts, self.exchange_id)
+
+
+ADAPTERS = {'binance': BinanceAdapter, 'bybit': BybitAdapter}
+
+
+def make_adapter(name, base_url=None):
+    cls = ADAPTERS.get(name)
+    if cls is None:
+        raise ValueError(f'unknown exchange {name!r} (known: {", ".join(sorted(ADAPTERS))})')
+    if base_url is None:
+        base_url = {'bybit': BYBIT_WS_BASE}.get(name)
+    return cls(base_url)
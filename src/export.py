@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+
+# ======== تنظیمات ========
+EXPORT_DIR = os.path.abspath(os.getenv('EXPORT_DIR', 'exports'))   # مطلق: send_file مسیر نسبی را از root_path اپ می‌خواند
+EXPORT_TTL = int(os.getenv('EXPORT_TTL', '3600'))                  # ثانیه نگه‌داری فایل آماده برای resume
+EXPORT_CHUNK = int(os.getenv('EXPORT_CHUNK', str(256 * 1024)))     # بایت در هر خواندن از دیسک
+EXPORT_LEVEL = int(os.getenv('EXPORT_LEVEL', '6'))                 # سطح فشرده‌سازی gzip
+
+# market_data.csv فقط append می‌شود و بر اساس timestamp (ISO محلی) مرتب است؛ پس شروع بازه با جستجوی
+# دودویی روی offset فایل پیدا می‌شود و خروجی بدون بارگذاری فایل در حافظه، تکه‌تکه ساخته می‌شود.
+# خروجی قطعی است (gzip با mtime صفر) و هم‌زمان با ارسال در EXPORT_DIR ذخیره می‌شود تا Range/resume
+# روی همان بایت‌ها با ETag کار کند. پارامترها و اندازه منبع کنار آن (export_<key>.json) نوشته می‌شوند تا
+# اگر دانلود اول قطع شد، همان بایت‌ها از اول CSV (که فقط append می‌شود) دوباره ساخته شوند.
+
+FORMATS = {'csv.gz': 'application/gzip', 'csv': 'text/csv'}
+
+
+def parse_time(text):
+    """ISO (مثل 2025-08-14 یا 2025-08-14T18:00) یا epoch ثانیه -> رشته ISO قابل مقایسه با ستون timestamp"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromtimestamp(float(text)).isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace(' ', 'T')).isoformat()
+    except ValueError:
+        raise ValueError(f'invalid time: {text!r} (ISO 8601 or epoch seconds)')
+
+
+def export_key(path, symbols, start, end, fmt, st):
+    """ETag: پارامترها + اندازه و mtime فایل منبع (os.stat) در لحظه شروع (تغییر داده = خروجی جدید)"""
+    raw = '|'.join([os.path.abspath(path), ','.join(sorted(symbols or ())), start or '', end or '', fmt,
+                    str(st.st_size), str(st.st_mtime_ns)])
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def _line_time(line):
+    return line[:line.find(b',')]
+
+
+def seek_start(f, start, size):
+    """offset اولین سطری که timestamp آن >= start است (با دقت یک تکه)؛ f روی ابتدای داده‌ها"""
+    data_start = lo = f.tell()
+    hi = size
+    key = start.encode()
+    while hi - lo > EXPORT_CHUNK:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()                # بقیه سطر ناقص
+        line = f.readline()
+        if not line or _line_time(line) >= key:
+            hi = mid
+        else:
+            lo = mid
+    f.seek(lo)
+    if lo != data_start:
+        f.readline()
+    return f.tell()
+
+
+def iter_csv(path, symbols=None, start=None, end=None, size=None):
+    """تکه‌های بایتی CSV فیلترشده (با سطر عنوان)؛ حافظه مستقل از اندازه خروجی
+
+    فقط تا اندازه فایل در لحظه شروع خوانده می‌شود تا خروجی با ETag همان لحظه یکسان بماند."""
+    wanted = {s.encode() for s in symbols} if symbols else None
+    start_key = start.encode() if start else None
+    end_key = end.encode() if end else None
+    size = os.path.getsize(path) if size is None else size
+    with open(path, 'rb') as f:
+        header = f.readline()
+        yield header
+        if start:
+            seek_start(f, start, size)
+        tail = b''
+        while True:
+            block = f.read(min(EXPORT_CHUNK, size - f.tell()))
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b'\n') + 1
+            block, tail = block[:cut], block[cut:]
+            if not block:
+                continue
+            last = block[block.rfind(b'\n', 0, len(block) - 1) + 1:]
+            done = end_key is not None and _line_time(last) >= end_key
+            if wanted is None and start_key is None and not done:
+                yield block                 # مسیر سریع: کل تکه بدون شکستن سطرها
+            else:
+                out = []
+                for line in block.splitlines(keepends=True):
+                    t = _line_time(line)
+                    if end_key is not None and t >= end_key:
+                        break
+                    if start_key is not None:
+                        if t < start_key:
+                            continue
+                        start_key = None    # فایل مرتب است: از اولین سطر >= start به بعد فیلتر لازم نیست
+                    if wanted is None or line[len(t) + 1:line.find(b',', len(t) + 1)] in wanted:
+                        out.append(line)
+                if out:
+                    yield b''.join(out)
+            if done:
+                return
+            time.sleep(0)                   # GIL را به thread ingest بده
+        # tail: سطری که ingest هنوز در حال نوشتنش بود؛ ارسال نمی‌شود
+
+
+def iter_export(path, symbols=None, start=None, end=None, fmt='csv.gz', size=None):
+    chunks = iter_csv(path, symbols, start, end, size)
+    if fmt == 'csv':
+        yield from chunks
+        return
+    # wbits=31: هدر gzip با mtime صفر -> بایت‌های یکسان برای یک ورودی
+    compressor = zlib.compressobj(EXPORT_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ======== ذخیره برای Range/resume ========
+def spool_path(key, fmt, directory=EXPORT_DIR):
+    return os.path.join(directory, f'export_{key}.{fmt}')
+
+
+def find_spool(key, fmt, directory=EXPORT_DIR):
+    if not key.isalnum():               # کلید از هدر If-Range می‌آید
+        return None
+    path = spool_path(key, fmt, directory)
+    return path if os.path.exists(path) else None
+
+
+def save_params(key, path, symbols, start, end, fmt, size, directory=EXPORT_DIR):
+    """پارامترهای iter_export برای ساخت دوباره همین خروجی (با اندازه منبع در لحظه شروع)"""
+    os.makedirs(directory, exist_ok=True)
+    params = {'path': os.path.abspath(path), 'symbols': list(symbols or ()), 'start': start, 'end': end,
+              'fmt': fmt, 'size': size}
+    meta = os.path.join(directory, f'export_{key}.json')
+    with open(f'{meta}.{os.getpid()}.part', 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+    os.replace(f'{meta}.{os.getpid()}.part', meta)
+
+
+def load_params(key, fmt, directory=EXPORT_DIR):
+    if not key.isalnum():
+        return None
+    try:
+        with open(os.path.join(directory, f'export_{key}.json'), encoding='utf-8') as f:
+            params = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if params.get('fmt') != fmt or not os.path.exists(params['path']) or \
+            os.path.getsize(params['path']) < params['size']:
+        return None                     # منبع عوض شده (مثلاً چرخش فایل)؛ ساخت دوباره ممکن نیست
+    return params
+
+
+def spool(chunks, key, fmt, directory=EXPORT_DIR):
+    """chunks را همزمان با yield در فایل موقت می‌نویسد؛ فقط خروجی کامل نام نهایی می‌گیرد"""
+    os.makedirs(directory, exist_ok=True)
+    final = spool_path(key, fmt, directory)
+    tmp = f'{final}.{os.getpid()}.{id(chunks)}.part'
+    complete = False
+    try:
+        with open(tmp, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp, final)
+        complete = True
+    finally:
+        if not complete and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def build_spool(chunks, key, fmt, directory=EXPORT_DIR):
+    for _ in spool(chunks, key, fmt, directory):
+        pass
+    return spool_path(key, fmt, directory)
+
+
+def cleanup(directory=EXPORT_DIR, ttl=EXPORT_TTL):
+    """حذف خروجی‌های قدیمی‌تر از ttl و فایل‌های ناقص رهاشده"""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    cutoff = time.time() - ttl
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('export_') and os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,156 @@
+"""سرور fixture محلی به جای REST و WebSocket بایننس (برای تست بدون شبکه)
+
+    python fixture_server.py [--port 8765] [--ws-port 8766] [--fixtures ../config/fixtures]
+                             [--recording ws_depth_BTCUSDT.jsonl] [--rate 50] [--loop]
+
+استاب Bybit (صرافی دوم برای اسپرد):
+    python fixture_server.py --port 8767 --ws-port 8768 --recording ws_bybit_tickers.jsonl --loop
+    EXTRA_EXCHANGES=bybit BYBIT_WS_BASE=ws://127.0.0.1:8768 ...
+
+سپس:
+    BINANCE_REST_BASE=http://127.0.0.1:8765 EXCHANGE_INFO_URL=http://127.0.0.1:8765/api/v3/exchangeInfo \\
+    BINANCE_WS_BASE=ws://127.0.0.1:8766 BINANCE_STREAMS=ticker,depth@100ms python main.py
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = os.path.join(HERE, '..', 'config', 'fixtures')
+
+logger = logging.getLogger('fixture_server')
+
+# مسیر REST -> نام فایل fixture ({symbol} از query string)؛ اول نسخه مخصوص نماد، بعد عمومی
+REST_FIXTURES = {
+    '/api/v3/depth': ('depth_{symbol}.json', None),
+    '/api/v3/exchangeInfo': (None, os.path.join('..', 'exchange_info.json')),
+    '/api/v3/ticker/24hr': ('ticker_24hr_{symbol}.json', 'ticker_24hr.json'),
+}
+
+
+def make_handler(fixtures_dir):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            names = REST_FIXTURES.get(url.path)
+            if names is None:
+                return self._send(404, {'code': -1, 'msg': f'no fixture route for {url.path}'})
+            query = parse_qs(url.query)
+            symbol = (query.get('symbol') or [''])[0].upper()
+            per_symbol, generic = names
+            for name in (per_symbol.format(symbol=symbol) if per_symbol and symbol else None, generic):
+                path = os.path.join(fixtures_dir, name) if name else None
+                if path and os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        return self._send(200, f.read())
+            return self._send(400, {'code': -1121, 'msg': 'Invalid symbol.'})
+
+        def _send(self, status, body):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+    return Handler
+
+
+def start_rest(port, fixtures_dir, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), make_handler(fixtures_dir))
+    threading.Thread(target=server.serve_forever, name='fixture-rest', daemon=True).start()
+    logger.info(f'REST fixtures on http://{host}:{server.server_address[1]} ({fixtures_dir})')
+    return server
+
+
+def load_recording(path):
+    """هر خط یک فریم خام WebSocket (همان فرمت combined stream بایننس)"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def stamp_frame(frame):
+    """زمان رویداد (E) = لحظه ارسال؛ برای اندازه‌گیری تأخیر ingest در loadtest.py"""
+    msg = json.loads(frame)
+    data = msg.get('data', msg)
+    if isinstance(data, dict) and 'E' in data:
+        data['E'] = int(time.time() * 1000)
+    return json.dumps(msg)
+
+
+async def serve_ws(port, frames, rate, loop_forever, host='127.0.0.1', stamp=False):
+    import websockets
+
+    async def handler(ws, *args):
+        async def control():
+            # SUBSCRIBE/UNSUBSCRIBE را مثل بایننس و op/ping را مثل Bybit تأیید کن
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                if 'op' in msg:
+                    reply = {'success': True, 'ret_msg': 'pong' if msg['op'] == 'ping' else '',
+                             'op': msg['op'], 'req_id': msg.get('req_id')}
+                else:
+                    reply = {'result': None, 'id': msg.get('id')}
+                await ws.send(json.dumps(reply))
+        control_task = asyncio.ensure_future(control())
+        try:
+            while True:
+                for frame in frames:
+                    await ws.send(stamp_frame(frame) if stamp else frame)
+                    await asyncio.sleep(1.0 / rate if rate > 0 else 0)
+                if not loop_forever:
+                    break
+            await control_task
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            control_task.cancel()
+
+    async with websockets.serve(handler, host, port):
+        logger.info(f'WS replay on ws://{host}:{port} ({len(frames)} frames, {rate}/s)')
+        await asyncio.Future()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local Binance REST/WS fixture server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ws-port', type=int, default=8766)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--recording', default='ws_depth_BTCUSDT.jsonl',
+                        help='JSONL file of raw WS frames (relative to --fixtures)')
+    parser.add_argument('--rate', type=float, default=50.0, help='frames per second (0 = as fast as possible)')
+    parser.add_argument('--loop', action='store_true', help='replay the recording forever')
+    parser.add_argument('--stamp', action='store_true', help='rewrite event time E to the send time')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start_rest(args.port, args.fixtures, args.host)
+    recording = os.path.join(args.fixtures, args.recording)
+    frames = load_recording(recording) if os.path.exists(recording) else []
+    try:
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            logger.warning('websockets is not installed; serving REST fixtures only')
+            threading.Event().wait()
+        asyncio.run(serve_ws(args.ws_port, frames, args.rate, args.loop, args.host, args.stamp))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
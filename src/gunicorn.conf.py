@@ -0,0 +1,48 @@
+"""پیکربندی gunicorn: یک پروسه ingest جدا + workerهای وب فقط‌خواندنی روی shared memory"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# workerها فقط HTTP سرو می‌کنند؛ ingest در پروسه جداگانه‌ای است که master نگه می‌دارد
+os.environ['WHALEPULSE_ROLE'] = 'web'
+
+_ingest = None
+_stopping = threading.Event()
+
+
+def _spawn_ingest():
+    return subprocess.Popen([sys.executable, os.path.join(HERE, 'main.py'), '--role', 'ingest'],
+                            cwd=HERE, env=dict(os.environ, WHALEPULSE_ROLE='ingest'))
+
+
+def _supervise(server):
+    global _ingest
+    while not _stopping.is_set():
+        if _ingest is None or _ingest.poll() is not None:
+            if _ingest is not None:
+                server.log.error(f'ingest process exited with {_ingest.returncode}; restarting')
+            _ingest = _spawn_ingest()
+            server.log.info(f'ingest process started (pid {_ingest.pid})')
+        time.sleep(2)
+
+
+def on_starting(server):
+    threading.Thread(target=_supervise, args=(server,), name='ingest-supervisor', daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _ingest is not None and _ingest.poll() is None:
+        _ingest.terminate()
+        try:
+            _ingest.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _ingest.kill()
@@ -0,0 +1,61 @@
+import http.client
+import logging
+import os
+import socket
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+INGEST_HTTP_SOCKET = os.getenv('INGEST_HTTP_SOCKET',
+                               '/tmp/whalepulse_ingest_http.sock' if hasattr(socket, 'AF_UNIX') else '')
+INGEST_HTTP_TIMEOUT = float(os.getenv('INGEST_HTTP_TIMEOUT', '90'))   # ثانیه؛ بیشتر از PROFILE_MAX_SECONDS
+
+# مسیرهایی که وضعیتشان فقط در پروسه ingest است (کندل‌ها، دفتر سفارش، نمادها، پروفایل، ...) در
+# workerهای وب gunicorn با همان درخواست به اپ Flask پروسه ingest روی این سوکت یونیکس فرستاده می‌شوند.
+
+FORWARD_HEADERS = ('Content-Type', 'X-Admin-Token', 'Accept')
+RESPONSE_HEADERS = ('Content-Type', 'Content-Disposition', 'Retry-After')
+INTERNAL = 'whalepulse.internal'        # کلید environ درخواست‌هایی که از worker وب رسیده‌اند
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def forward(method, path_qs, headers, body=b'', socket_path=INGEST_HTTP_SOCKET, timeout=INGEST_HTTP_TIMEOUT):
+    """ارسال درخواست به پروسه ingest -> (status, headers, body)؛ OSError اگر ingest در دسترس نیست"""
+    if not socket_path:
+        raise OSError('INGEST_HTTP_SOCKET is not set')
+    conn = _UnixConnection(socket_path, timeout)
+    try:
+        conn.request(method, path_qs, body=body or None,
+                     headers={k: v for k, v in headers.items() if k in FORWARD_HEADERS})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, [(k, v) for k, v in response.getheaders() if k in RESPONSE_HEADERS], data
+    except http.client.HTTPException as e:
+        raise OSError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def serve(app, socket_path=INGEST_HTTP_SOCKET):
+    """اجرای app (WSGI) روی سوکت یونیکس؛ تا پایان پروسه برنمی‌گردد (در thread جدا صدا بزنید)"""
+    from werkzeug.serving import make_server
+
+    def internal_app(environ, start_response):
+        environ[INTERNAL] = True
+        return app(environ, start_response)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = make_server(f'unix://{socket_path}', 0, internal_app, threaded=True)
+    logger.info(f'🔀 Ingest-only routes served to web workers on {socket_path}')
+    server.serve_forever()
@@ -0,0 +1,287 @@
+"""تست بار هم‌زمان endpointهای HTTP در حالی که بازپخش fixture تیک‌ها را وارد ingest می‌کند
+
+    python loadtest.py [--concurrency 1,8,32] [--duration 20] [--feed-rate 500] [--out loadtest.json]
+    python loadtest.py --compare loadtest_old.json ...
+    python loadtest.py --url http://127.0.0.1:8080 ...     # سرور در حال اجرا (fixture/main راه‌اندازی نمی‌شوند)
+
+بدون --url، fixture_server.py (با --stamp تا زمان رویداد E لحظه ارسال باشد) و main.py --role all در یک پوشه
+موقت و فقط روی 127.0.0.1 اجرا می‌شوند. برای هر سطح هم‌زمانی صدک‌های تأخیر هر endpoint و، از نمونه‌برداری
+/status، تأخیر ingest (ingest_lag_ms) و پیام در ثانیه در مقایسه با دوره بدون بار ثبت می‌شود.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, '..', 'config', 'fixtures')
+ENDPOINTS = ('/api/market', '/status', '/health', '/dashboard')
+
+
+# ======== راه‌اندازی fixture + main ========
+def _wait_http(host, port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', path)
+            if conn.getresponse().status < 500:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f'{host}:{port}{path} did not come up')
+
+
+def recording_symbols(path):
+    """نمادهایی که در ضبط تیکر دارند (به ترتیب اولین ظهور)"""
+    symbols = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            msg = json.loads(line)
+            data = msg.get('data', msg)
+            if isinstance(data, dict) and data.get('e') == '24hrTicker':
+                symbols.setdefault(data['s'], None)
+    return list(symbols)
+
+
+def start_stack(port, rest_port, ws_port, feed_rate, recording, symbols):
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    config_file = os.path.join(workdir, 'config.yaml')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        # بدون تلگرام؛ فقط تیکر
+        f.write('binance:\n  symbols: [%s]\n  streams: [ticker]\n' % ', '.join(symbols))
+    out = open(os.path.join(workdir, 'stack.log'), 'w')
+    fixture = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'fixture_server.py'), '--port', str(rest_port),
+         '--ws-port', str(ws_port), '--recording', recording, '--rate', str(feed_rate), '--loop', '--stamp'],
+        cwd=workdir, stdout=out, stderr=subprocess.STDOUT)
+    env = dict(os.environ,
+               PORT=str(port), WHALEPULSE_ROLE='all', CONFIG_FILE=config_file, CONFIG_WATCH='0',
+               TELEGRAM_TOKEN='', TELEGRAM_CHAT_ID='',
+               BINANCE_WS_BASE=f'ws://127.0.0.1:{ws_port}', BINANCE_REST_BASE=f'http://127.0.0.1:{rest_port}',
+               EXCHANGE_INFO_URL=f'http://127.0.0.1:{rest_port}/api/v3/exchangeInfo',
+               BUS_SOCKET=os.path.join(workdir, 'bus.sock'), INGEST_LOCK_FILE=os.path.join(workdir, 'ingest.lock'),
+               SHARED_STATE_NAME=f'whalepulse_loadtest_{os.getpid()}', ASGI_PORT='0',
+               RATE_LIMIT_RPS='0', RATE_LIMIT_TEST='off')     # همه درخواست‌ها از یک IP می‌آیند
+    app = subprocess.Popen([sys.executable, os.path.join(HERE, 'main.py'), '--role', 'all'],
+                           cwd=workdir, env=env, stdout=out, stderr=subprocess.STDOUT)
+    _wait_http('127.0.0.1', port, '/health')
+    return [app, fixture], workdir
+
+
+def stop_stack(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ======== اندازه‌گیری ========
+def percentiles(values):
+    if not values:
+        return {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = sorted(values)
+    pick = lambda q: round(values[min(int(q * len(values)), len(values) - 1)], 2)
+    return {'p50_ms': pick(0.50), 'p90_ms': pick(0.90), 'p99_ms': pick(0.99), 'max_ms': round(values[-1], 2)}
+
+
+class StatusSampler:
+    """نمونه‌برداری /status روی اتصال جدا: ingest_lag_ms و messages_processed"""
+
+    def __init__(self, host, port, interval=0.5):
+        self.host, self.port, self.interval = host, port, interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='status-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        while not self._stop.wait(self.interval):
+            try:
+                conn.request('GET', '/status')
+                status = json.loads(conn.getresponse().read())
+            except (OSError, ValueError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+                continue
+            self.samples.append((time.time(), status.get('ingest_lag_ms'), status.get('messages_processed', 0)))
+
+    def window(self, start, end):
+        """خلاصه نمونه‌های بین start و end"""
+        rows = [s for s in self.samples if start <= s[0] <= end]
+        lags = [s[1] for s in rows if s[1] is not None]
+        rate = None
+        if len(rows) >= 2 and rows[-1][0] > rows[0][0]:
+            rate = round((rows[-1][2] - rows[0][2]) / (rows[-1][0] - rows[0][0]), 1)
+        lag = percentiles(lags)
+        return {'samples': len(rows), 'messages_per_s': rate,
+                'lag_ms_p50': lag['p50_ms'], 'lag_ms_p99': lag['p99_ms'], 'lag_ms_max': lag['max_ms']}
+
+
+def _worker(host, port, offset, endpoints, deadline, results):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    i = offset
+    while time.perf_counter() < deadline:
+        path = endpoints[i % len(endpoints)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            ok = False
+        results.append((path, (time.perf_counter() - t0) * 1000, ok))
+    conn.close()
+
+
+def run_level(host, port, concurrency, duration, endpoints):
+    results = []        # list.append بین threadها امن است
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(host, port, i, endpoints, deadline, results), daemon=True)
+               for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    per_endpoint = {}
+    for path in endpoints:
+        rows = [r for r in results if r[0] == path]
+        per_endpoint[path] = {
+            'requests': len(rows),
+            'errors': sum(1 for r in rows if not r[2]),
+            'rps': round(len(rows) / elapsed, 1),
+            **percentiles([r[1] for r in rows if r[2]]),
+        }
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'rps': round(len(results) / elapsed, 1),
+        'errors': sum(1 for r in results if not r[2]),
+        **percentiles([r[1] for r in results if r[2]]),
+        'endpoints': per_endpoint,
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old, new):
+    """خطوط متنی: p99 هر endpoint و تأخیر ingest در هر سطح هم‌زمانی، قبلی -> فعلی"""
+    lines = [f"{old['meta'].get('git')} -> {new['meta'].get('git')}"]
+    old_levels = {lvl['concurrency']: lvl for lvl in old['levels']}
+    for level in new['levels']:
+        prev = old_levels.get(level['concurrency'])
+        if prev is None:
+            continue
+        lines.append(f"c={level['concurrency']}: rps {prev['rps']} -> {level['rps']}, "
+                     f"ingest lag p99 {prev['ingest']['lag_ms_p99']} -> {level['ingest']['lag_ms_p99']} ms")
+        for path, stats in level['endpoints'].items():
+            before = prev['endpoints'].get(path, {})
+            lines.append(f"  {path}: p99 {before.get('p99_ms')} -> {stats['p99_ms']} ms")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent HTTP load test with replayed ingest')
+    parser.add_argument('--url', default='', help='target an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=8181)
+    parser.add_argument('--rest-port', type=int, default=8775)
+    parser.add_argument('--ws-port', type=int, default=8776)
+    parser.add_argument('--feed-rate', type=float, default=500.0, help='replayed WS frames per second')
+    parser.add_argument('--recording', default='ws_tickers.jsonl', help='relative to config/fixtures')
+    parser.add_argument('--symbols', default='', help='default: symbols with tickers in the recording')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per concurrency level')
+    parser.add_argument('--baseline', type=float, default=10.0, help='seconds of ingest without HTTP load')
+    parser.add_argument('--out', default='', help='results JSON (default loadtest_<time>.json)')
+    parser.add_argument('--compare', default='', help='previous results JSON to compare against')
+    args = parser.parse_args(argv)
+
+    procs = []
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        symbols = [s for s in args.symbols.upper().split(',') if s] or \
+            recording_symbols(os.path.join(FIXTURES, args.recording))
+        if not symbols:
+            raise SystemExit(f'{args.recording} has no ticker frames; pass --symbols')
+        procs, workdir = start_stack(port, args.rest_port, args.ws_port, args.feed_rate, args.recording, symbols)
+        print(f'stack running in {workdir}', file=sys.stderr)
+    endpoints = [e for e in args.endpoints.split(',') if e]
+    sampler = StatusSampler(host, port).start()
+    try:
+        t0 = time.time()
+        time.sleep(args.baseline)
+        baseline = sampler.window(t0, time.time())
+        levels = []
+        for concurrency in (int(c) for c in args.concurrency.split(',') if c):
+            start = time.time()
+            level = run_level(host, port, concurrency, args.duration, endpoints)
+            level['ingest'] = sampler.window(start, time.time())
+            levels.append(level)
+            print(f"c={concurrency}: {level['rps']} req/s, p99 {level['p99_ms']} ms, "
+                  f"ingest lag p99 {level['ingest']['lag_ms_p99']} ms", file=sys.stderr)
+    finally:
+        sampler.stop()
+        stop_stack(procs)
+
+    result = {
+        'meta': {
+            'git': _git_rev(),
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'target': args.url or 'local stack',
+            'feed_rate': None if args.url else args.feed_rate,
+            'duration_sec': args.duration,
+        },
+        'baseline': baseline,
+        'levels': levels,
+    }
+    out = args.out or f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), result), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
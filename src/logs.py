@@ -0,0 +1,142 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+# ======== تنظیمات ========
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')                 # فرمت فایل: json یا text
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '5'))
+LOG_DEDUP_WINDOW = float(os.getenv('LOG_DEDUP_WINDOW', '10'))  # ثانیه؛ 0 = بدون حذف تکراری‌ها
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# فیلدهای استاندارد LogRecord؛ بقیه (extra=...) در JSON نوشته می‌شوند
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_log_file = None
+
+
+class JsonFormatter(logging.Formatter):
+    """یک شیء JSON در هر خط: ts, level, logger, msg + فیلدهای extra"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _args_key(args):
+    """کلید مقایسه args: استثناها با نوع و متن (hash آن‌ها بر اساس هویت است و هر رکورد یکتا می‌شد)"""
+    if isinstance(args, tuple):
+        args = tuple((type(a).__name__, str(a)) if isinstance(a, BaseException) else a for a in args)
+    try:
+        hash(args)
+    except TypeError:
+        return repr(args)       # آرگومان غیرقابل hash (مثلاً list)
+    return args
+
+
+class DedupFilter(logging.Filter):
+    """حذف پیام‌های تکراری (همان قالب، آرگومان‌ها و سطح) در یک پنجره زمانی؛ اولین پیام بعد از پنجره
+    تعداد حذف‌شده‌ها را در فیلد suppressed دارد. کلید از قالب و args ساخته می‌شود، پس پیام فرمت نمی‌شود."""
+
+    def __init__(self, window=LOG_DEDUP_WINDOW):
+        super().__init__()
+        self.window = window
+        self.seen = {}      # (name, level, template, args) -> [window_start, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else id(record.msg),
+               _args_key(record.args))
+        now = record.created
+        with self.lock:
+            entry = self.seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            if entry is not None and entry[1]:
+                record.suppressed = entry[1]
+            self.seen[key] = [now, 0]
+            if len(self.seen) > 10000:
+                self.seen.clear()
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler بدون فرمت کردن در thread فراخواننده؛ getMessage در thread شنونده اجرا می‌شود"""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass    # صف پر: پیام دور ریخته می‌شود تا مسیر تیک متوقف نشود
+
+
+def _file_handler(log_file, fmt):
+    handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def setup_logging(log_file=None, level=LOG_LEVEL, fmt=LOG_FORMAT):
+    """لاگ‌گیری غیرهمزمان: فقط یک put در صف روی thread فراخواننده، نوشتن فایل/کنسول در QueueListener
+
+    بدون log_file فقط کنسول (stderr). فایل را فقط یک پروسه باز کند: RotatingFileHandler در چند
+    پروسه هنگام چرخش فایل هم را خراب می‌کنند. فراخوانی دوباره با log_file فایل را به همان
+    listener اضافه می‌کند."""
+    global _listener, _log_file
+    root = logging.getLogger()
+    if _listener is not None:
+        if log_file and _log_file is None:
+            _listener.handlers = (*_listener.handlers, _file_handler(log_file, fmt))
+            _log_file = log_file
+        return _listener
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = LazyQueueHandler(log_queue)
+    handler.addFilter(DedupFilter())
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    handlers = (console, _file_handler(log_file, fmt)) if log_file else (console,)
+    _log_file = log_file
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """تخلیه صف و بستن فایل‌ها (هنگام خروج)"""
+    global _listener, _log_file
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _log_file = None
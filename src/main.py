@@ -1,16 +1,44 @@
 import asyncio
 import json
 import logging
-import random
 import time
 import os
 import csv
-from datetime import datetime, timedelta
-import requests
-import tenacity
-from flask import Flask, jsonify
-from threading import Thread
-import websockets
+import atexit
+import argparse
+import signal
+import sys
+from datetime import datetime
+from functools import partial, wraps
+from threading import Thread, Lock
+
+# ماژول‌های سنگین (requests, tenacity, websockets, flask) به صورت lazy و فقط در جای استفاده import می‌شوند
+
+import clock
+import logs
+from clock import parse_tz, tz_label
+from symbols import load_registry, SymbolRegistry
+from streams import StreamManager
+from config import ConfigError, ConfigWatcher, load_config, normalize_symbols
+import snapshot
+import profiler
+import export
+import ratelimit
+import ingest_http
+import asgi
+import memory
+from memory import BoundedDict
+import shared_state
+from bus import BUS_SOCKET, BusServer, TickBus
+from ticks import BINANCE, EXCHANGES, Tick
+from bars import COLUMNS as BAR_COLUMNS, BarBuilder, BarStore
+from whales import WHALE_COOLDOWN, WhaleDetector
+from rest import TICKER_BATCH_SIZE, fetch_tickers
+from supervisor import ConnectionSupervisor
+from exchanges import (EXTRA_EXCHANGES, SPREAD_ALERT_COOLDOWN, SPREAD_ALERT_PERCENT, SPREAD_MAX_AGE,
+                       make_adapter)
+from orderbook import (DEPTH_ALERT_COOLDOWN, DEPTH_IMBALANCE_ALERT, DEPTH_LEVELS,
+                       LocalOrderBook, fetch_depth_snapshot)
 
 # ======== تنظیمات ========
 SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT']
@@ -18,15 +46,31 @@ SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT']
 # توصیه امنیتی: این‌ها را به صورت متغیر محیطی ست کن؛ اما برای راحتی اجرا، مقادیر پیش‌فرض گذاشته شده
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN', '8136421090:AAFrb8RI6BQ2tH49YXX_5S32_W0yWfT04Cg')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '570096331')
+TELEGRAM_CHAT_IDS = [c.strip() for c in TELEGRAM_CHAT_ID.split(',') if c.strip()]
+
+# توکن مدیریتی برای endpointهای تغییر وضعیت (اگر خالی باشد، محافظت غیرفعال است)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+# محدودیت نرخ و کش پاسخ مسیرهای عمومی (ratelimit.py)
+RATE_LIMIT_TEST = os.getenv('RATE_LIMIT_TEST', '2/60')         # /test برای هر IP
+STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', '2'))   # ثانیه؛ /، /status، /health
+TEST_COOLDOWN = float(os.getenv('TEST_COOLDOWN', '60'))        # نتیجه /test (getMe + sendMessage) تا این مدت تکرار می‌شود
+CONFIG_FILE = os.getenv('CONFIG_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'config.yaml'))
+CONFIG_WATCH = os.getenv('CONFIG_WATCH', '1') == '1'   # پایش و اعمال خودکار تغییرات فایل تنظیمات
 
 PORT = int(os.getenv('PORT', 8080))
 BINANCE_WS_BASE = 'wss://stream.binance.com:443/stream?streams='  # Binance Global'  # Binance Global
 
 LOG_FILE = 'whalepulse_pro.log'
 
+# نقش پروسه: all (وب + ingest در یک پروسه)، web (فقط HTTP)، ingest (فقط WebSocket)
+ROLE = os.getenv('WHALEPULSE_ROLE', 'all')
+# قفل فایل تا ingest در بین چند worker گانیکورن فقط یکبار اجرا شود
+INGEST_LOCK_FILE = os.getenv('INGEST_LOCK_FILE', '/tmp/whalepulse_ingest.lock')
+
 # بازه گزارش‌های دوره‌ای
 REPORT_INTERVAL = 15 * 60         # 15 دقیقه
 HOURLY_REPORT_INTERVAL = 60 * 60  # 1 ساعت
+REPORT_TZ = parse_tz(os.getenv('REPORT_TZ', '+03:30'))  # ساعت نمایش‌داده‌شده در گزارش
 
 # آستانه تغییر برای تشخیص «گزارش 15 دقیقه‌ای لازم است یا نه»
 MIN_CHANGE_PERCENT = 0.1          # 0.1%
@@ -44,43 +88,262 @@ ALERT_COOLDOWN = int(os.getenv('ALERT_COOLDOWN', '900'))    # ثانیه (پیش
 CSV_FILE = os.getenv('CSV_FILE', 'market_data.csv')
 CSV_SAVE_INTERVAL = int(os.getenv('CSV_SAVE_INTERVAL', '30'))  # هر چند ثانیه یکبار برای هر نماد ثبت شود
 
+# منبع داده REST وقتی WebSocket قطع یا بی‌داده است
+FALLBACK_ENABLED = os.getenv('FALLBACK_ENABLED', 'true').lower() != 'false'
+FALLBACK_STALE_AFTER = float(os.getenv('FALLBACK_STALE_AFTER', '10'))   # ثانیه بدون تیک WebSocket
+FALLBACK_POLL_INTERVAL = float(os.getenv('FALLBACK_POLL_INTERVAL', '2'))
+FALLBACK_WORKERS = int(os.getenv('FALLBACK_WORKERS', '4'))
+
+# اسنپ‌شات وضعیت برای شروع گرم بعد از ری‌استارت/دیپلوی
+SNAPSHOT_FILE = snapshot.SNAPSHOT_FILE
+SNAPSHOT_INTERVAL = snapshot.SNAPSHOT_INTERVAL
+
 # متغیرهای گلوبال
 last_report_time = 0
 last_hourly_report_time = 0
 last_report_data = {}
+report_dirty = set()              # نمادهایی که از آخرین گزارش به اندازه MIN_CHANGE_* تغییر کرده‌اند
+current_data = {}                 # آخرین داده هر نماد برای گزارش‌ها (مشترک بین همه اتصال‌ها)
 
 # وضعیت اپ
+INGEST_LAG_ALPHA = 0.05            # وزن نمونه جدید در میانگین تأخیر ingest
 app_status = {
     'status': 'starting',
     'websocket_connected': False,
     'last_message_time': None,
     'messages_processed': 0,
+    'ingest_lag_ms': 0.0,
     'last_telegram_send': None,
-    'uptime_start': datetime.now()
+    'data_source': 'websocket',   # یا rest_fallback
+    'fallback_polls': 0,
+    'fallback_activations': 0,
+    'uptime_start': clock.now()
 }
+last_ws_tick = 0.0                # زمان آخرین 24hrTicker از WebSocket
 
 # وضعیت بازار برای داشبورد و API
 market_state = {}                 # {'BTCUSDT': {'price':..., 'volume':..., 'price_change_percent':..., 'updated_at':...}}
-last_alert_time = {}              # زمان آخرین هشدار برای هر نماد
-last_csv_write = {}               # زمان آخرین ثبت CSV برای هر نماد
+# دیکشنری‌های کول‌داون سقف دارند (MEMORY_MAX_KEYS) تا در اجرای چندهفته‌ای با نمادهای جدید رشد نکنند
+last_alert_time = BoundedDict()   # زمان آخرین هشدار برای هر نماد
+last_csv_write = BoundedDict()    # زمان آخرین ثبت CSV برای هر نماد
+last_whale_alert = BoundedDict()  # زمان آخرین هشدار نهنگ برای هر نماد
+
+# تشخیص معاملات بزرگ روی aggTrade (صدک پویا با t-digest)
+whale_detector = WhaleDetector()
+
+# دفتر سفارش محلی هر نماد (snapshot + diffهای @depth)
+order_books = {}
+depth_snapshot_pending = set()
+last_depth_check = BoundedDict()
+last_depth_alert = BoundedDict()  # (symbol, kind) -> زمان آخرین هشدار دیوار/عدم‌تعادل
+
+# مدیریت استریم‌ها (SUBSCRIBE/UNSUBSCRIBE روی اتصال‌های موجود)
+stream_manager = StreamManager(make_adapter('binance', BINANCE_WS_BASE))
+# صرافی‌های اضافه (فقط تیکر، برای اسپرد بین صرافی‌ها)
+venue_managers = {name: StreamManager(make_adapter(name)) for name in EXTRA_EXCHANGES}
+venue_prices = {}                 # symbol -> {exchange: (price, ts)}
+
+# همبستگی و قدرت نسبی نمادها (numpy به صورت lazy؛ اولین تیک موتور را می‌سازد)
+CORRELATION_ENABLED = os.getenv('CORRELATION_ENABLED', 'true').lower() != 'false'
+correlation_engine = None
+last_spread_alert = BoundedDict()
+ingest_loop = None                # حلقه رویداد thread مربوط به WebSocket
+loop_watchdog = None              # profiler.LoopWatchdog (فقط با SLOW_CALLBACK_MS > 0)
+supervisors = {}                  # (exchange, conn.index) -> ConnectionSupervisor
+
+# وضعیت بازار در shared memory: نویسنده = پروسه ingest، خواننده = workerهای وب
+shared_writer = None
+shared_reader = None
+shared_reader_checked = 0.0
+
+# سرور pub/sub بین‌پروسه‌ای (Unix socket) روی حلقه ingest
+bus_server = None
+
+# متادیتای نمادها (tickSize/stepSize و id عددی) — در شروع از کش/fixture بارگذاری می‌شود
+symbol_registry = SymbolRegistry()
 
 # ======== لاگ ========
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# فقط enqueue روی thread فراخواننده؛ فرمت، چرخش فایل و حذف تکراری‌ها در thread جدا (logs.py).
+# در init_runtime راه‌اندازی می‌شود (کنسول) و فایل LOG_FILE فقط در پروسه ingest (prepare_ingest).
 logger = logging.getLogger('whale_ws')
 
+# ======== تنظیمات از فایل ========
+config = None                     # آخرین Config اعمال‌شده (config/config.yaml + متغیرهای محیطی)
+
+def apply_config(cfg):
+    """اعمال یکجای تنظیمات؛ در حالت اجرا فقط روی حلقه ingest صدا زده می‌شود"""
+    global config, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_CHAT_IDS, BINANCE_WS_BASE
+    global ALERT_THRESHOLD, ALERT_COOLDOWN, REPORT_INTERVAL, HOURLY_REPORT_INTERVAL, REPORT_TZ
+    global MIN_CHANGE_PERCENT, MIN_CHANGE_VOLUME, CSV_FILE, CSV_SAVE_INTERVAL
+    TELEGRAM_TOKEN = cfg.telegram.token
+    TELEGRAM_CHAT_IDS = list(cfg.telegram.chat_ids)
+    TELEGRAM_CHAT_ID = ','.join(TELEGRAM_CHAT_IDS)
+    ALERT_THRESHOLD = cfg.alerts.threshold
+    ALERT_COOLDOWN = cfg.alerts.cooldown
+    REPORT_INTERVAL = cfg.reports.interval
+    HOURLY_REPORT_INTERVAL = cfg.reports.hourly_interval
+    REPORT_TZ = parse_tz(cfg.reports.timezone)
+    MIN_CHANGE_PERCENT = cfg.reports.min_change_percent
+    MIN_CHANGE_VOLUME = cfg.reports.min_change_volume
+    CSV_FILE = cfg.csv.file
+    CSV_SAVE_INTERVAL = cfg.csv.save_interval
+    if cfg.binance.websocket_base != BINANCE_WS_BASE:
+        # در اتصال مجدد بعدی اعمال می‌شود
+        BINANCE_WS_BASE = cfg.binance.websocket_base
+        stream_manager.adapter.base_url = BINANCE_WS_BASE
+    kinds_changed = stream_manager.set_kinds(cfg.binance.streams)
+    apply_symbols(list(cfg.binance.symbols))
+    if kinds_changed:
+        stream_manager.set_symbols(SYMBOLS)
+    config = cfg
+
+def call_in_ingest_loop(fn, *args):
+    """اجرای fn روی حلقه ingest تا پردازش تیک‌ها هیچ‌وقت وضعیت نیمه‌کاره نبیند"""
+    loop = ingest_loop
+    if loop is not None and loop.is_running():
+        loop.call_soon_threadsafe(fn, *args)
+    else:
+        fn(*args)
+
+def on_config_change(new, old):
+    call_in_ingest_loop(apply_config, new)
+
+def reload_config():
+    cfg = load_config(CONFIG_FILE)
+    call_in_ingest_loop(apply_config, cfg)
+    return cfg
+
+def init_config():
+    try:
+        apply_config(load_config(CONFIG_FILE))
+        logger.info(f"🔧 Config loaded from {CONFIG_FILE}")
+    except (OSError, ConfigError) as e:
+        logger.warning(f"⚠️ Config file not used ({e}); using environment defaults")
+
 # ======== Flask App ========
-app = Flask(__name__)
+ROUTES = []                       # (rule, view, options) — در create_app ثبت می‌شوند
+jsonify = request = make_response = None   # در create_app از flask مقداردهی می‌شوند
+_app = None
+# فقط مسیرهای عمومی و پرهزینه؛ API داشبورد و بقیه مسیرها محدود نمی‌شوند
+rate_limiter = ratelimit.RateLimiter({
+    '/': ratelimit.PUBLIC_LIMIT,
+    '/status': ratelimit.PUBLIC_LIMIT,
+    '/health': ratelimit.PUBLIC_LIMIT,
+    '/test': ratelimit.parse_limit(RATE_LIMIT_TEST),
+    '/debug/profile': ratelimit.parse_limit('1/10'),
+    '/api/export': ratelimit.parse_limit('10/60'),
+})
+status_cache = ratelimit.TTLCache(STATUS_CACHE_TTL)
+telegram_test_cache = ratelimit.TTLCache(TEST_COOLDOWN, max_keys=1)
+
+def route(rule, **options):
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+def create_app():
+    """app factory؛ در نقش all اولین worker ingest را هم (فقط یکبار) راه می‌اندازد"""
+    global _app, jsonify, request, make_response
+    if _app is not None:
+        return _app
+    from flask import Flask, jsonify as _jsonify, request as _request, make_response as _make_response
+    jsonify, request, make_response = _jsonify, _request, _make_response
+    init_runtime()
+    flask_app = Flask(__name__)
+    flask_app.before_request(enforce_rate_limit)
+    for rule, view, options in ROUTES:
+        flask_app.add_url_rule(rule, view_func=view, **options)
+    _app = flask_app
+    if ROLE == 'all':
+        start_ingest()
+    return flask_app
+
+def enforce_rate_limit():
+    """token bucket برای هر IP و مسیر؛ در gunicorn چند worker هر پروسه شمارش خودش را دارد"""
+    if request.environ.get(ingest_http.INTERNAL):
+        return      # از worker وب فرستاده شده و همان‌جا شمرده شده است
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    ip = ratelimit.client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    retry_after = rate_limiter.check(ip, rule)
+    if retry_after:
+        response = jsonify({'success': False, 'error': 'rate limited', 'retry_after_sec': round(retry_after, 1)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(int(retry_after + 0.999), 1))
+        return response
+
+def ingest_route(view):
+    """مسیری که وضعیتش فقط در پروسه ingest است؛ در worker وب (gunicorn) همان درخواست به اپ Flask پروسه
+    ingest روی INGEST_HTTP_SOCKET فرستاده می‌شود و پاسخ آن برگردانده می‌شود"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if is_ingest_process():
+            return view(*args, **kwargs)
+        try:
+            status_code, headers, body = ingest_http.forward(request.method, request.full_path, request.headers,
+                                                             request.get_data())
+        except OSError as e:
+            return jsonify({'success': False, 'error': f'ingest process unavailable: {e}'}), 503
+        return _app.response_class(body, status=status_code, headers=headers)
+    return wrapper
 
-@app.route('/')
+def cached_view(view):
+    """پاسخ view برای STATUS_CACHE_TTL ثانیه به ازای هر مسیر+query کش می‌شود؛ درخواست‌های هم‌زمان یک محاسبه را شریک می‌شوند"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        def render():
+            response = make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code, response.headers.get('Content-Type')
+        body, status_code, content_type = status_cache.get_or_compute(request.full_path, render)
+        return _app.response_class(body, status=status_code, content_type=content_type)
+    return wrapper
+
+def __getattr__(name):
+    # سازگاری با `gunicorn main:app`: اپ فقط هنگام اولین دسترسی ساخته می‌شود
+    if name == 'app':
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ======== وضعیت مشترک (ingest در پروسه دیگر) ========
+def get_shared_reader():
+    """اتصال فقط‌خواندنی به بلوک ingest؛ هر 30 ثانیه دوباره attach می‌شود چون ingest ری‌استارت‌شده بلوک تازه می‌سازد"""
+    global shared_reader, shared_reader_checked
+    now_ts = clock.time()
+    if now_ts - shared_reader_checked < (30 if shared_reader is not None else 1):
+        return shared_reader
+    shared_reader_checked = now_ts
+    shared_reader = shared_state.attach_reader() or shared_reader
+    return shared_reader
+
+def is_ingest_process():
+    return shared_writer is not None or ROLE == 'ingest'
+
+def market_snapshot():
+    if is_ingest_process():
+        return market_state
+    reader = get_shared_reader()
+    return reader.read_all() if reader is not None else market_state
+
+def ingest_status():
+    """app_status این پروسه، با وضعیت اتصال از پروسه ingest (در صورت وجود)"""
+    status = dict(app_status)
+    if not is_ingest_process():
+        reader = get_shared_reader()
+        if reader is not None:
+            shared = reader.status()
+            shared.pop('generation', None)
+            status.update(shared)
+            status['ingest'] = 'shared_memory'
+    return status
+
+@route('/')
+@cached_view
 def home():
-    uptime = datetime.now() - app_status['uptime_start']
+    return home_html()
+
+def home_html():
+    app_status = ingest_status()
+    uptime = clock.now() - app_status['uptime_start']
     return f"""
     <h1>🐋 WhalePulse-Pro</h1>
     <p><strong>Status:</strong> {app_status['status']}</p>
@@ -96,52 +359,283 @@ def home():
     <a href="/dashboard">📈 Live Dashboard</a>
     """
 
-@app.route('/health')
-def health():
-    return jsonify({
+def health_payload():
+    app_status = ingest_status()
+    return {
         'status': 'healthy' if app_status['websocket_connected'] else 'unhealthy',
-        'timestamp': datetime.now().isoformat(),
-        'uptime_seconds': (datetime.now() - app_status['uptime_start']).total_seconds()
-    })
+        'timestamp': clock.now().isoformat(),
+        'uptime_seconds': (clock.now() - app_status['uptime_start']).total_seconds()
+    }
 
-@app.route('/status')
-def status():
-    return jsonify({
+@route('/health')
+@cached_view
+def health():
+    return jsonify(health_payload())
+
+def status_payload():
+    app_status = ingest_status()
+    return {
         **app_status,
         'uptime_start': app_status['uptime_start'].isoformat(),
         'symbols': SYMBOLS,
         'telegram_configured': bool(TELEGRAM_TOKEN and TELEGRAM_CHAT_ID),
         'alert_threshold': ALERT_THRESHOLD,
-        'alert_cooldown_sec': ALERT_COOLDOWN
-    })
+        'alert_cooldown_sec': ALERT_COOLDOWN,
+        'connections': [{'exchange': name, **sup.stats()} for (name, _), sup in supervisors.items()],
+        'loop_watchdog': loop_watchdog.stats() if loop_watchdog is not None else None,
+        'tick_bus': {
+            'local': tick_bus.stats(),
+            'remote': bus_server.stats() if bus_server is not None else []
+        },
+        'push': push_hub.stats() if push_hub is not None else None,
+        'http': {
+            'rate_limit': rate_limiter.stats(),
+            'status_cache': status_cache.stats(),
+            'telegram_test': telegram_test_cache.stats(),
+        },
+    }
+
+@route('/status')
+@cached_view
+def status():
+    return jsonify(status_payload())
+
+def run_telegram_test():
+    if test_telegram_bot():
+        send_to_telegram("🧪 Test message from WhalePulse-Pro!")
+        return {'success': True, 'message': 'Telegram test successful!', 'checked_at': clock.now().isoformat()}
+    return {'success': False, 'message': 'Telegram bot test failed', 'checked_at': clock.now().isoformat()}
 
-@app.route('/test')
+@route('/test')
 def test_telegram():
+    """getMe + پیام تست؛ هم‌زمان‌ها یک فراخوانی را شریک می‌شوند و نتیجه TEST_COOLDOWN ثانیه تکرار می‌شود"""
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
     try:
-        result = test_telegram_bot()
-        if result:
-            send_to_telegram("🧪 Test message from WhalePulse-Pro!")
-            return jsonify({'success': True, 'message': 'Telegram test successful!'})
-        else:
-            return jsonify({'success': False, 'message': 'Telegram bot test failed'})
+        return jsonify(telegram_test_cache.get_or_compute('test', run_telegram_test))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/ping')
+@route('/ping')
 def ping():
-    app_status['last_ping'] = datetime.now().isoformat()
+    app_status['last_ping'] = clock.now().isoformat()
     return jsonify({
         'pong': True,
         'timestamp': app_status['last_ping'],
         'status': app_status['status']
     })
 
-@app.route('/api/market')
+@route('/api/market')
 def api_market():
     """وضعیت زنده بازار برای داشبورد"""
-    return jsonify(market_state)
+    return jsonify(market_snapshot())
 
-@app.route('/dashboard')
+@route('/api/bars')
+@ingest_route
+def api_bars():
+    """کندل‌های بسته‌شده از حافظه پروسه ingest: ?symbol=BTCUSDT&interval=1m&limit=100"""
+    symbol = request.args.get('symbol', 'BTCUSDT').upper()
+    interval = request.args.get('interval', '1m')
+    limit = min(int(request.args.get('limit', 100)), 1000)
+    ring = bar_builder.rings.get((symbol, interval))
+    bars = ring.last(limit) if ring is not None else []
+    return jsonify([dict(zip(BAR_COLUMNS, bar)) for bar in bars])
+
+@route('/api/whales')
+@ingest_route
+def api_whales():
+    """آخرین معاملات بزرگ تشخیص‌داده‌شده (نیازمند استریم aggTrade)"""
+    return jsonify({
+        'events': list(whale_detector.recent),
+        'thresholds': {sym: t[0] for sym, t in whale_detector.thresholds.items()}
+    })
+
+@route('/api/correlation')
+@ingest_route
+def api_correlation():
+    """ماتریس همبستگی، قدرت نسبی نسبت به BTCUSDT، بیشترین تغییرها و شکست‌های همبستگی"""
+    engine = correlation_engine
+    if engine is None:
+        return jsonify({'error': 'no data yet' if CORRELATION_ENABLED else 'correlation engine disabled'}), 404
+    return jsonify(engine.summary())
+
+@route('/api/spreads')
+@ingest_route
+def api_spreads():
+    """آخرین قیمت هر نماد در هر صرافی (EXTRA_EXCHANGES)"""
+    return jsonify({
+        'exchanges': ['binance', *venue_managers],
+        'prices': {symbol: {name: {'price': price, 'ts': ts} for name, (price, ts) in prices.items()}
+                   for symbol, prices in venue_prices.items()},
+        'alert_percent': SPREAD_ALERT_PERCENT,
+    })
+
+@route('/api/depth')
+@ingest_route
+def api_depth():
+    """خلاصه دفتر سفارش: ?symbol=BTCUSDT&levels=10 (نیازمند استریم depth)"""
+    symbol = request.args.get('symbol', 'BTCUSDT').upper()
+    levels = min(int(request.args.get('levels', 10)), 100)
+    book = order_books.get(symbol)
+    if book is None:
+        return jsonify({'error': f'no order book for {symbol}'}), 404
+    return jsonify(book.summary(levels))
+
+def _admin_allowed():
+    return not ADMIN_TOKEN or request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+@route('/api/symbols', methods=['GET'])
+@ingest_route
+def api_symbols():
+    return jsonify({'symbols': SYMBOLS, 'connections': stream_manager.snapshot()})
+
+@route('/api/symbols', methods=['POST'])
+@ingest_route
+def api_symbols_update():
+    """بدنه: {"symbols": [...]} برای جایگزینی کامل یا {"add": [...], "remove": [...]}"""
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    body = request.get_json(silent=True) or {}
+    if 'symbols' in body:
+        new_symbols = body['symbols']
+    else:
+        remove = set(s.upper() for s in body.get('remove', []))
+        new_symbols = [s for s in SYMBOLS if s not in remove] + list(body.get('add', []))
+    try:
+        added, removed = request_symbols_change(new_symbols)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'symbols': SYMBOLS, 'added': added, 'removed': removed})
+
+@route('/api/symbols/reload', methods=['POST'])
+@ingest_route
+def api_symbols_reload():
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    old_symbols = list(SYMBOLS)
+    try:
+        cfg = reload_config()
+    except (OSError, ConfigError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    added = [s for s in cfg.binance.symbols if s not in old_symbols]
+    removed = [s for s in old_symbols if s not in cfg.binance.symbols]
+    return jsonify({'success': True, 'symbols': list(cfg.binance.symbols), 'added': added, 'removed': removed})
+
+@route('/api/config')
+@ingest_route
+def api_config():
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    return jsonify({
+        'file': CONFIG_FILE,
+        'symbols': SYMBOLS,
+        'telegram_chats': len(TELEGRAM_CHAT_IDS),
+        'alert_threshold': ALERT_THRESHOLD,
+        'alert_cooldown_sec': ALERT_COOLDOWN,
+        'report_interval_sec': REPORT_INTERVAL,
+        'hourly_report_interval_sec': HOURLY_REPORT_INTERVAL,
+        'report_timezone': tz_label(REPORT_TZ),
+        'min_change_percent': MIN_CHANGE_PERCENT,
+        'min_change_volume': MIN_CHANGE_VOLUME,
+        'csv_file': CSV_FILE,
+        'csv_save_interval_sec': CSV_SAVE_INTERVAL
+    })
+
+@route('/api/export')
+def api_export():
+    """تاریخچه CSV_FILE به صورت جریانی و فشرده: ?symbols=BTCUSDT,ETHUSDT&start=2025-08-14&end=2025-08-15&format=csv.gz|csv
+    دانلود قطع‌شده با Range (و If-Range با ETag پاسخ قبلی) از همان بایت ادامه پیدا می‌کند"""
+    from flask import send_file
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    fmt = request.args.get('format', 'csv.gz')
+    if fmt not in export.FORMATS:
+        return jsonify({'success': False, 'error': f'format must be one of {list(export.FORMATS)}'}), 400
+    try:
+        start = export.parse_time(request.args.get('start'))
+        end = export.parse_time(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    symbols = [s for s in request.args.get('symbols', '').upper().split(',') if s]
+    if not os.path.exists(CSV_FILE):
+        return jsonify({'success': False, 'error': 'no history yet'}), 404
+    export.cleanup()
+    filename = f"market_data_{(start or 'all')[:10]}_{(end or 'now')[:10]}.{fmt}"
+
+    # resume: If-Range به خروجی ذخیره‌شده قبلی اشاره می‌کند حتی اگر CSV از آن موقع بزرگ‌تر شده باشد
+    key = request.headers.get('If-Range', '').strip('"')
+    path = None
+    if request.range is not None and key:
+        path = export.find_spool(key, fmt)
+        params = export.load_params(key, fmt) if path is None else None
+        if params is not None:
+            # دانلود اول قطع شد و فایل کامل ذخیره نشد: همان بایت‌ها با اندازه ذخیره‌شده منبع
+            path = export.build_spool(export.iter_export(**params), key, fmt)
+    if path is None:
+        st = os.stat(CSV_FILE)
+        key = export.export_key(CSV_FILE, symbols, start, end, fmt, st)
+        path = export.find_spool(key, fmt)
+        chunks = export.iter_export(CSV_FILE, symbols, start, end, fmt, st.st_size)
+        if path is None:
+            export.save_params(key, CSV_FILE, symbols, start, end, fmt, st.st_size)
+            if request.range is not None:
+                path = export.build_spool(chunks, key, fmt)
+    if path is not None:
+        return send_file(path, mimetype=export.FORMATS[fmt], as_attachment=True, download_name=filename,
+                         conditional=True, etag=key)
+    # اولین دانلود: جریان chunked از generator و ذخیره هم‌زمان برای Range بعدی
+    return _app.response_class(export.spool(chunks, key, fmt), mimetype=export.FORMATS[fmt], headers={
+        'ETag': f'"{key}"',
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': f'attachment; filename="{filename}"',
+    })
+
+@route('/debug/profile')
+@ingest_route
+def debug_profile():
+    """نمونه‌گیری پشته threadها: ?seconds=10&threads=ingest,... -> collapsed stacks (flamegraph.pl/speedscope)
+    یا ?format=json برای پرهزینه‌ترین توابع"""
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', profiler.PROFILE_INTERVAL))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'seconds/interval must be numbers'}), 400
+    threads = {t for t in request.args.get('threads', '').split(',') if t} or None
+    try:
+        stacks, samples = profiler.sample(seconds, max(interval, 0.001), threads)
+    except profiler.Busy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'samples': samples,
+            'top': [{'frame': frame, 'samples': count} for frame, count in profiler.top_functions(stacks)],
+        })
+    return profiler.format_collapsed(stacks), 200, {
+        'Content-Type': 'text/plain; charset=utf-8',
+        'Content-Disposition': f'attachment; filename="profile-{int(clock.time())}.folded"',
+    }
+
+@route('/debug/memory')
+@ingest_route
+def debug_memory():
+    """RSS، اندازه/سقف بافرها و رشد تخصیص‌ها بر اساس خط کد:
+    ?trace=start|stop (tracemalloc)، ?since=baseline|previous، ?limit=15"""
+    if not _admin_allowed():
+        return jsonify({'success': False, 'error': 'unauthorized'}), 401
+    try:
+        limit = min(int(request.args.get('limit', 15)), 100)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    trace = request.args.get('trace')
+    if trace == 'start':
+        memory_monitor.start_trace()
+    elif trace == 'stop':
+        memory_monitor.stop_trace()
+    return jsonify(memory_monitor.summary(limit, request.args.get('since', 'baseline')))
+
+@route('/dashboard')
 def dashboard():
     """داشبورد وب ساده (بدون نیاز به فایل template)"""
     return """
@@ -177,9 +671,14 @@ def dashboard():
     <tbody id="tbody"></tbody>
   </table>
 <script>
+let state = {};
+let poller = null;
 async function load(){
   const res = await fetch('/api/market');
-  const data = await res.json();
+  state = await res.json();
+  render(state);
+}
+function render(data){
   const tbody = document.getElementById('tbody');
   let html = '';
   const symbols = Object.keys(data).sort();
@@ -199,8 +698,15 @@ async function load(){
   tbody.innerHTML = html || '<tr><td colspan="5" class="muted">Waiting for data...</td></tr>';
   document.getElementById('meta').textContent = `Symbols: ${symbols.join(', ')}`;
 }
-load();
-setInterval(load, 3000);
+function poll(){ if(!poller){ load(); poller = setInterval(load, 3000); } }
+// فید push (سرور ASGI)؛ اگر در دسترس نباشد به polling برمی‌گردد
+if(window.EventSource){
+  const es = new EventSource('/stream');
+  es.onmessage = (e) => { Object.assign(state, JSON.parse(e.data)); render(state); };
+  es.onerror = () => { es.close(); poll(); };
+} else {
+  poll();
+}
 </script>
 </body>
 </html>
@@ -208,6 +714,7 @@ setInterval(load, 3000);
 
 # ======== Telegram Functions ========
 def test_telegram_bot():
+    import requests
     try:
         url = f'https://api.telegram.org/bot{TELEGRAM_TOKEN}/getMe'
         response = requests.get(url, timeout=10)
@@ -222,20 +729,33 @@ def test_telegram_bot():
         logger.error(f"❌ Bot test exception: {e}")
         return False
 
-@tenacity.retry(
-    stop=tenacity.stop_after_attempt(RETRY_ATTEMPTS),
-    wait=tenacity.wait_fixed(RETRY_DELAY),
-    retry=tenacity.retry_if_exception_type(Exception),
-    before_sleep=lambda r: logger.warning(f"Retrying Telegram (attempt {r.attempt_number})...")
-)
 def send_to_telegram(message: str):
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
+    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_IDS:
         logger.warning('⚠️ Telegram token or chat id not configured.')
         return False
-    
+    sent = False
+    for chat_id in list(TELEGRAM_CHAT_IDS):
+        sent = send_to_telegram_chat(chat_id, message) or sent
+    return sent
+
+def retrying(what):
+    """همان سیاست tenacity قبلی (3 تلاش، 5 ثانیه) با import تنبل"""
+    import tenacity
+    return tenacity.Retrying(
+        stop=tenacity.stop_after_attempt(RETRY_ATTEMPTS),
+        wait=tenacity.wait_fixed(RETRY_DELAY),
+        retry=tenacity.retry_if_exception_type(Exception),
+        before_sleep=lambda r: logger.warning(f"Retrying {what} (attempt {r.attempt_number})...")
+    )
+
+def send_to_telegram_chat(chat_id, message: str):
+    return retrying('Telegram')(_send_to_telegram_chat, chat_id, message)
+
+def _send_to_telegram_chat(chat_id, message: str):
+    import requests
     url = f'https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage'
     payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
+        'chat_id': chat_id,
         'text': message,
         'parse_mode': 'HTML',
         'disable_web_page_preview': True
@@ -243,7 +763,7 @@ def send_to_telegram(message: str):
     try:
         response = requests.post(url, json=payload, timeout=10)
         if response.status_code == 200:
-            app_status['last_telegram_send'] = datetime.now().isoformat()
+            app_status['last_telegram_send'] = clock.now().isoformat()
             logger.info('✅ پیام تلگرام ارسال شد.')
             return True
         else:
@@ -255,28 +775,44 @@ def send_to_telegram(message: str):
         raise
 
 # ======== ابزارها ========
+SYMBOL_NAMES = {
+    'BTCUSDT': {'name': '₿ Bitcoin', 'emoji': '₿'},
+    'ETHUSDT': {'name': '⟠ Ethereum', 'emoji': '⟠'},
+    'SOLUSDT': {'name': '◎ Solana', 'emoji': '◎'},
+    'XRPUSDT': {'name': '⨯ Ripple', 'emoji': '⨯'},
+    'ADAUSDT': {'name': '₳ Cardano', 'emoji': '₳'}
+}
+
 def get_symbol_info(symbol):
-    mapping = {
-        'BTCUSDT': {'name': '₿ Bitcoin', 'emoji': '₿'},
-        'ETHUSDT': {'name': '⟠ Ethereum', 'emoji': '⟠'},
-        'SOLUSDT': {'name': '◎ Solana', 'emoji': '◎'},
-        'XRPUSDT': {'name': '⨯ Ripple', 'emoji': '⨯'},
-        'ADAUSDT': {'name': '₳ Cardano', 'emoji': '₳'}
-    }
-    return mapping.get(symbol, {'name': symbol, 'emoji': '💰'})
+    info = SYMBOL_NAMES.get(symbol)
+    if info:
+        return info
+    meta = symbol_registry.get(symbol)
+    if meta is not None and meta.base:
+        return {'name': f'{meta.base}/{meta.quote}', 'emoji': '💰'}
+    return {'name': symbol, 'emoji': '💰'}
 
 def format_price(symbol, price):
+    meta = symbol_registry.get(symbol)
+    if meta is not None and meta.status != 'UNKNOWN':
+        # دقت بر اساس tickSize صرافی؛ برای قیمت‌های بزرگ اعشار اضافه حذف می‌شود
+        decimals = 0 if price >= 1000 else meta.price_decimals
+        return f"${price:,.{decimals}f}"
     if symbol in ['BTCUSDT', 'ETHUSDT']:
         return f"${price:,.0f}"
     elif symbol in ['SOLUSDT', 'ADAUSDT', 'XRPUSDT']:
         return f"${price:.2f}"
     return f"${price:.4f}"
 
-def build_report_message(data):
-    now_str = (datetime.now() + timedelta(hours=3.5)).strftime('%Y-%m-%d %H:%M:%S')
-    header = f"🐋 <b>WhalePulse-Pro Market Report</b>\n⏰ {now_str} (+03:30)\n\n"
+def build_report_message(data, symbols=None):
+    """symbols: فقط همین نمادها (گزارش تغییرات)؛ None یعنی همه"""
+    now_str = clock.now(REPORT_TZ).strftime('%Y-%m-%d %H:%M:%S')
+    changed = f" | {len(symbols)}/{len(data)} changed" if symbols is not None else ""
+    header = f"🐋 <b>WhalePulse-Pro Market Report</b>\n⏰ {now_str} ({tz_label(REPORT_TZ)}){changed}\n\n"
     sections = []
     for sym, vals in data.items():
+        if symbols is not None and sym not in symbols:
+            continue
         info = get_symbol_info(sym)
         arrow = "📈" if vals['price_change_percent'] >= 0 else "📉"
         percent_str = f"{vals['price_change_percent']:+.2f}%"
@@ -287,29 +823,51 @@ def build_report_message(data):
             f"{arrow} {percent_str}\n"
         )
     footer = "\n🤖 <i>WhalePulse-Pro | Market Intelligence</i>"
-    message = header + "\n".join(sections) + footer
+    message = header + "\n".join(sections) + build_correlation_section() + footer
     if len(message) > 4000:
         message = message[:3900] + "...\n\n📝 <i>Message truncated</i>"
     return message
 
-def should_send_report(new_data):
-    global last_report_data
-    if not last_report_data:
-        return True
-    for sym, vals in new_data.items():
-        last_vals = last_report_data.get(sym)
-        if not last_vals:
-            return True
-        price_diff = abs(vals['price_change_percent'] - last_vals['price_change_percent'])
-        if price_diff >= MIN_CHANGE_PERCENT:
-            logger.info(f"Price change detected for {sym}: {price_diff:.2f}%")
-            return True
-        if last_vals['volume'] > 0:
-            volume_diff = abs(vals['volume'] - last_vals['volume']) / last_vals['volume']
-            if volume_diff >= MIN_CHANGE_VOLUME:
-                logger.info(f"Volume change detected for {sym}: {volume_diff:.2%}")
-                return True
-    return False
+def build_correlation_section():
+    """بخش قدرت نسبی/همبستگی نسبت به BTC برای گزارش (اگر داده کافی باشد)"""
+    engine = correlation_engine
+    if engine is None or not engine.ready:
+        return ""
+    window_min = engine.short.count * engine.bucket // 60
+    lines = [f"\n🔗 <b>vs {engine.benchmark}</b> (last {window_min}m)"]
+    for sym, rs in engine.relative_strength().items():
+        if sym == engine.benchmark:
+            continue
+        corr = f"{rs['corr']:+.2f}" if rs['corr'] is not None else "n/a"
+        lines.append(f"{get_symbol_info(sym)['emoji']} {sym}: {rs['vs_benchmark_pct']:+.2f}% | ρ {corr}")
+    movers = engine.top_movers(1)
+    if movers['gainers'] and movers['losers']:
+        lines.append(f"🏆 {movers['gainers'][0][0]} {movers['gainers'][0][1]:+.2f}% | "
+                     f"🥶 {movers['losers'][0][0]} {movers['losers'][0][1]:+.2f}%")
+    for brk in engine.correlation_breaks()[:3]:
+        lines.append(f"⚡ {brk['pair'][0]}/{brk['pair'][1]}: ρ {brk['baseline']:+.2f} → {brk['now']:+.2f}")
+    return "\n".join(lines) + "\n"
+
+def mark_report_dirty(sym, vals):
+    """در به‌روزرسانی وضعیت صدا زده می‌شود: O(1) برای هر تیک به جای مقایسه همه نمادها در هر بررسی"""
+    if sym in report_dirty:
+        return
+    last_vals = last_report_data.get(sym)
+    if not last_vals:
+        report_dirty.add(sym)
+        return
+    price_diff = abs(vals['price_change_percent'] - last_vals['price_change_percent'])
+    if price_diff >= MIN_CHANGE_PERCENT:
+        logger.info(f"Price change detected for {sym}: {price_diff:.2f}%")
+        report_dirty.add(sym)
+    elif last_vals['volume'] > 0:
+        volume_diff = abs(vals['volume'] - last_vals['volume']) / last_vals['volume']
+        if volume_diff >= MIN_CHANGE_VOLUME:
+            logger.info(f"Volume change detected for {sym}: {volume_diff:.2%}")
+            report_dirty.add(sym)
+
+def should_send_report():
+    return bool(report_dirty)
 
 def ensure_csv_header():
     if not os.path.exists(CSV_FILE):
@@ -321,7 +879,7 @@ def append_csv_row(symbol, price, volume, change_percent):
     ensure_csv_header()
     with open(CSV_FILE, 'a', newline='', encoding='utf-8') as f:
         w = csv.writer(f)
-        w.writerow([datetime.now().isoformat(), symbol, price, volume, change_percent])
+        w.writerow([clock.now().isoformat(), symbol, price, volume, change_percent])
 
 def maybe_save_csv(symbol, price, volume, change_percent, now_ts):
     last = last_csv_write.get(symbol, 0)
@@ -338,15 +896,148 @@ def maybe_alert(symbol, price, change_percent, now_ts):
             send_to_telegram(msg)
             last_alert_time[symbol] = now_ts
 
+def send_alert_nonblocking(msg):
+    """روی حلقه ingest ارسال تلگرام را به thread pool می‌سپارد تا پردازش معاملات متوقف نشود"""
+    def _send():
+        try:
+            send_to_telegram(msg)
+        except Exception as e:
+            logger.error(f"❌ Alert send error: {e}")
+    loop = ingest_loop
+    if loop is not None and loop.is_running():
+        loop.run_in_executor(None, _send)
+    else:
+        _send()
+
+def maybe_whale_alert(event):
+    symbol = event['symbol']
+    if event['ts'] - last_whale_alert.get(symbol, 0) < WHALE_COOLDOWN:
+        return
+    last_whale_alert[symbol] = event['ts']
+    side_icon = '🟢 BUY' if event['side'] == 'BUY' else '🔴 SELL'
+    threshold = f" (p{whale_detector.percentile * 100:g} ≥ ${event['threshold']:,.0f})" if event['threshold'] else ''
+    msg = (f"🐋 <b>WHALE</b> {side_icon} {symbol}\n"
+           f"💰 ${event['notional']:,.0f}{threshold}\n"
+           f"💵 Price: {format_price(symbol, event['price'])}")
+    send_alert_nonblocking(msg)
+
+# ======== دفتر سفارش ========
+def on_depth_event(symbol, data):
+    book = order_books.get(symbol)
+    if book is None:
+        book = order_books[symbol] = LocalOrderBook(symbol)
+        request_depth_snapshot(book)
+    if not book.on_diff(data):
+        logger.warning("⚠️ Depth sequence gap for %s (last %s, got %s-%s); resyncing",
+                       symbol, book.last_update_id, data['U'], data['u'], extra={'symbol': symbol})
+        book.reset()
+        book.on_diff(data)
+        request_depth_snapshot(book)
+        return
+    if book.synced:
+        maybe_depth_alert(book, data.get('E', 0) / 1000.0 or clock.time())
+
+def request_depth_snapshot(book, delay=0):
+    """دریافت snapshot در thread pool؛ diffها تا آن موقع در بافر دفتر می‌مانند"""
+    loop = ingest_loop
+    if loop is None or book.symbol in depth_snapshot_pending:
+        return
+    depth_snapshot_pending.add(book.symbol)
+
+    async def _fetch():
+        retry = None
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            snap = await loop.run_in_executor(None, fetch_depth_snapshot, book.symbol)
+            if order_books.get(book.symbol) is not book:
+                return
+            if book.apply_snapshot(snap):
+                logger.info(f"📚 Order book synced: {book.symbol} @ {book.last_update_id}")
+            else:
+                book.reset()
+                retry = 1
+        except Exception as e:
+            logger.error(f"❌ Depth snapshot error for {book.symbol}: {e}")
+            retry = 5
+        finally:
+            depth_snapshot_pending.discard(book.symbol)
+        if retry:
+            request_depth_snapshot(book, delay=retry)
+    loop.create_task(_fetch())
+
+def maybe_depth_alert(book, now_ts):
+    symbol = book.symbol
+    if now_ts - last_depth_check.get(symbol, 0) < 1.0:   # حداکثر یکبار در ثانیه برای هر نماد
+        return
+    last_depth_check[symbol] = now_ts
+    imbalance = book.imbalance(DEPTH_LEVELS)
+    if abs(imbalance) >= DEPTH_IMBALANCE_ALERT and now_ts - last_depth_alert.get((symbol, 'imbalance'), 0) >= DEPTH_ALERT_COOLDOWN:
+        last_depth_alert[(symbol, 'imbalance')] = now_ts
+        side = '🟢 bids' if imbalance > 0 else '🔴 asks'
+        send_alert_nonblocking(f"⚖️ <b>BOOK IMBALANCE</b> {symbol}: {imbalance:+.0%} toward {side} (top {DEPTH_LEVELS} levels)")
+    for wall in book.walls():
+        key = (symbol, f"wall:{wall['side']}:{wall['price']}")
+        if now_ts - last_depth_alert.get(key, 0) < DEPTH_ALERT_COOLDOWN:
+            continue
+        last_depth_alert[key] = now_ts
+        send_alert_nonblocking(f"🧱 <b>{wall['side'].upper()} WALL</b> {symbol}\n"
+                               f"💵 {format_price(symbol, wall['price'])} × {wall['qty']:,.4g} = ${wall['notional']:,.0f}")
+
+# ======== مدیریت نمادها در زمان اجرا ========
+def apply_symbols(new_symbols):
+    """تغییر تدریجی مجموعه نمادها؛ فقط روی حلقه رویداد WebSocket اجرا می‌شود"""
+    added = [s for s in new_symbols if s not in SYMBOLS]
+    removed = [s for s in SYMBOLS if s not in new_symbols]
+    if not added and not removed:
+        return added, removed
+    SYMBOLS[:] = new_symbols
+    for sym in removed:
+        market_state.pop(sym, None)
+        if shared_writer is not None:
+            shared_writer.clear(symbol_registry.id_of(sym))
+        symbol_registry.remove(sym)     # id برای نماد بعدی آزاد می‌شود
+        current_data.pop(sym, None)
+        bar_builder.drop_symbol(sym)
+        whale_detector.drop_symbol(sym)
+        order_books.pop(sym, None)
+        venue_prices.pop(sym, None)
+        last_whale_alert.pop(sym, None)
+        last_report_data.pop(sym, None)
+        report_dirty.discard(sym)
+        last_alert_time.pop(sym, None)
+        last_csv_write.pop(sym, None)
+        last_spread_alert.pop(sym, None)
+        last_depth_check.pop(sym, None)
+        depth_snapshot_pending.discard(sym)
+        for key in [k for k in last_depth_alert if k[0] == sym]:
+            del last_depth_alert[key]
+    for sym in added:
+        symbol_registry.ensure(sym)
+    stream_manager.set_symbols(SYMBOLS)
+    for manager in venue_managers.values():
+        manager.set_symbols(SYMBOLS)
+    if correlation_engine is not None:
+        correlation_engine.set_symbols(SYMBOLS)
+    logger.info(f"🔁 Symbols updated: +{added} -{removed}")
+    return added, removed
+
+def request_symbols_change(symbols):
+    """از هر thread قابل فراخوانی است؛ تغییر روی حلقه ingest اعمال می‌شود"""
+    new_symbols = normalize_symbols(symbols)
+    added = [s for s in new_symbols if s not in SYMBOLS]
+    removed = [s for s in SYMBOLS if s not in new_symbols]
+    call_in_ingest_loop(apply_symbols, new_symbols)
+    return added, removed
+
 # ======== WebSocket Handler ========
-@tenacity.retry(
-    stop=tenacity.stop_after_attempt(RETRY_ATTEMPTS),
-    wait=tenacity.wait_fixed(RETRY_DELAY),
-    retry=tenacity.retry_if_exception_type(Exception),
-    before_sleep=lambda r: logger.warning(f"Retrying WebSocket (attempt {r.attempt_number})...")
-)
-async def connect_and_run(uri):
-    global last_report_time, last_hourly_report_time, last_report_data
+async def _connect_and_run(manager, conn, sup):
+    import websockets
+    if conn.closed:
+        return
+    adapter = manager.adapter
+    streams = manager.initial_streams(conn)
+    uri = manager.url_for(conn)
     logger.info(f'🔌 Connecting to {uri}')
     async with websockets.connect(
         uri,
@@ -355,91 +1046,412 @@ async def connect_and_run(uri):
         max_size=None,
         close_timeout=5
     ) as ws:
-        app_status['websocket_connected'] = True
-        app_status['status'] = 'running'
-        logger.info('✅ WebSocket connected successfully')
-        current_data = {}
+        logger.info(f'✅ WebSocket connected successfully ({adapter.name} connection #{conn.index})')
+        await manager.attach(conn, ws, streams)
+        sup.connected(ws)
+        heartbeat = asyncio.ensure_future(send_heartbeats(ws, adapter)) if adapter.heartbeat else None
         message_count = 0
 
-        async for message in ws:
-            try:
+        try:
+            async for message in ws:
                 message_count += 1
-                app_status['messages_processed'] += 1
-                app_status['last_message_time'] = datetime.now().isoformat()
-
-                msg = json.loads(message)
-                data = msg.get('data') or msg  # multi-stream: {'stream':..., 'data': {...}}
-                if not isinstance(data, dict) or data.get('e') != '24hrTicker':
-                    continue
-
-                symbol = data.get('s')
-                if symbol not in SYMBOLS:
-                    continue
-
-                volume = float(data.get('v', 0))
-                price = float(data.get('c', 0))
-                price_change_percent = float(data.get('P', 0))
-                now_ts = time.time()
-
-                # بروزرسانی وضعیت سراسری بازار برای داشبورد
-                market_state[symbol] = {
-                    'price': price,
-                    'volume': volume,
-                    'price_change_percent': price_change_percent,
-                    'updated_at': datetime.now().isoformat()
-                }
-
-                # داده برای گزارش‌های دوره‌ای
-                current_data[symbol] = {
-                    'volume': volume,
-                    'price': price,
-                    'price_change_percent': price_change_percent
-                }
-
-                # CSV (نمونه‌برداری دوره‌ای برای هر نماد)
-                maybe_save_csv(symbol, price, volume, price_change_percent, now_ts)
-
-                # هشدار درصدی با کول‌داون
-                maybe_alert(symbol, price, price_change_percent, now_ts)
-
-                # گزارش‌های دوره‌ای
-                if len(current_data) >= len(SYMBOLS):
-                    if now_ts - last_report_time >= REPORT_INTERVAL and should_send_report(current_data):
-                        try:
-                            message_text = build_report_message(current_data)
-                            if send_to_telegram(message_text):
-                                last_report_data = current_data.copy()
-                                last_report_time = now_ts
-                                logger.info("📊 گزارش 15 دقیقه ارسال شد")
-                        except Exception as e:
-                            logger.error(f"❌ Error sending 15min report: {e}")
-
-                    if now_ts - last_hourly_report_time >= HOURLY_REPORT_INTERVAL:
-                        try:
-                            logger.info("📊 ارسال گزارش ساعتی...")
-                            message_text = build_report_message(current_data)
-                            send_to_telegram(message_text)
-                            last_hourly_report_time = now_ts
-                            logger.info("✅ گزارش ساعتی ارسال شد")
-                        except Exception as e:
-                            logger.error(f"❌ Error sending hourly report: {e}")
-
-                if message_count % 200 == 0:
-                    logger.info(f"Processed {message_count} WS messages. Symbols tracked: {len(current_data)}")
-
-            except json.JSONDecodeError as e:
-                logger.warning(f'JSON decode error: {e}')
-            except Exception as e:
-                logger.error(f'❌ Error processing WS message: {e}')
+                if not sup.on_message(ws):
+                    break       # در چرخش جایگزین شد
+                if manager is stream_manager:
+                    handle_message(message, message_count)
+                else:
+                    handle_venue_message(adapter, message)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            manager.detach(conn, ws)
+
+async def send_heartbeats(ws, adapter):
+    while True:
+        await asyncio.sleep(adapter.heartbeat_interval)
+        await ws.send(adapter.heartbeat)
+
+def handle_venue_message(adapter, message):
+    """صرافی‌های اضافه: فقط تیکر نرمال‌شده وارد tick_bus می‌شود"""
+    try:
+        msg = json.loads(message)
+        if adapter.is_control(msg):
+            if msg.get('success') is False:
+                logger.error("❌ %s control error: %s", adapter.name, msg.get('ret_msg', msg),
+                             extra={'exchange': adapter.name})
+            return
+        tick = adapter.normalize(msg, clock.time())
+        if tick is not None and tick.symbol in SYMBOLS:
+            tick_bus.publish(tick)
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error("❌ %s message error: %s", adapter.name, e, extra={'exchange': adapter.name})
+
+def handle_message(message, message_count):
+    global last_ws_tick
+    try:
+        app_status['messages_processed'] += 1
+        app_status['last_message_time'] = clock.now().isoformat()
+
+        msg = json.loads(message)
+        if stream_manager.adapter.is_control(msg):
+            # پاسخ SUBSCRIBE/UNSUBSCRIBE
+            if msg.get('error'):
+                logger.error("❌ Stream control error: %s", msg['error'])
+            return
+        data = msg.get('data') or msg  # multi-stream: {'stream':..., 'data': {...}}
+        if not isinstance(data, dict):
+            return
+        event = data.get('e')
+        symbol = data.get('s')
+        if symbol not in SYMBOLS:
+            return
+        if event == 'aggTrade':
+            price, qty, trade_ts = float(data['p']), float(data['q']), data['T'] / 1000.0
+            bar_builder.on_trade(symbol, price, qty, trade_ts)
+            whale = whale_detector.on_trade(symbol, price, qty, trade_ts, data.get('m', False))
+            if whale is not None:
+                maybe_whale_alert(whale)
+            return
+        if event == 'depthUpdate':
+            on_depth_event(symbol, data)
+            return
+        if event == 'kline':
+            bar_builder.on_kline(symbol, data['k'])
+            return
+        tick = stream_manager.adapter.normalize(data, clock.time())
+        if tick is None:
+            return
+        last_ws_tick = tick.ts
+        tick_bus.publish(tick)
+        if 'E' in data:
+            # زمان رویداد صرافی تا پایان پردازش تیک (شبکه + صف + مصرف‌کننده‌ها)، میانگین نمایی
+            lag = (clock.time() - data['E'] / 1000.0) * 1000
+            app_status['ingest_lag_ms'] += INGEST_LAG_ALPHA * (lag - app_status['ingest_lag_ms'])
+
+        if message_count % 200 == 0:
+            logger.info("Processed %d WS messages. Symbols tracked: %d", message_count, len(current_data),
+                        extra={'messages': message_count})
+
+    except json.JSONDecodeError as e:
+        logger.warning('JSON decode error: %s', e)
+    except Exception as e:
+        logger.error('❌ Error processing WS message: %s', e)
+
+# ======== مصرف‌کننده‌های اصلی تیک (به ترتیب روی tick_bus) ========
+def update_market_state(tick):
+    # بروزرسانی وضعیت سراسری بازار برای داشبورد
+    market_state[tick.symbol] = {
+        'price': tick.price,
+        'volume': tick.volume,
+        'price_change_percent': tick.price_change_percent,
+        'updated_at': clock.now().isoformat()
+    }
+    publish_shared(tick.symbol, tick.price, tick.volume, tick.price_change_percent, tick.ts)
+
+    # داده برای گزارش‌های دوره‌ای
+    vals = current_data[tick.symbol] = {
+        'volume': tick.volume,
+        'price': tick.price,
+        'price_change_percent': tick.price_change_percent
+    }
+    mark_report_dirty(tick.symbol, vals)
+
+def save_csv_consumer(tick):
+    # CSV (نمونه‌برداری دوره‌ای برای هر نماد)
+    maybe_save_csv(tick.symbol, tick.price, tick.volume, tick.price_change_percent, tick.ts)
+
+def alert_consumer(tick):
+    # هشدار درصدی با کول‌داون
+    maybe_alert(tick.symbol, tick.price, tick.price_change_percent, tick.ts)
+
+def report_consumer(tick):
+    global last_report_time, last_hourly_report_time
+    now_ts = tick.ts
+    # گزارش‌های دوره‌ای
+    if len(current_data) < len(SYMBOLS):
+        return
+    if now_ts - last_report_time >= REPORT_INTERVAL and should_send_report():
+        try:
+            changed = set(report_dirty)
+            message_text = build_report_message(current_data, changed)
+            if send_to_telegram(message_text):
+                for sym in changed:
+                    last_report_data[sym] = current_data[sym]
+                report_dirty.difference_update(changed)
+                last_report_time = now_ts
+                logger.info("📊 گزارش 15 دقیقه ارسال شد")
+        except Exception as e:
+            logger.error(f"❌ Error sending 15min report: {e}")
+
+    if now_ts - last_hourly_report_time >= HOURLY_REPORT_INTERVAL:
+        try:
+            logger.info("📊 ارسال گزارش ساعتی...")
+            message_text = build_report_message(current_data)
+            send_to_telegram(message_text)
+            last_hourly_report_time = now_ts
+            logger.info("✅ گزارش ساعتی ارسال شد")
+        except Exception as e:
+            logger.error(f"❌ Error sending hourly report: {e}")
+
+def bus_server_consumer(tick):
+    if bus_server is not None:
+        bus_server.publish(tick)
+
+def spread_consumer(tick):
+    """آخرین قیمت هر صرافی و هشدار اسپرد وقتی اختلاف از SPREAD_ALERT_PERCENT بیشتر شود"""
+    prices = venue_prices.setdefault(tick.symbol, {})
+    prices[EXCHANGES[tick.exchange]] = (tick.price, tick.ts)
+    if len(prices) < 2:
+        return
+    fresh = [(price, name) for name, (price, ts) in prices.items() if tick.ts - ts <= SPREAD_MAX_AGE and price > 0]
+    if len(fresh) < 2:
+        return
+    low, high = min(fresh), max(fresh)
+    spread = (high[0] - low[0]) / low[0] * 100
+    if spread < SPREAD_ALERT_PERCENT or tick.ts - last_spread_alert.get(tick.symbol, 0) < SPREAD_ALERT_COOLDOWN:
+        return
+    last_spread_alert[tick.symbol] = tick.ts
+    send_alert_nonblocking(f"🔀 <b>SPREAD</b> {tick.symbol}: {spread:.2f}%\n"
+                           f"🟢 {low[1]} {format_price(tick.symbol, low[0])} → 🔴 {high[1]} {format_price(tick.symbol, high[0])}")
+
+def get_correlation_engine():
+    global correlation_engine, CORRELATION_ENABLED
+    if correlation_engine is None and CORRELATION_ENABLED:
+        try:
+            from correlation import CorrelationEngine
+        except ImportError as e:
+            CORRELATION_ENABLED = False
+            logger.warning(f"⚠️ Correlation engine disabled: {e}")
+            return None
+        correlation_engine = CorrelationEngine(SYMBOLS)
+    return correlation_engine
+
+def correlation_consumer(tick):
+    engine = get_correlation_engine()
+    if engine is not None:
+        engine.on_tick(tick.symbol, tick.price, tick.ts)
+
+def primary_only(handler):
+    """مصرف‌کننده‌های وضعیت/CSV/هشدار/گزارش فقط تیک بایننس را می‌بینند"""
+    def wrapper(tick):
+        if tick.exchange == BINANCE:
+            handler(tick)
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+# ======== HTTP غیرهمزمان (ASGI روی حلقه ingest) ========
+push_hub = None
+
+def push_consumer(tick):
+    if push_hub is not None:
+        push_hub.mark(tick.symbol)
+
+def asgi_routes():
+    """همان پاسخ‌های Flask، مستقیم روی حلقه ingest (بدون قفل یا تحویل بین threadها)"""
+    return {
+        '/': lambda query: home_html(),
+        '/health': lambda query: health_payload(),
+        '/status': lambda query: status_payload(),
+        '/api/market': lambda query: market_snapshot(),
+        '/dashboard': lambda query: dashboard(),
+    }
+
+async def start_asgi_server():
+    global push_hub
+    push_hub = asgi.PushHub(market_snapshot)
+    push_task = asyncio.ensure_future(push_hub.run())
+    try:
+        # همان محدودیت نرخ و کش پاسخ مسیرهای Flask (cached_view)
+        await asgi.serve(asgi.AsgiApp(asgi_routes(), push_hub, limiter=rate_limiter, cache=status_cache,
+                                      cached=('/', '/health', '/status')))
+    finally:
+        push_task.cancel()
+        push_hub = None
+
+# مسیر اصلی؛ مصرف‌کننده‌های اضافه با tick_bus.subscribe(...) یا از طریق BUS_SOCKET وصل می‌شوند
+tick_bus = TickBus()
+for _handler in (update_market_state, correlation_consumer, save_csv_consumer, alert_consumer, report_consumer,
+                 push_consumer):
+    tick_bus.add_handler(primary_only(_handler))
+tick_bus.add_handler(bus_server_consumer)
+if venue_managers:
+    tick_bus.add_handler(spread_consumer)
+
+# ======== کندل‌ها (aggTrade / kline) ========
+bar_builder = BarBuilder()
+bar_store = BarStore()
+bar_builder.listeners.append(bar_store.on_close)
+
+async def bars_flush_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(5)
+        bar_builder.flush_idle(clock.time())
+        try:
+            await loop.run_in_executor(None, bar_store.flush)
+        except Exception as e:
+            logger.error(f"❌ Bar store flush error: {e}")
+
+# ======== بودجه حافظه ========
+# وضعیت هر نماد (market_state، order_books، venue_prices، whale_digests، bar_rings) سقف جدا ندارد:
+# فقط برای نمادهای SYMBOLS نوشته و در apply_symbols پاک می‌شود؛ کلیدهای دیگر BoundedDict هستند.
+memory_monitor = memory.MemoryMonitor()
+for _name, _obj in (('market_state', market_state), ('current_data', current_data),
+                    ('last_report_data', lambda: len(last_report_data)),
+                    ('last_alert_time', last_alert_time), ('last_csv_write', last_csv_write),
+                    ('last_whale_alert', last_whale_alert), ('last_depth_check', last_depth_check),
+                    ('last_depth_alert', last_depth_alert), ('last_spread_alert', last_spread_alert),
+                    ('order_books', order_books), ('venue_prices', venue_prices),
+                    ('whale_events', whale_detector.recent), ('whale_digests', whale_detector.digests),
+                    ('bar_rings', bar_builder.rings), ('bar_store_pending', lambda: len(bar_store.pending)),
+                    ('bus_queues', lambda: sum(len(s.queue) for s in tick_bus.subscriptions))):
+    memory_monitor.register(_name, _obj)
+memory_monitor.register('symbol_ids', lambda: symbol_registry.id_span, shared_state.SHARED_STATE_CAPACITY)
+
+async def memory_loop():
+    while True:
+        memory_monitor.sample()
+        await asyncio.sleep(memory.MEMORY_SAMPLE_INTERVAL)
+
+async def start_bus_server():
+    global bus_server
+    if not BUS_SOCKET:
+        return
+    try:
+        bus_server = await BusServer(BUS_SOCKET).start()
+        atexit.register(bus_server.close)
+    except OSError as e:
+        logger.error(f"❌ Tick bus socket unavailable: {e}")
+
+# ======== Warm start ========
+def collect_state():
+    return {
+        'last_report_time': last_report_time,
+        'last_hourly_report_time': last_hourly_report_time,
+        'last_report_data': last_report_data,
+        'current_data': current_data,
+        'market_state': market_state,
+        # marshal زیرکلاس dict را نمی‌پذیرد
+        'last_alert_time': dict(last_alert_time),
+        'last_csv_write': dict(last_csv_write),
+    }
+
+def restore_state(state):
+    """بازگردانی وضعیت قبل از اتصال WebSocket؛ فقط نمادهای فعلی"""
+    global last_report_time, last_hourly_report_time, last_report_data
+    keep = lambda d: {k: v for k, v in (d or {}).items() if k in SYMBOLS}
+    last_report_time = state.get('last_report_time', 0)
+    last_hourly_report_time = state.get('last_hourly_report_time', 0)
+    last_report_data = keep(state.get('last_report_data'))
+    current_data.update(keep(state.get('current_data')))
+    market_state.update(keep(state.get('market_state')))
+    last_alert_time.update(keep(state.get('last_alert_time')))
+    last_csv_write.update(keep(state.get('last_csv_write')))
+
+def init_warm_start():
+    loaded = snapshot.load_snapshot(SNAPSHOT_FILE)
+    if loaded is None:
+        return
+    saved_at, state = loaded
+    try:
+        restore_state(state)
+    except Exception as e:
+        logger.error(f"❌ Snapshot restore error: {e}")
+        return
+    app_status['warm_start_from'] = datetime.fromtimestamp(saved_at).isoformat()
+    logger.info(f"♻️ Warm start: {len(market_state)} symbols restored (snapshot age {time.time() - saved_at:.0f}s)")
+
+def persist_state():
+    try:
+        size = snapshot.save_snapshot(collect_state(), SNAPSHOT_FILE)
+        app_status['last_snapshot'] = clock.now().isoformat()
+        return size
+    except Exception as e:
+        logger.error(f"❌ Snapshot save error: {e}")
+
+async def snapshot_loop():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        persist_state()
 
 # ======== WebSocket Loop ========
-def build_stream_path(symbols):
-    parts = [s.lower() + '@ticker' for s in symbols]
-    return f'{BINANCE_WS_BASE}{"/".join(parts)}'
+def on_connection_state(sup):
+    connected = any(c.ws is not None for c in stream_manager.connections)
+    app_status['websocket_connected'] = connected
+    app_status['status'] = 'running' if connected else f'reconnecting_attempt_{sup.attempts}'
+    if shared_writer is not None:
+        shared_writer.set_connected(connected)
 
-async def watcher_loop():
-    uri = build_stream_path(SYMBOLS)
+async def connection_loop(manager, conn):
+    """هر اتصال یک supervisor دارد؛ current_data و دفترهای سفارش بین اتصال‌ها حفظ می‌شوند"""
+    key = (manager.adapter.name, conn.index)
+    on_change = on_connection_state if manager is stream_manager else None
+    sup = supervisors[key] = ConnectionSupervisor(conn, partial(_connect_and_run, manager), on_change)
+    try:
+        await sup.run()
+    finally:
+        supervisors.pop(key, None)
+
+# ======== REST fallback ========
+def websocket_stale(now_ts):
+    connected = any(c.ws is not None for c in stream_manager.connections)
+    return not connected or now_ts - last_ws_tick > FALLBACK_STALE_AFTER
+
+def publish_rest_tickers(tickers, now_ts):
+    for symbol, ticker in tickers.items():
+        if symbol not in SYMBOLS:
+            continue
+        tick_bus.publish(Tick(
+            symbol,
+            float(ticker['lastPrice']),
+            float(ticker['volume']),
+            float(ticker['priceChangePercent']),
+            now_ts
+        ))
+
+async def rest_fallback_loop():
+    """وقتی WebSocket قطع یا بی‌داده است، قیمت‌ها را از REST می‌گیرد و به همان tick_bus می‌دهد"""
+    from concurrent.futures import ThreadPoolExecutor
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=FALLBACK_WORKERS, thread_name_prefix='rest-fallback')
+    # مهلت اولیه برای اتصال WebSocket
+    await asyncio.sleep(FALLBACK_STALE_AFTER)
+    active = False
+    try:
+        while True:
+            now_ts = clock.time()
+            if not websocket_stale(now_ts):
+                if active:
+                    active = False
+                    app_status['data_source'] = 'websocket'
+                    logger.info("✅ WebSocket data is flowing again; REST fallback stopped")
+                await asyncio.sleep(1)
+                continue
+            if not active:
+                active = True
+                app_status['data_source'] = 'rest_fallback'
+                app_status['fallback_activations'] += 1
+                logger.warning(f"⚠️ WebSocket down or stale for >{FALLBACK_STALE_AFTER:.0f}s; polling REST every {FALLBACK_POLL_INTERVAL}s")
+            symbols = list(SYMBOLS)
+            batches = [symbols[i:i + TICKER_BATCH_SIZE] for i in range(0, len(symbols), TICKER_BATCH_SIZE)]
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, fetch_tickers, batch) for batch in batches),
+                return_exceptions=True)
+            # اگر در همین فاصله WebSocket برگشته، داده REST قدیمی‌تر است
+            if websocket_stale(clock.time()):
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"❌ REST fallback poll error: {result}")
+                        continue
+                    publish_rest_tickers(result, clock.time())
+                app_status['fallback_polls'] += 1
+                app_status['last_message_time'] = clock.now().isoformat()
+            await asyncio.sleep(max(0.0, FALLBACK_POLL_INTERVAL - (clock.time() - now_ts)))
+    finally:
+        executor.shutdown(wait=False)
 
+async def watcher_loop():
+    global ingest_loop, loop_watchdog
     # تست تلگرام در شروع (اختیاری)
     if TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
         if test_telegram_bot():
@@ -447,28 +1459,32 @@ async def watcher_loop():
         else:
             logger.warning("⚠️ Telegram bot verification failed")
 
-    attempt = 0
-    max_attempts = 50
-    while attempt < max_attempts:
-        try:
-            attempt += 1
-            backoff = min(300, (2 ** min(attempt, 8))) + random.uniform(0, 5)
-            logger.info(f'🔄 Connection attempt {attempt}/{max_attempts}, backoff {backoff:.1f}s')
-            await connect_and_run(uri)
-            attempt = 0  # اگر ارتباط پایدار بود، شمارنده را ریست کن
-        except KeyboardInterrupt:
-            logger.info("👋 Interrupted by user")
-            break
-        except Exception as e:
-            app_status['websocket_connected'] = False
-            app_status['status'] = f'reconnecting_attempt_{attempt}'
-            logger.error(f'💥 WebSocket error: {e}')
-            if attempt >= max_attempts:
-                app_status['status'] = 'failed_max_attempts'
-                logger.error("❌ Max reconnection attempts reached!")
-                break
-            logger.info(f'⏳ Waiting {backoff:.1f}s before reconnect...')
-            await asyncio.sleep(backoff)
+    ingest_loop = asyncio.get_running_loop()
+    if profiler.SLOW_CALLBACK_MS > 0:
+        loop_watchdog = profiler.LoopWatchdog(ingest_loop).start()
+    snapshot_task = asyncio.ensure_future(snapshot_loop())
+    await start_bus_server()
+    bars_task = asyncio.ensure_future(bars_flush_loop())
+    memory_task = asyncio.ensure_future(memory_loop()) if memory.MEMORY_SAMPLE_INTERVAL > 0 else None
+    asgi_task = asyncio.ensure_future(start_asgi_server()) if asgi.ASGI_PORT else None
+    fallback_task = asyncio.ensure_future(rest_fallback_loop()) if FALLBACK_ENABLED else None
+    managers = [stream_manager, *venue_managers.values()]
+    for manager in managers:
+        manager.bind(ingest_loop, lambda conn, m=manager: asyncio.ensure_future(connection_loop(m, conn)))
+        manager.set_symbols(SYMBOLS)
+    # هر اتصال task خودش را دارد؛ تا وقتی اتصالی فعال است منتظر بمان
+    while any(m.tasks for m in managers):
+        await asyncio.wait({t for m in managers for t in m.tasks})
+    snapshot_task.cancel()
+    bars_task.cancel()
+    if memory_task is not None:
+        memory_task.cancel()
+    if asgi_task is not None:
+        asgi_task.cancel()
+    if fallback_task is not None:
+        fallback_task.cancel()
+    bar_store.flush()
+    persist_state()
 
 # ======== Background Thread ========
 def run_websocket_loop():
@@ -481,22 +1497,131 @@ def run_websocket_loop():
         logger.error(f"💥 WebSocket loop error: {e}")
         app_status['status'] = 'websocket_thread_error'
 
-# Start WebSocket thread
-websocket_thread = Thread(target=run_websocket_loop, daemon=True)
-websocket_thread.start()
+def init_symbol_registry():
+    global symbol_registry
+    try:
+        symbol_registry = load_registry(SYMBOLS)
+        logger.info(f"🧾 Symbol registry loaded: {len(symbol_registry)} symbols")
+    except Exception as e:
+        logger.error(f"❌ Symbol registry load error: {e}")
+
+_runtime_ready = False
+_ingest_started = False
+_ingest_lock = Lock()
+_ingest_lock_fd = None
+
+def init_runtime():
+    """بارگذاری تنظیمات (یکبار) — برای همه نقش‌ها"""
+    global _runtime_ready
+    if _runtime_ready:
+        return
+    _runtime_ready = True
+    logs.setup_logging()
+    init_config()
+
+def acquire_ingest_lock():
+    """قفل بین‌پروسه‌ای؛ فقط یک پروسه روی این ماشین ingest را اجرا می‌کند"""
+    global _ingest_lock_fd
+    try:
+        import fcntl
+    except ImportError:
+        return True  # ویندوز/اجرای محلی
+    fd = os.open(INGEST_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _ingest_lock_fd = fd  # تا پایان عمر پروسه باز می‌ماند
+    return True
+
+def init_shared_state():
+    global shared_writer
+    try:
+        shared_writer = shared_state.SharedMarketWriter()
+    except OSError as e:
+        logger.error(f"❌ Shared market state unavailable: {e}")
+        return
+    atexit.register(shared_writer.close)
+    for sym, vals in market_state.items():
+        publish_shared(sym, vals['price'], vals['volume'], vals['price_change_percent'], clock.time())
+
+def publish_shared(symbol, price, volume, change_percent, now_ts):
+    if shared_writer is None:
+        return
+    shared_writer.publish(symbol_registry.ensure(symbol).id, symbol, price, volume, change_percent, now_ts)
+    shared_writer.set_status(app_status['messages_processed'], now_ts, app_status['websocket_connected'])
+
+def start_ingest_http():
+    """مسیرهای ingest_route برای workerهای وب روی سوکت یونیکس (در thread جدا)"""
+    if not ingest_http.INGEST_HTTP_SOCKET:
+        return
+    try:
+        flask_app = create_app()
+    except ImportError as e:
+        logger.warning(f"⚠️ Ingest-only routes not served to web workers: {e}")
+        return
+    Thread(target=ingest_http.serve, args=(flask_app, ingest_http.INGEST_HTTP_SOCKET),
+           name='ingest-http', daemon=True).start()
+
+def prepare_ingest():
+    init_runtime()
+    logs.setup_logging(LOG_FILE)    # تنها نویسنده فایل لاگ؛ workerهای وب فقط stderr
+    init_symbol_registry()
+    init_warm_start()
+    init_shared_state()
+    atexit.register(persist_state)
+    start_ingest_http()
+    if CONFIG_WATCH:
+        ConfigWatcher(CONFIG_FILE, on_config_change, current=config).start()
+    ensure_csv_header()
+
+def start_ingest(background=True):
+    """راه‌اندازی ingest دقیقاً یکبار (در این پروسه و بین workerها)"""
+    global _ingest_started
+    with _ingest_lock:
+        if _ingest_started:
+            return False
+        if not acquire_ingest_lock():
+            logger.info(f"⏭️ Ingest already running in another process (pid {os.getpid()} serves HTTP only)")
+            _ingest_started = True
+            return False
+        _ingest_started = True
+    prepare_ingest()
+    if not background:
+        run_websocket_loop()
+        return True
+    Thread(target=run_websocket_loop, name='ingest', daemon=True).start()
+    return True
 
 # ======== Main ========
-if __name__ == "__main__":
+def main(argv=None):
+    global ROLE
+    parser = argparse.ArgumentParser(description='WhalePulse-Pro')
+    parser.add_argument('--role', choices=['all', 'web', 'ingest'], default=ROLE)
+    args = parser.parse_args(argv)
+    ROLE = args.role
+
+    logs.setup_logging()
     logger.info("🌟 Starting WhalePulse-Pro...")
+    logger.info(f"🎭 Role: {ROLE}")
+    init_runtime()
     logger.info(f"📊 Monitoring: {SYMBOLS}")
     logger.info(f"📱 Telegram configured: {bool(TELEGRAM_TOKEN and TELEGRAM_CHAT_ID)}")
+
+    if ROLE == 'ingest':
+        # SIGTERM از supervisor: خروج تمیز تا atexit (اسنپ‌شات، آزادسازی shared memory) اجرا شود
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        start_ingest(background=False)
+        return
+
     logger.info(f"🚀 Port: {PORT}")
+    flask_app = create_app()
     app_status['status'] = 'flask_starting'
     try:
-        # ایجاد هدر CSV در صورت نیاز
-        ensure_csv_header()
-
-        app.run(
+        flask_app.run(
             host='0.0.0.0',
             port=PORT,
             debug=False,
@@ -506,3 +1631,6 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"💥 Flask startup error: {e}")
         app_status['status'] = 'flask_error'
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
-import pandas as pd
 import time
 import logging
 from flask import Flask, jsonify
 from threading import Thread, Lock
-from binance.client import Client
 from datetime import datetime
 
+from rest import fetch_tickers
+
 # Binance API Keys
 API_KEY = ''
 API_SECRET = ''
@@ -28,9 +28,6 @@ last_sent_signals = {}
 signal_lock = Lock()
 app_status = {'status': 'running'}
 
-# Binance Client
-client = Client(API_KEY, API_SECRET)
-
 # Configuration
 SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT']
 CHANGE_THRESHOLD_PERCENT = 0.5
@@ -38,18 +35,23 @@ REPORT_INTERVAL_MINUTES = 60
 
 
 # Function: Fetch Realtime Binance Prices
+# یک درخواست (یا یک درخواست برای هر 100 نماد) به جای یک درخواست برای هر نماد؛ session مشترک در rest.py
 def fetch_binance_data():
     data = {}
-    for symbol in SYMBOLS:
-        try:
-            ticker = client.get_ticker(symbol=symbol)
-            data[symbol] = {
-                'price': float(ticker['lastPrice']),
-                'price_change_percent': float(ticker['priceChangePercent']),
-                'volume': float(ticker['volume'])
-            }
-        except Exception as e:
-            logging.error(f"Error fetching {symbol}: {str(e)}")
+    try:
+        tickers = fetch_tickers(SYMBOLS)
+    except Exception as e:
+        logging.error(f"Error fetching tickers: {str(e)}")
+        return data
+    for symbol, ticker in tickers.items():
+        data[symbol] = {
+            'price': float(ticker['lastPrice']),
+            'price_change_percent': float(ticker['priceChangePercent']),
+            'volume': float(ticker['volume'])
+        }
+    missing = set(SYMBOLS) - data.keys()
+    if missing:
+        logging.error(f"Tickers missing from response: {sorted(missing)}")
     return data
 
 
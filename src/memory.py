@@ -0,0 +1,149 @@
+import logging
+import os
+import time
+import tracemalloc
+from collections import deque
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+MEMORY_MAX_KEYS = int(os.getenv('MEMORY_MAX_KEYS', '5000'))          # سقف هر دیکشنری کول‌داون/وضعیت هر نماد
+MEMORY_SAMPLE_INTERVAL = float(os.getenv('MEMORY_SAMPLE_INTERVAL', '300'))  # ثانیه؛ 0 = خاموش
+MEMORY_HISTORY = int(os.getenv('MEMORY_HISTORY', '288'))             # تعداد نمونه نگه‌داشته‌شده (24 ساعت با 5 دقیقه)
+MEMORY_TRACE = os.getenv('MEMORY_TRACE', 'false').lower() == 'true'  # tracemalloc (سربار تخصیص حافظه دارد)
+MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', '1'))
+MEMORY_GROWTH_ALERT = float(os.getenv('MEMORY_GROWTH_ALERT', '20'))  # MB در ساعت؛ هشدار نشت
+
+
+def rss_bytes():
+    """حافظه مقیم فعلی پروسه (لینوکس: /proc/self/statm؛ در غیر این صورت حداکثر RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    scale = 1 if os.uname().sysname == 'Darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class BoundedDict(dict):
+    """dict با سقف تعداد کلید؛ کلید جدید روی دیکشنری پر قدیمی‌ترین کلید درج‌شده را بیرون می‌کند
+
+    به‌روزرسانی کلید موجود هزینه اضافه ندارد (مسیر تیک)؛ فقط درج کلید تازه سقف را چک می‌کند."""
+
+    def __init__(self, maxlen=MEMORY_MAX_KEYS):
+        super().__init__()
+        self.maxlen = maxlen
+        self.evicted = 0
+
+    def __setitem__(self, key, value):
+        if key not in self and len(self) >= self.maxlen:
+            del self[next(iter(self))]
+            self.evicted += 1
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+class MemoryMonitor:
+    """نمونه‌برداری دوره‌ای RSS، اندازه بافرهای ثبت‌شده و (اختیاری) diff اسنپ‌شات‌های tracemalloc"""
+
+    def __init__(self, history=MEMORY_HISTORY, trace=MEMORY_TRACE, frames=MEMORY_TRACE_FRAMES):
+        self.buffers = {}               # name -> (sized object or callable, cap)
+        self.samples = deque(maxlen=history)
+        self.trace = trace
+        self.frames = frames
+        self.baseline = None            # اولین اسنپ‌شات tracemalloc
+        self.previous = None
+        self.last_warning = 0.0
+
+    def register(self, name, obj, cap=None):
+        """obj: هر چیز با len() یا تابعی که اندازه را برمی‌گرداند؛ cap برای BoundedDict/deque خودکار"""
+        if cap is None:
+            cap = getattr(obj, 'maxlen', None)
+        self.buffers[name] = (obj, cap)
+        return obj
+
+    def start_trace(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.trace = True
+        self.baseline = self.previous = tracemalloc.take_snapshot()
+
+    def stop_trace(self):
+        self.trace = False
+        self.baseline = self.previous = None
+        tracemalloc.stop()
+
+    def buffer_sizes(self):
+        result = {}
+        for name, (obj, cap) in self.buffers.items():
+            try:
+                size = obj() if callable(obj) else len(obj)
+            except Exception:
+                size = None
+            entry = {'size': size, 'cap': cap}
+            if hasattr(obj, 'evicted'):
+                entry['evicted'] = obj.evicted
+            result[name] = entry
+        return result
+
+    def sample(self, now_ts=None):
+        now_ts = time.time() if now_ts is None else now_ts
+        entry = {'ts': now_ts, 'rss': rss_bytes()}
+        if self.trace:
+            if self.baseline is None:
+                self.start_trace()
+            current, peak = tracemalloc.get_traced_memory()
+            entry['traced'] = current
+            entry['traced_peak'] = peak
+        self.samples.append(entry)
+        growth = self.growth_per_hour()
+        if growth is not None and growth > MEMORY_GROWTH_ALERT * 2**20 and now_ts - self.last_warning > 3600:
+            self.last_warning = now_ts
+            logger.warning(f'🧠 Memory growing {growth / 2**20:.1f} MB/h (RSS {entry["rss"] / 2**20:.1f} MB)')
+        return entry
+
+    def growth_per_hour(self):
+        """شیب RSS (بایت در ساعت) با کمترین مربعات روی نیمه دوم تاریخچه (بعد از گرم شدن)"""
+        points = list(self.samples)[len(self.samples) // 2:]
+        if len(points) < 4:
+            return None
+        n = len(points)
+        mt = sum(p['ts'] for p in points) / n
+        mr = sum(p['rss'] for p in points) / n
+        var = sum((p['ts'] - mt) ** 2 for p in points)
+        if var <= 0:
+            return None
+        return sum((p['ts'] - mt) * (p['rss'] - mr) for p in points) / var * 3600
+
+    def top_growth(self, limit=15, since='baseline'):
+        """بیشترین رشد تخصیص بر اساس خط کد نسبت به baseline یا اسنپ‌شات قبلی"""
+        if not self.trace or self.baseline is None:
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        reference = self.baseline if since == 'baseline' else self.previous
+        self.previous = snapshot
+        stats = snapshot.compare_to(reference, 'lineno')[:limit]
+        return [{'where': str(s.traceback[0]), 'size_diff_kb': round(s.size_diff / 1024, 1),
+                 'size_kb': round(s.size / 1024, 1), 'count_diff': s.count_diff} for s in stats]
+
+    def summary(self, limit=15, since='baseline'):
+        growth = self.growth_per_hour()
+        return {
+            'rss_mb': round(rss_bytes() / 2**20, 2),
+            'growth_mb_per_hour': None if growth is None else round(growth / 2**20, 3),
+            'buffers': self.buffer_sizes(),
+            'samples': [{**s, 'rss': round(s['rss'] / 2**20, 2)} for s in self.samples],
+            'tracemalloc': self.trace,
+            'top_growth': self.top_growth(limit, since),
+        }
@@ -0,0 +1,176 @@
+import logging
+import os
+from bisect import bisect_left
+
+from rest import get_json
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+DEPTH_SNAPSHOT_LIMIT = int(os.getenv('DEPTH_SNAPSHOT_LIMIT', '1000'))
+DEPTH_MAX_LEVELS = int(os.getenv('DEPTH_MAX_LEVELS', '5000'))            # سقف سطوح هر سمت
+DEPTH_LEVELS = int(os.getenv('DEPTH_LEVELS', '20'))                      # سطوح برای عدم‌تعادل/دیوار
+DEPTH_WALL_USD = float(os.getenv('DEPTH_WALL_USD', '2000000'))           # حداقل ارزش یک سطح برای «دیوار»
+DEPTH_IMBALANCE_ALERT = float(os.getenv('DEPTH_IMBALANCE_ALERT', '0.6'))  # |bid-ask|/(bid+ask)
+DEPTH_ALERT_COOLDOWN = int(os.getenv('DEPTH_ALERT_COOLDOWN', '300'))
+
+
+class BookSide:
+    """سطوح قیمت در دو آرایه مرتب؛ top-N با برش
+
+    پیدا کردن سطح O(log n) با bisect است، ولی درج/حذف سطح با list.insert/del جابه‌جایی O(n) دارد؛
+    n با DEPTH_MAX_LEVELS محدود است، پس هزینه بدترین حالت یک memmove چند ده کیلوبایتی است."""
+
+    __slots__ = ('descending', 'keys', 'qtys')
+
+    def __init__(self, descending):
+        self.descending = descending   # bids: بالاترین قیمت اول
+        self.keys = []                 # صعودی؛ برای bids قیمت منفی ذخیره می‌شود
+        self.qtys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, price, qty):
+        key = -price if self.descending else price
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            if qty == 0:
+                del self.keys[i]
+                del self.qtys[i]
+            else:
+                self.qtys[i] = qty
+        elif qty != 0:
+            self.keys.insert(i, key)
+            self.qtys.insert(i, qty)
+
+    def clear(self):
+        self.keys = []
+        self.qtys = []
+
+    def trim(self, max_levels):
+        if len(self.keys) > max_levels:
+            del self.keys[max_levels:]
+            del self.qtys[max_levels:]
+
+    def best(self):
+        if not self.keys:
+            return None
+        return -self.keys[0] if self.descending else self.keys[0]
+
+    def top(self, n):
+        sign = -1 if self.descending else 1
+        return [(sign * k, q) for k, q in zip(self.keys[:n], self.qtys[:n])]
+
+    def qty(self, n):
+        return sum(self.qtys[:n])
+
+
+class LocalOrderBook:
+    """دفتر سفارش محلی: snapshot از REST + diffهای @depth با اعتبارسنجی شماره توالی"""
+
+    def __init__(self, symbol, max_levels=DEPTH_MAX_LEVELS):
+        self.symbol = symbol
+        self.max_levels = max_levels
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = 0
+        self.synced = False
+        self.first_after_snapshot = True
+        self.buffer = []            # diffهای رسیده قبل از snapshot
+        self.resyncs = 0
+
+    def reset(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.synced = False
+        self.first_after_snapshot = True
+        self.buffer = []
+        self.resyncs += 1
+
+    def apply_snapshot(self, snapshot):
+        """snapshot پاسخ /api/v3/depth؛ False اگر diffهای بافرشده با آن جور نباشند"""
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot.get('bids', []):
+            self.bids.set(float(price), float(qty))
+        for price, qty in snapshot.get('asks', []):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = True
+        self.first_after_snapshot = True
+        pending, self.buffer = self.buffer, []
+        for event in pending:
+            if not self.on_diff(event):
+                return False
+        return True
+
+    def on_diff(self, event):
+        """True اگر اعمال یا (به‌عنوان قدیمی) نادیده گرفته شد؛ False یعنی شکاف توالی و نیاز به resync"""
+        if not self.synced:
+            self.buffer.append(event)
+            if len(self.buffer) > 10000:
+                del self.buffer[:-1000]
+            return True
+        first_id, final_id = event['U'], event['u']
+        if final_id <= self.last_update_id:
+            return True
+        if self.first_after_snapshot:
+            if not first_id <= self.last_update_id + 1 <= final_id:
+                return False
+            self.first_after_snapshot = False
+        elif first_id != self.last_update_id + 1:
+            return False
+        for price, qty in event.get('b', []):
+            self.bids.set(float(price), float(qty))
+        for price, qty in event.get('a', []):
+            self.asks.set(float(price), float(qty))
+        self.bids.trim(self.max_levels)
+        self.asks.trim(self.max_levels)
+        self.last_update_id = final_id
+        return True
+
+    # ---- پرس‌وجوها ----
+    def spread(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def mid(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def imbalance(self, levels=DEPTH_LEVELS):
+        """بین -1 (فقط فروش) و +1 (فقط خرید) روی levels سطح اول"""
+        bid_qty, ask_qty = self.bids.qty(levels), self.asks.qty(levels)
+        total = bid_qty + ask_qty
+        return (bid_qty - ask_qty) / total if total else 0.0
+
+    def walls(self, min_notional=DEPTH_WALL_USD, levels=DEPTH_LEVELS):
+        found = []
+        for side, book in (('bid', self.bids), ('ask', self.asks)):
+            for price, qty in book.top(levels):
+                if price * qty >= min_notional:
+                    found.append({'side': side, 'price': price, 'qty': qty, 'notional': price * qty})
+        return found
+
+    def summary(self, levels=10):
+        return {
+            'symbol': self.symbol,
+            'synced': self.synced,
+            'last_update_id': self.last_update_id,
+            'best_bid': self.bids.best(),
+            'best_ask': self.asks.best(),
+            'spread': self.spread(),
+            'imbalance': self.imbalance(levels),
+            'bids': self.bids.top(levels),
+            'asks': self.asks.top(levels),
+            'resyncs': self.resyncs,
+        }
+
+
+def fetch_depth_snapshot(symbol, limit=DEPTH_SNAPSHOT_LIMIT, base=None):
+    return get_json('/api/v3/depth', {'symbol': symbol, 'limit': limit}, base=base)
@@ -0,0 +1,144 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))      # ثانیه بین نمونه‌ها
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+SLOW_CALLBACK_MS = float(os.getenv('SLOW_CALLBACK_MS', '0'))          # 0 = watchdog خاموش
+SLOW_CALLBACK_COOLDOWN = float(os.getenv('SLOW_CALLBACK_COOLDOWN', '30'))  # ثانیه بین دو لاگ
+
+# هیچ چیز در حالت خاموش نصب نمی‌شود (بدون sys.setprofile/settrace و بدون asyncio debug)؛
+# نمونه‌گیر فقط در مدت درخواست /debug/profile از sys._current_frames پشته‌ها را می‌خواند.
+
+_profile_lock = threading.Lock()
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+
+
+def _collapse(frame, prefix):
+    """پشته frame به یک خط collapsed (ریشه اول): thread;f1;f2;..."""
+    names = []
+    while frame is not None:
+        names.append(_frame_key(frame))
+        frame = frame.f_back
+    names.append(prefix)
+    return ';'.join(reversed(names))
+
+
+def sample(seconds, interval=PROFILE_INTERVAL, threads=None):
+    """نمونه‌گیری پشته همه threadها (یا فقط نام‌های threads) -> Counter از خط collapsed به تعداد
+
+    یک profile در هر لحظه؛ اگر یکی در حال اجراست Busy."""
+    if not _profile_lock.acquire(blocking=False):
+        raise Busy('a profile is already running')
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.perf_counter() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == me or (threads and name not in threads):
+                    continue
+                stacks[_collapse(frame, name)] += 1
+            samples += 1
+            time.sleep(interval)
+        return stacks, samples
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(stacks):
+    """فرمت ورودی flamegraph.pl / speedscope: «stack count» در هر خط"""
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+def top_functions(stacks, n=20):
+    """پرهزینه‌ترین توابع بر اساس self-time (آخرین فریم هر پشته)"""
+    own = Counter()
+    for stack, count in stacks.items():
+        own[stack.rsplit(';', 1)[-1]] += count
+    return own.most_common(n)
+
+
+# ======== تشخیص callback کند در حلقه asyncio ========
+class LoopWatchdog:
+    """thread ناظر: حلقه هر threshold/2 یک heartbeat می‌گذارد؛ اگر heartbeat بعدی بیشتر از threshold
+    از زمان برنامه‌ریزی‌شده‌اش عقب بماند یعنی یک callback حلقه را بلاک کرده و پشته همان لحظه
+    thread حلقه لاگ می‌شود.
+
+    بر خلاف loop.slow_callback_duration به حالت debug (که همه چیز را کند می‌کند) نیاز ندارد."""
+
+    def __init__(self, loop, threshold_ms=SLOW_CALLBACK_MS, cooldown=SLOW_CALLBACK_COOLDOWN):
+        self.loop = loop
+        self.threshold = threshold_ms / 1000.0
+        self.cooldown = cooldown
+        self.loop_thread = None
+        self.last_beat = time.monotonic()
+        self.stalls = 0
+        self.max_stall = 0.0
+        self.last_logged = 0.0
+        self._stop = threading.Event()
+
+    def start(self):
+        self.loop.call_soon_threadsafe(self._beat_first)
+        threading.Thread(target=self._run, name='loop-watchdog', daemon=True).start()
+        logger.info(f'🐢 Slow callback watchdog on (> {self.threshold * 1000:.0f} ms)')
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _beat_first(self):
+        self.loop_thread = threading.get_ident()
+        self._beat()
+
+    def _beat(self):
+        self.last_beat = time.monotonic()
+        if not self._stop.is_set():
+            self.loop.call_later(self.threshold / 2, self._beat)
+
+    def _run(self):
+        reported = None     # heartbeat که توقفش قبلاً شمرده شده
+        while not self._stop.wait(self.threshold / 2):
+            beat = self.last_beat
+            # تأخیر heartbeat بعدی نسبت به زمان برنامه‌ریزی‌شده‌اش (beat + threshold/2)، نه فاصله از beat قبلی
+            lag = time.monotonic() - (beat + self.threshold / 2)
+            if lag < self.threshold or self.loop_thread is None:
+                continue
+            self.max_stall = max(self.max_stall, lag)
+            if reported == beat:
+                continue
+            reported = beat
+            self.stalls += 1
+            now = time.monotonic()
+            if now - self.last_logged < self.cooldown:
+                continue
+            self.last_logged = now
+            frame = sys._current_frames().get(self.loop_thread)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            logger.warning('🐢 Event loop blocked for %.0f ms (stall #%d); loop thread stack:\n%s',
+                           lag * 1000, self.stalls, stack, extra={'stall_ms': round(lag * 1000)})
+
+    def stats(self):
+        return {
+            'threshold_ms': self.threshold * 1000,
+            'stalls': self.stalls,
+            'max_stall_ms': round(self.max_stall * 1000, 1),
+        }
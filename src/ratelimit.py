@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+from memory import BoundedDict
+
+# ======== تنظیمات ========
+RATE_LIMIT_RPS = float(os.getenv('RATE_LIMIT_RPS', '5'))         # درخواست در ثانیه برای هر IP و مسیر عمومی؛ 0 = خاموش
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '10000'))
+PUBLIC_LIMIT = (RATE_LIMIT_RPS, RATE_LIMIT_BURST) if RATE_LIMIT_RPS > 0 else None
+PROXY_HOPS = int(os.getenv('PROXY_HOPS', '0'))                   # تعداد proxyهای مورد اعتماد جلوی اپ؛ فقط پشت proxy (Render: 1)
+
+
+def parse_limit(text):
+    """'5/1' یا '2/60' (تعداد/ثانیه) -> (نرخ در ثانیه، ظرفیت)؛ خالی یا 'off' -> None"""
+    text = (text or '').strip().lower()
+    if text in ('', 'off', '0'):
+        return None
+    count, _, per = text.partition('/')
+    count, per = float(count), float(per or 1)
+    return count / per, max(count, 1.0)
+
+
+def client_ip(remote_addr, forwarded_for, hops=PROXY_HOPS):
+    """IP واقعی کلاینت: hops-امین آدرس از آخر X-Forwarded-For (آدرسی که proxy خودمان اضافه کرده)؛
+    مقادیر جلوتر را خود کلاینت می‌تواند جعل کند. با hops=0 (بدون proxy) هدر نادیده گرفته می‌شود،
+    وگرنه هر کلاینت با هدر جعلی برای هر درخواست bucket تازه می‌گرفت"""
+    if hops > 0 and forwarded_for:
+        parts = [p.strip() for p in forwarded_for.split(',') if p.strip()]
+        if parts:
+            return parts[-min(hops, len(parts))]
+    return remote_addr or '-'
+
+
+class RateLimiter:
+    """token bucket برای هر (کلید، مسیر)؛ limits: {rule: (rate, burst) یا None برای بدون محدودیت}،
+    مسیرهای دیگر default (پیش‌فرض بدون محدودیت)"""
+
+    def __init__(self, limits=None, default=None, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.limits = limits or {}
+        self.default = default
+        self.buckets = BoundedDict(max_keys)    # (key, rule) -> [tokens, last]
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def check(self, key, rule, now=None):
+        """0 اگر مجاز؛ در غیر این صورت ثانیه تا توکن بعدی (برای Retry-After)"""
+        limit = self.limits.get(rule, self.default)
+        if limit is None:
+            return 0
+        rate, burst = limit
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            bucket = self.buckets.get((key, rule))
+            if bucket is None:
+                bucket = self.buckets[(key, rule)] = [burst, now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0
+            bucket[0] = tokens
+            self.rejected += 1
+            return (1 - tokens) / rate
+
+    def stats(self):
+        return {'tracked': len(self.buckets), 'rejected': self.rejected, 'evicted': self.buckets.evicted}
+
+
+class TTLCache:
+    """کش کوتاه‌مدت با ادغام درخواست‌های هم‌زمان: برای هر کلید فقط یک فراخوانی fn در جریان است
+    و بقیه منتظر همان نتیجه می‌مانند (خطا کش نمی‌شود)"""
+
+    def __init__(self, ttl, max_keys=256):
+        self.ttl = ttl
+        self.entries = BoundedDict(max_keys)    # key -> (expires, value)
+        self.inflight = {}                      # key -> Event
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, fn, wait=True):
+        """wait=False برای حلقه asyncio: اگر thread دیگری همین کلید را محاسبه می‌کند، به جای مسدود
+        کردن حلقه خودش fn را (بدون ذخیره) اجرا می‌کند"""
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return entry[1]
+                waiter = self.inflight.get(key)
+                if waiter is None:
+                    self.inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                if not wait:
+                    self.misses += 1
+                    waiter = None
+                else:
+                    self.coalesced += 1
+            if waiter is None:
+                return fn()
+            waiter.wait()
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    return entry[1]
+            # فراخوانی قبلی خطا داد؛ دوباره تلاش کن
+        try:
+            value = fn()
+            with self.lock:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            with self.lock:
+                self.inflight.pop(key).set()
+
+    def stats(self):
+        return {'ttl_sec': self.ttl, 'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+BINANCE_REST_BASE = os.getenv('BINANCE_REST_BASE', 'https://api.binance.com')  # برای تست: آدرس fixture_server
+REST_TIMEOUT = float(os.getenv('REST_TIMEOUT', '10'))
+REST_POOL_SIZE = int(os.getenv('REST_POOL_SIZE', '10'))
+REST_RETRIES = int(os.getenv('REST_RETRIES', '3'))
+# all = یک درخواست برای همه نمادها، batch = symbols=[...]، auto = batch تا سقف TICKER_BATCH_SIZE
+TICKER_POLL_MODE = os.getenv('TICKER_POLL_MODE', 'auto')
+TICKER_BATCH_SIZE = 100   # بالاتر از 100 نماد، وزن symbols=[...] با همه نمادها برابر است (80)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """requests.Session مشترک با connection pool و retry فقط برای خطاهای موقت (429/5xx/اتصال)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                retry = Retry(total=REST_RETRIES, connect=REST_RETRIES, read=REST_RETRIES,
+                              backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=frozenset(['GET']), respect_retry_after_header=True,
+                              raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=REST_POOL_SIZE, pool_maxsize=REST_POOL_SIZE,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def get_json(path, params=None, base=None, timeout=REST_TIMEOUT):
+    response = get_session().get(f'{base or BINANCE_REST_BASE}{path}', params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_tickers(symbols, mode=None, base=None):
+    """آمار 24 ساعته نمادها با تعداد درخواست ثابت -> {symbol: ticker}
+
+    mode='all' یک درخواست بدون symbol می‌فرستد؛ 'batch' نمادها را در دسته‌های
+    TICKER_BATCH_SIZE تایی با پارامتر symbols می‌فرستد؛ 'auto' بین این دو انتخاب می‌کند.
+    """
+    wanted = set(symbols)
+    if not wanted:
+        return {}
+    mode = mode or TICKER_POLL_MODE
+    if mode == 'auto':
+        mode = 'batch' if len(wanted) <= TICKER_BATCH_SIZE else 'all'
+    if mode == 'all':
+        payloads = [get_json('/api/v3/ticker/24hr', base=base)]
+    else:
+        ordered = sorted(wanted)
+        payloads = [get_json('/api/v3/ticker/24hr',
+                             {'symbols': json.dumps(ordered[i:i + TICKER_BATCH_SIZE], separators=(',', ':'))},
+                             base=base)
+                    for i in range(0, len(ordered), TICKER_BATCH_SIZE)]
+    tickers = {}
+    for payload in payloads:
+        for ticker in payload if isinstance(payload, list) else [payload]:
+            if ticker.get('symbol') in wanted:
+                tickers[ticker['symbol']] = ticker
+    return tickers
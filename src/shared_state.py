@@ -0,0 +1,175 @@
+import logging
+import os
+import struct
+from multiprocessing import shared_memory
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+SHARED_STATE_NAME = os.getenv('SHARED_STATE_NAME', 'whalepulse_market')
+SHARED_STATE_CAPACITY = int(os.getenv('SHARED_STATE_CAPACITY', '256'))  # تعداد اسلات (بر اساس id نماد)
+
+# ======== چیدمان ثابت حافظه ========
+# هدر: magic, version, capacity, flags, generation, messages_processed, last_message_ts
+MAGIC = b'WPM1'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIQQd')
+HEADER_SIZE = 64
+# اسلات هر نماد: seq (seqlock) + price, volume, change%, updated_ts + نام نماد
+SLOT = struct.Struct('<Qdddd16s')
+SLOT_SIZE = 64
+SEQ = struct.Struct('<Q')
+FIELDS = struct.Struct('<dddd16s')
+
+assert HEADER.size <= HEADER_SIZE and SLOT.size <= SLOT_SIZE
+
+FLAG_WS_CONNECTED = 1
+
+_OFF_FLAGS = 12
+_OFF_GENERATION = 16
+_OFF_MESSAGES = 24
+_OFF_LAST_MSG = 32
+
+
+def _size(capacity):
+    return HEADER_SIZE + capacity * SLOT_SIZE
+
+
+class SharedMarketWriter:
+    """نویسنده یکتا (پروسه ingest)؛ هر اسلات با seqlock محافظت می‌شود"""
+
+    def __init__(self, name=SHARED_STATE_NAME, capacity=SHARED_STATE_CAPACITY):
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()  # بلوک باقی‌مانده از اجرای قبلی
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_size(capacity))
+        self.buf = self.shm.buf
+        self.capacity = capacity
+        self.overflow = set()   # idهای بیرون از ظرفیت که خطایشان لاگ شده
+        self.buf[:_size(capacity)] = bytes(_size(capacity))
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, capacity, 0, 0, 0, 0.0)
+        logger.info(f'🧠 Shared market state created: {name} ({capacity} slots, {_size(capacity)} bytes)')
+
+    def publish(self, slot, symbol, price, volume, change_percent, updated_ts):
+        if slot is None or slot >= self.capacity:
+            if slot is not None and slot not in self.overflow:
+                self.overflow.add(slot)
+                logger.error(f'❌ Shared state full: {symbol} (id {slot}) is not visible to web workers; '
+                             f'raise SHARED_STATE_CAPACITY above {self.capacity}')
+            return False
+        off = HEADER_SIZE + slot * SLOT_SIZE
+        seq = SEQ.unpack_from(self.buf, off)[0]
+        SEQ.pack_into(self.buf, off, seq + 1)          # فرد: در حال نوشتن
+        FIELDS.pack_into(self.buf, off + 8, price, volume, change_percent, updated_ts, symbol.encode()[:16])
+        SEQ.pack_into(self.buf, off, seq + 2)          # زوج: پایدار
+        return True
+
+    def clear(self, slot):
+        if slot is None or slot >= self.capacity:
+            return
+        off = HEADER_SIZE + slot * SLOT_SIZE
+        seq = SEQ.unpack_from(self.buf, off)[0]
+        SEQ.pack_into(self.buf, off, seq + 1)
+        FIELDS.pack_into(self.buf, off + 8, 0.0, 0.0, 0.0, 0.0, b'')
+        SEQ.pack_into(self.buf, off, seq + 2)
+        self.bump_generation()
+
+    def bump_generation(self):
+        gen = struct.unpack_from('<Q', self.buf, _OFF_GENERATION)[0]
+        struct.pack_into('<Q', self.buf, _OFF_GENERATION, gen + 1)
+
+    def set_status(self, messages_processed, last_message_ts, ws_connected):
+        self.set_connected(ws_connected)
+        struct.pack_into('<Qd', self.buf, _OFF_MESSAGES, messages_processed, last_message_ts)
+
+    def set_connected(self, ws_connected):
+        struct.pack_into('<I', self.buf, _OFF_FLAGS, FLAG_WS_CONNECTED if ws_connected else 0)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedMarketReader:
+    """خواننده فقط‌خواندنی (workerهای وب)؛ بدون کپی بلوک، مستقیم از نگاشت حافظه"""
+
+    def __init__(self, name=SHARED_STATE_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        _untrack(self.shm)
+        self.buf = self.shm.buf
+        magic, version, capacity, *_ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f'shared state {name} has unknown layout')
+        self.capacity = capacity
+
+    def read_slot(self, slot, retries=100):
+        off = HEADER_SIZE + slot * SLOT_SIZE
+        for _ in range(retries):
+            seq1 = SEQ.unpack_from(self.buf, off)[0]
+            if seq1 & 1:
+                continue
+            fields = FIELDS.unpack_from(self.buf, off + 8)
+            if SEQ.unpack_from(self.buf, off)[0] == seq1:
+                return seq1, fields
+        return None, None
+
+    def read_all(self):
+        """{'BTCUSDT': {'price':..., 'volume':..., 'price_change_percent':..., 'updated_at':...}}"""
+        result = {}
+        for slot in range(self.capacity):
+            seq, fields = self.read_slot(slot)
+            if not seq or fields is None:
+                continue
+            price, volume, change, updated_ts, raw_symbol = fields
+            symbol = raw_symbol.rstrip(b'\0').decode()
+            if not symbol:
+                continue
+            result[symbol] = {
+                'price': price,
+                'volume': volume,
+                'price_change_percent': change,
+                'updated_at': time_iso(updated_ts),
+            }
+        return result
+
+    def status(self):
+        _, _, _, flags, generation, messages, last_ts = HEADER.unpack_from(self.buf, 0)
+        return {
+            'websocket_connected': bool(flags & FLAG_WS_CONNECTED),
+            'messages_processed': messages,
+            'last_message_time': time_iso(last_ts) if last_ts else None,
+            'generation': generation,
+        }
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def time_iso(ts):
+    from datetime import datetime
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+def _untrack(shm):
+    # پایتون < 3.13 بلوک attach‌شده را هم در resource_tracker ثبت می‌کند و هنگام خروج unlink می‌کند
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+def attach_reader(name=SHARED_STATE_NAME):
+    try:
+        return SharedMarketReader(name)
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,80 @@
+import logging
+import marshal
+import os
+import struct
+import time
+import zlib
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'state_snapshot.bin')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '30'))          # ثانیه
+SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', str(24 * 60 * 60)))  # اسنپ‌شات قدیمی‌تر نادیده گرفته می‌شود
+
+# هدر: magic(4) + نسخه(1) + کدک(1) + زمان ذخیره(8)
+MAGIC = b'WPS1'
+VERSION = 1
+CODEC_MSGPACK = ord('m')
+CODEC_MARSHAL = ord('r')
+HEADER = struct.Struct('<4sBBd')
+
+
+def _codec():
+    try:
+        import msgpack
+        return CODEC_MSGPACK, msgpack
+    except ImportError:
+        return CODEC_MARSHAL, None
+
+
+def encode_snapshot(state, saved_at=None):
+    """state فقط شامل dict/list/str/float/int/None است"""
+    codec, msgpack = _codec()
+    if msgpack is not None:
+        body = msgpack.packb(state, use_bin_type=True)
+    else:
+        body = marshal.dumps(state)
+    saved_at = time.time() if saved_at is None else saved_at
+    return HEADER.pack(MAGIC, VERSION, codec, saved_at) + zlib.compress(body, 1)
+
+
+def decode_snapshot(blob):
+    magic, version, codec, saved_at = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('unknown snapshot format')
+    body = zlib.decompress(blob[HEADER.size:])
+    if codec == CODEC_MSGPACK:
+        import msgpack
+        state = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    elif codec == CODEC_MARSHAL:
+        state = marshal.loads(body)
+    else:
+        raise ValueError(f'unknown snapshot codec {codec}')
+    return saved_at, state
+
+
+def save_snapshot(state, path=SNAPSHOT_FILE):
+    blob = encode_snapshot(state)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp, path)  # جایگزینی اتمیک؛ خواننده هیچ‌وقت فایل نیمه‌کاره نمی‌بیند
+    return len(blob)
+
+
+def load_snapshot(path=SNAPSHOT_FILE, max_age=SNAPSHOT_MAX_AGE):
+    """(saved_at, state) یا None اگر فایل نیست، خراب است یا خیلی قدیمی است"""
+    try:
+        with open(path, 'rb') as f:
+            saved_at, state = decode_snapshot(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f'⚠️ Ignoring unreadable snapshot {path}: {e}')
+        return None
+    age = time.time() - saved_at
+    if max_age and age > max_age:
+        logger.info(f'🗑️ Snapshot too old ({age:.0f}s), cold start')
+        return None
+    return saved_at, state
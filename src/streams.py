@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+# محدودیت‌های بایننس: حداکثر 1024 استریم در هر اتصال و 5 پیام ورودی در ثانیه
+MAX_STREAMS_PER_CONNECTION = int(os.getenv('MAX_STREAMS_PER_CONNECTION', '1024'))
+MAX_CONTROL_MESSAGES_PER_SEC = 5
+STREAM_KINDS = ('ticker',)
+
+
+class StreamConnection:
+    """یک اتصال combined-stream و استریم‌هایی که به آن سپرده شده"""
+
+    def __init__(self, index):
+        self.index = index
+        self.streams = set()       # وضعیت مطلوب
+        self.live_streams = set()  # آنچه واقعاً روی سوکت فعلی subscribe شده
+        self.ws = None
+        self.closed = False
+        self.last_send = 0.0
+        self.send_lock = None
+
+    def __repr__(self):
+        return f'<StreamConnection #{self.index} streams={len(self.streams)} live={self.ws is not None}>'
+
+
+class StreamManager:
+    """مدیریت نمادها در زمان اجرا با SUBSCRIBE/UNSUBSCRIBE روی اتصال‌های موجود (یک صرافی)"""
+
+    def __init__(self, adapter, kinds=STREAM_KINDS, max_streams=MAX_STREAMS_PER_CONNECTION):
+        self.adapter = adapter
+        self.kinds = tuple(kinds)
+        self.max_streams = max_streams
+        self.connections = []
+        self.tasks = set()
+        self._next_index = 0
+        self._request_id = 0
+        self._loop = None
+        self._spawn = None
+        self._lock = threading.Lock()
+
+    # ---- راه‌اندازی ----
+    def bind(self, loop, spawn):
+        """spawn(conn) باید یک task برای اجرای اتصال بسازد"""
+        self._loop = loop
+        self._spawn = spawn
+        for conn in self.connections:
+            self._start(conn)
+
+    def set_kinds(self, kinds):
+        """kinds مثل ('ticker', 'aggTrade', 'kline_1m'); True اگر تغییر کرد (بعدش set_symbols لازم است)"""
+        kinds = tuple(kinds)
+        changed = kinds != self.kinds
+        self.kinds = kinds
+        return changed
+
+    def streams_for(self, symbol):
+        return self.adapter.streams_for(symbol, self.kinds)
+
+    def url_for(self, conn):
+        return self.adapter.url(conn.streams)
+
+    def initial_streams(self, conn):
+        """استریم‌هایی که خود آدرس اتصال subscribe می‌کند؛ بقیه بعد از اتصال با sync"""
+        return set(conn.streams) if self.adapter.streams_in_url else set()
+
+    def all_streams(self):
+        return {s for c in self.connections for s in c.streams}
+
+    # ---- تغییر مجموعه نمادها ----
+    def set_symbols(self, symbols):
+        wanted = {s for sym in symbols for s in self.streams_for(sym)}
+        with self._lock:
+            current = self.all_streams()
+            self._apply(wanted - current, current - wanted)
+
+    def _apply(self, added, removed):
+        touched = set()
+        for stream in removed:
+            for conn in self.connections:
+                if stream in conn.streams:
+                    conn.streams.discard(stream)
+                    touched.add(conn)
+                    break
+
+        pending = sorted(added)
+        for conn in self.connections:
+            if not pending:
+                break
+            room = self.max_streams - len(conn.streams)
+            if room > 0:
+                conn.streams.update(pending[:room])
+                del pending[:room]
+                touched.add(conn)
+        while pending:
+            conn = StreamConnection(self._next_index)
+            self._next_index += 1
+            conn.streams.update(pending[:self.max_streams])
+            del pending[:self.max_streams]
+            self.connections.append(conn)
+            logger.info(f'➕ New stream connection #{conn.index} ({len(conn.streams)} streams)')
+            self._start(conn)
+
+        for conn in touched:
+            if not conn.streams:
+                self._retire(conn)
+            elif conn.ws is not None:
+                self._schedule(self.sync(conn))
+
+    def _start(self, conn):
+        if self._spawn is None:
+            return
+        if self._in_loop():
+            self._track(self._spawn(conn))
+        else:
+            self._loop.call_soon_threadsafe(lambda: self._track(self._spawn(conn)))
+
+    def _track(self, task):
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _retire(self, conn):
+        conn.closed = True
+        if conn in self.connections:
+            self.connections.remove(conn)
+        logger.info(f'➖ Closing empty stream connection #{conn.index}')
+        if conn.ws is not None:
+            self._schedule(conn.ws.close())
+
+    def _in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _schedule(self, coro):
+        if self._loop is None:
+            coro.close()
+        elif self._in_loop():
+            self._loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # ---- همگام‌سازی با سوکت ----
+    async def attach(self, conn, ws, connected_streams):
+        """بعد از اتصال: استریم‌هایی که حین اتصال تغییر کرده‌اند را همگام کن"""
+        conn.ws = ws
+        conn.live_streams = set(connected_streams)
+        conn.send_lock = asyncio.Lock()
+        await self.sync(conn)
+
+    def detach(self, conn, ws=None):
+        if ws is not None and conn.ws is not ws:
+            return      # سوکت قدیمی بعد از چرخش؛ conn حالا به سوکت جدید وصل است
+        conn.ws = None
+        conn.live_streams = set()
+
+    async def sync(self, conn):
+        if conn.ws is None or conn.send_lock is None:
+            return
+        async with conn.send_lock:
+            to_unsub = sorted(conn.live_streams - conn.streams)
+            to_sub = sorted(conn.streams - conn.live_streams)
+            if to_unsub:
+                await self._send(conn, 'UNSUBSCRIBE', to_unsub)
+                conn.live_streams.difference_update(to_unsub)
+            if to_sub:
+                await self._send(conn, 'SUBSCRIBE', to_sub)
+                conn.live_streams.update(to_sub)
+
+    async def _send(self, conn, method, params):
+        batch = self.adapter.max_control_args or len(params)
+        for i in range(0, len(params), batch):
+            wait = conn.last_send + 1.0 / MAX_CONTROL_MESSAGES_PER_SEC - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._request_id += 1
+            await conn.ws.send(self.adapter.control_message(method, params[i:i + batch], self._request_id))
+            conn.last_send = time.monotonic()
+            logger.info(f'📡 {self.adapter.name} {method} #{self._request_id} on connection #{conn.index}: '
+                        f'{len(params[i:i + batch])} streams')
+
+    def snapshot(self):
+        return [{
+            'index': c.index,
+            'streams': sorted(c.streams),
+            'connected': c.ws is not None,
+        } for c in self.connections]
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import random
+
+import clock
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+RECONNECT_BASE = float(os.getenv('RECONNECT_BASE', '1'))        # ثانیه
+RECONNECT_CAP = float(os.getenv('RECONNECT_CAP', '60'))         # سقف فاصله تلاش‌ها
+ROTATE_AFTER = float(os.getenv('ROTATE_AFTER', str(23 * 3600)))  # بایننس اتصال را بعد از 24 ساعت می‌بندد
+ROTATE_HARD_LIMIT = float(os.getenv('ROTATE_HARD_LIMIT', str(24 * 3600)))  # بعد از این، اتصال قدیمی حتماً بسته می‌شود
+STALE_AFTER = float(os.getenv('STREAM_STALE_AFTER', '60'))      # اتصال باز ولی بی‌پیام -> اتصال دوباره
+WATCH_INTERVAL = 5.0              # ثانیه بین بررسی‌های watchdog
+STABLE_AFTER = 60.0               # اتصالی که این مدت دوام بیاورد backoff را صفر می‌کند
+
+# وضعیت‌های اتصال
+IDLE = 'idle'
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+ROTATING = 'rotating'
+BACKOFF = 'backoff'
+CLOSED = 'closed'
+
+
+class DecorrelatedJitter:
+    """backoff با «decorrelated jitter»: sleep = min(cap, uniform(base, 3 * sleep_قبلی))"""
+
+    def __init__(self, base=RECONNECT_BASE, cap=RECONNECT_CAP):
+        self.base = base
+        self.cap = cap
+        self.sleep = base
+
+    def next(self):
+        self.sleep = min(self.cap, random.uniform(self.base, self.sleep * 3))
+        return self.sleep
+
+    def reset(self):
+        self.sleep = self.base
+
+
+class ConnectionSupervisor:
+    """تنها حلقه اتصال مجدد یک StreamConnection؛ هرگز برای همیشه تسلیم نمی‌شود.
+
+    connect(conn, supervisor) باید بعد از باز شدن سوکت supervisor.connected(ws) و برای هر پیام
+    supervisor.on_message(ws) را صدا بزند (False یعنی سوکت در چرخش جایگزین شده: حلقه را تمام کن)
+    و تا بسته شدن سوکت برنگردد.
+
+    چرخش make-before-break است: اتصال جدید کنار قدیمی باز می‌شود و قدیمی تا اولین پیام اتصال
+    جدید داده می‌دهد، بعد بسته می‌شود. اگر جایگزین پیش از اولین پیامش شکست بخورد، قدیمی می‌ماند
+    و چرخش با backoff تکرار می‌شود؛ قدیمی فقط در hard_limit بی‌قیدوشرط بسته می‌شود.
+    """
+
+    def __init__(self, conn, connect, on_change=None, rotate_after=ROTATE_AFTER, stale_after=STALE_AFTER,
+                 hard_limit=ROTATE_HARD_LIMIT):
+        self.conn = conn
+        self.connect = connect
+        self.on_change = on_change
+        self.rotate_after = rotate_after
+        self.hard_limit = hard_limit
+        self.stale_after = stale_after
+        self.backoff = DecorrelatedJitter()
+        self.state = IDLE
+        self.ws = None
+        self.connected_at = None
+        self.rotate_at = None           # زمان چرخش بعدی اتصال فعلی
+        self.disconnected_at = None     # شروع پنجره بدون داده فعلی
+        self.last_message = 0.0
+        self.attempts = 0               # تلاش‌های ناموفق پشت سر هم
+        self.connects = 0
+        self.rotations = 0
+        self.missed_windows = 0         # تعداد دوره‌هایی که داده این اتصال قطع بود
+        self.missed_seconds = 0.0
+        self.last_latency = None        # قطع تا وصل دوباره (ثانیه)
+        self.max_latency = 0.0
+        self.last_error = None
+        self.last_uptime = 0.0          # مدت دوام آخرین اتصال
+        self._watchdog = None
+        self._retiring = None           # سوکت قدیمی در حال چرخش (تا اولین پیام جایگزین)
+        self._replacement = None        # task اتصال جایگزین
+        self._retiring_state = None     # (live_streams, send_lock) سوکت قدیمی برای برگرداندن به conn
+
+    def _set(self, state):
+        self.state = state
+        if self.on_change is not None:
+            self.on_change(self)
+
+    # ---- از داخل connect ----
+    def connected(self, ws):
+        now = clock.time()
+        self.ws = ws
+        self.connected_at = now
+        self.rotate_at = now + self.rotate_after
+        self.last_message = now
+        self.connects += 1
+        if self.disconnected_at is not None:
+            gap = now - self.disconnected_at
+            self.last_latency = gap
+            self.max_latency = max(self.max_latency, gap)
+            self.missed_windows += 1
+            self.missed_seconds += gap
+            logger.info(f'🔁 Connection #{self.conn.index} back after {gap:.2f}s')
+            self.disconnected_at = None
+        self._watchdog = asyncio.ensure_future(self._watch(ws))
+        self._set(CONNECTED)
+
+    def on_message(self, ws):
+        retiring = self._retiring
+        if ws is not self.ws and ws is not retiring:
+            return False
+        self.last_message = clock.time()
+        if retiring is not None and ws is not retiring:
+            # اولین پیام اتصال جدید: حالا قدیمی را ببند
+            self._retiring = None
+            self.backoff.reset()
+            asyncio.ensure_future(retiring.close())
+            logger.info(f'♻️ Connection #{self.conn.index} handed over to the new socket')
+        return True
+
+    async def _watch(self, ws):
+        """چرخش پیش از قطع 24 ساعته بایننس و بستن اتصال‌های بی‌پیام"""
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            now = clock.time()
+            if now - self.connected_at >= self.hard_limit:
+                logger.warning(f'⚠️ Connection #{self.conn.index} reached the {self.hard_limit / 3600:.0f}h limit '
+                               f'without a replacement; reconnecting')
+                await ws.close()
+                return
+            if now >= self.rotate_at:
+                logger.info(f'♻️ Rotating connection #{self.conn.index} after {(now - self.connected_at) / 3600:.1f}h')
+                self.rotations += 1
+                self._retiring = ws
+                self._retiring_state = (self.conn.live_streams, self.conn.send_lock)
+                self._set(ROTATING)
+                self._replacement = asyncio.ensure_future(self._replace(ws, self.connected_at))
+                return
+            if now - self.last_message >= self.stale_after:
+                logger.warning(f'⚠️ Connection #{self.conn.index} silent for {now - self.last_message:.0f}s; reconnecting')
+                # بازه بی‌پیام هم جزو پنجره بدون داده است
+                self.disconnected_at = self.last_message
+                await ws.close()
+                return
+
+    async def _replace(self, old, old_connected_at):
+        await self._attempt()
+        if self._retiring is not old:
+            return      # جایگزین اولین پیامش را داده بود و حالا خودش تمام شده است
+        self._retiring = None
+        if self._replacement is None or clock.time() - old_connected_at >= self.hard_limit:
+            # قدیمی هم افتاده (حلقه run این task را برداشته) یا به سقف رسیده: اتصال دوباره عادی
+            await old.close()
+            return
+        # جایگزین قبل از اولین پیامش شکست خورد: سوکت سالم قدیمی می‌ماند و چرخش بعد از backoff تکرار می‌شود
+        self._replacement = None
+        if self._watchdog is not None:
+            self._watchdog.cancel()     # watchdog سوکت جایگزین (اگر وصل شده بود)
+        self.ws = old
+        self.connected_at = old_connected_at
+        if self.conn.ws is not old:
+            # جایگزین روی conn attach و بعد detach شده بود
+            self.conn.ws = old
+            self.conn.live_streams, self.conn.send_lock = self._retiring_state
+        delay = self.backoff.next()
+        self.rotate_at = clock.time() + delay
+        logger.warning(f'⚠️ Replacement for connection #{self.conn.index} failed; keeping the old socket, '
+                       f'retrying rotation in {delay:.1f}s')
+        self._watchdog = asyncio.ensure_future(self._watch(old))
+        self._set(CONNECTED)
+
+    # ---- حلقه اصلی ----
+    async def _attempt(self):
+        try:
+            await self.connect(self.conn, self)
+            self.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f'💥 WebSocket error on connection #{self.conn.index}: {e}')
+
+    async def run(self):
+        while not self.conn.closed:
+            self._set(CONNECTING)
+            try:
+                await self._attempt()
+                # چرخش: اتصال جایگزین ادامه همین جلسه است
+                while self._replacement is not None:
+                    replacement, self._replacement = self._replacement, None
+                    if self.ws is not None and self.ws is self._retiring:
+                        # قدیمی قبل از وصل شدن جایگزین افتاد
+                        self.disconnected_at = clock.time()
+                    await replacement
+            finally:
+                if self._replacement is not None:
+                    self._replacement.cancel()
+                    self._replacement = None
+                self._retiring = None
+                self._retiring_state = None
+                self._disconnected()
+            if self.conn.closed:
+                break
+            if self.state == ROTATING:
+                self.backoff.reset()
+                continue          # چرخش برنامه‌ریزی‌شده: بلافاصله وصل شو
+            if self.last_uptime >= STABLE_AFTER:
+                self.backoff.reset()
+                self.attempts = 0
+            self.last_uptime = 0.0
+            self.attempts += 1
+            delay = self.backoff.next()
+            self._set(BACKOFF)
+            logger.info(f'⏳ Connection #{self.conn.index} reconnect attempt {self.attempts} in {delay:.1f}s')
+            await asyncio.sleep(delay)
+        self._set(CLOSED)
+
+    def _disconnected(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        if self.ws is not None:
+            self.ws = None
+            self.last_uptime = clock.time() - self.connected_at
+            if self.disconnected_at is None:
+                self.disconnected_at = clock.time()
+
+    def stats(self):
+        now = clock.time()
+        return {
+            'index': self.conn.index,
+            'state': self.state,
+            'connects': self.connects,
+            'rotations': self.rotations,
+            'attempts': self.attempts,
+            'connected_for_sec': round(now - self.connected_at, 1) if self.ws is not None else None,
+            'missed_windows': self.missed_windows,
+            'missed_seconds': round(self.missed_seconds + (now - self.disconnected_at if self.disconnected_at else 0), 2),
+            'last_reconnect_latency_sec': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'max_reconnect_latency_sec': round(self.max_latency, 3),
+            'last_error': self.last_error,
+        }
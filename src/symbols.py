@@ -0,0 +1,195 @@
+import heapq
+import json
+import logging
+import os
+import time
+from decimal import Decimal
+
+logger = logging.getLogger('whale_ws')
+
+# ======== تنظیمات ========
+EXCHANGE_INFO_URL = os.getenv('EXCHANGE_INFO_URL', 'https://api.binance.com/api/v3/exchangeInfo')
+EXCHANGE_INFO_CACHE = os.getenv('EXCHANGE_INFO_CACHE', 'exchange_info_cache.json')
+EXCHANGE_INFO_TTL = int(os.getenv('EXCHANGE_INFO_TTL', str(24 * 60 * 60)))  # ثانیه
+# برای اجرای آفلاین/تست: مسیر یک فایل exchangeInfo ذخیره‌شده
+EXCHANGE_INFO_FIXTURE = os.getenv('EXCHANGE_INFO_FIXTURE', '')
+
+
+def decimals_from_step(step):
+    """تعداد رقم اعشار از روی tickSize/stepSize (مثلاً '0.00010000' -> 4)"""
+    d = Decimal(str(step)).normalize()
+    if d <= 0:
+        return 0
+    return max(0, -d.as_tuple().exponent)
+
+
+class SymbolMeta:
+    __slots__ = ('id', 'symbol', 'base', 'quote', 'status',
+                 'tick_size', 'step_size', 'price_decimals', 'qty_decimals')
+
+    def __init__(self, id, symbol, base, quote, status, tick_size, step_size):
+        self.id = id
+        self.symbol = symbol
+        self.base = base
+        self.quote = quote
+        self.status = status
+        self.tick_size = float(tick_size)
+        self.step_size = float(step_size)
+        self.price_decimals = decimals_from_step(tick_size)
+        self.qty_decimals = decimals_from_step(step_size)
+
+    def to_dict(self):
+        return {s: getattr(self, s) for s in self.__slots__}
+
+
+class SymbolRegistry:
+    """رجیستری نمادها بر اساس exchangeInfo؛ هر نماد یک id عددی فشرده (0..N-1) می‌گیرد
+
+    id نماد حذف‌شده آزاد و به نماد بعدی داده می‌شود (کوچک‌ترین id آزاد)، پس بزرگ‌ترین id با
+    بیشترین تعداد نمادهای هم‌زمان محدود می‌ماند، نه با تعداد نمادهایی که تا حالا دیده شده."""
+
+    def __init__(self):
+        self._by_symbol = {}
+        self._by_id = []        # id -> SymbolMeta؛ None برای id آزاد
+        self._free = []         # heap از idهای آزاد
+        self._removed = {}      # symbol -> SymbolMeta حذف‌شده (برای حفظ دقت در افزودن دوباره)
+
+    def __len__(self):
+        return len(self._by_symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self._by_symbol
+
+    def __iter__(self):
+        return (meta for meta in self._by_id if meta is not None)
+
+    @property
+    def id_span(self):
+        """بزرگ‌ترین id + 1؛ اندازه لازم برای ساختارهای ایندکس‌شده با id (مثل shared_state)"""
+        return len(self._by_id)
+
+    def get(self, symbol):
+        return self._by_symbol.get(symbol)
+
+    def by_id(self, sym_id):
+        return self._by_id[sym_id]
+
+    def id_of(self, symbol):
+        meta = self._by_symbol.get(symbol)
+        return meta.id if meta is not None else None
+
+    def add(self, symbol, base='', quote='', status='UNKNOWN', tick_size='0.0001', step_size='0.0001'):
+        meta = self._by_symbol.get(symbol)
+        if meta is not None:
+            return meta
+        sym_id = heapq.heappop(self._free) if self._free else len(self._by_id)
+        meta = SymbolMeta(sym_id, symbol, base, quote, status, tick_size, step_size)
+        self._by_symbol[symbol] = meta
+        if sym_id == len(self._by_id):
+            self._by_id.append(meta)
+        else:
+            self._by_id[sym_id] = meta
+        self._removed.pop(symbol, None)
+        return meta
+
+    def ensure(self, symbol):
+        """نماد ناشناخته هم id می‌گیرد تا ساختارهای ایندکس‌شده همیشه جا داشته باشند"""
+        meta = self._by_symbol.get(symbol)
+        if meta is not None:
+            return meta
+        old = self._removed.get(symbol)
+        if old is not None:
+            return self.add(symbol, old.base, old.quote, old.status, old.tick_size, old.step_size)
+        return self.add(symbol)
+
+    def remove(self, symbol):
+        """آزاد کردن id نماد؛ SymbolMeta حذف‌شده یا None"""
+        meta = self._by_symbol.pop(symbol, None)
+        if meta is None:
+            return None
+        self._by_id[meta.id] = None
+        heapq.heappush(self._free, meta.id)
+        self._removed[symbol] = meta
+        return meta
+
+    @classmethod
+    def from_exchange_info(cls, payload, symbols=None):
+        registry = cls()
+        wanted = set(symbols) if symbols else None
+        for item in payload.get('symbols', []):
+            sym = item.get('symbol')
+            if not sym or (wanted is not None and sym not in wanted):
+                continue
+            tick_size = step_size = '0.0001'
+            for f in item.get('filters', []):
+                if f.get('filterType') == 'PRICE_FILTER':
+                    tick_size = f.get('tickSize', tick_size)
+                elif f.get('filterType') == 'LOT_SIZE':
+                    step_size = f.get('stepSize', step_size)
+            registry.add(sym, item.get('baseAsset', ''), item.get('quoteAsset', ''),
+                         item.get('status', 'UNKNOWN'), tick_size, step_size)
+        # نمادهای درخواستی که در exchangeInfo نبودند
+        for sym in symbols or []:
+            registry.ensure(sym)
+        return registry
+
+
+# ======== بارگذاری ========
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _fetch_exchange_info(symbols):
+    import requests
+    params = {}
+    if symbols:
+        params['symbols'] = json.dumps(list(symbols), separators=(',', ':'))
+    response = requests.get(EXCHANGE_INFO_URL, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def _write_cache(path, payload):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'fetched_at': time.time(), 'payload': payload}, f)
+    os.replace(tmp, path)
+
+
+def load_exchange_info(symbols=None, cache_file=EXCHANGE_INFO_CACHE, ttl=EXCHANGE_INFO_TTL,
+                       fixture=EXCHANGE_INFO_FIXTURE):
+    """ترتیب: fixture -> کش تازه -> شبکه -> کش منقضی. در صورت شکست همه، None"""
+    if fixture:
+        logger.info(f'📦 exchangeInfo from fixture {fixture}')
+        return _read_json(fixture)
+
+    cached = None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            cached = _read_json(cache_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f'⚠️ Bad exchangeInfo cache {cache_file}: {e}')
+    if cached and time.time() - cached.get('fetched_at', 0) < ttl:
+        payload = cached.get('payload', {})
+        have = {s.get('symbol') for s in payload.get('symbols', [])}
+        if not symbols or set(symbols) <= have:
+            return payload
+
+    try:
+        payload = _fetch_exchange_info(symbols)
+        if cache_file:
+            _write_cache(cache_file, payload)
+        logger.info(f"🌐 exchangeInfo fetched ({len(payload.get('symbols', []))} symbols)")
+        return payload
+    except Exception as e:
+        logger.warning(f'⚠️ exchangeInfo fetch failed: {e}')
+    if cached:
+        logger.info('📦 Using stale exchangeInfo cache')
+        return cached.get('payload', {})
+    return None
+
+
+def load_registry(symbols=None, **kwargs):
+    payload = load_exchange_info(symbols, **kwargs) or {}
+    return SymbolRegistry.from_exchange_info(payload, symbols)
@@ -0,0 +1,30 @@
+import struct
+from collections import namedtuple
+
+# شناسه عددی صرافی‌ها (اندیس این تاپل)؛ صرافی جدید فقط به انتها اضافه شود
+EXCHANGES = ('binance', 'bybit')
+BINANCE = 0
+
+# رکورد فشرده و یکسان تیک برای همه صرافی‌ها؛ بین مصرف‌کننده‌ها (داخل پروسه و بین پروسه‌ها) جابه‌جا می‌شود
+Tick = namedtuple('Tick', ['symbol', 'price', 'volume', 'price_change_percent', 'ts', 'exchange'],
+                  defaults=(BINANCE,))
+
+# کدگذاری باینری با طول ثابت: نماد 15 بایت + شناسه صرافی 1 بایت + چهار float64 = 48 بایت
+TICK_STRUCT = struct.Struct('<15sBdddd')
+TICK_SIZE = TICK_STRUCT.size
+
+
+def encode_tick(tick):
+    return TICK_STRUCT.pack(tick.symbol.encode()[:15], tick.exchange, tick.price, tick.volume,
+                            tick.price_change_percent, tick.ts)
+
+
+def decode_tick(buf, offset=0):
+    raw, exchange, price, volume, change, ts = TICK_STRUCT.unpack_from(buf, offset)
+    return Tick(raw.rstrip(b'\0').decode(), price, volume, change, ts, exchange)
+
+
+def iter_decode(buf):
+    """همه فریم‌های کامل buf؛ بایت‌های ناقص انتهایی را برنمی‌گرداند"""
+    for offset in range(0, len(buf) - len(buf) % TICK_SIZE, TICK_SIZE):
+        yield decode_tick(buf, offset)
@@ -0,0 +1,184 @@
+import math
+import os
+from collections import deque
+
+# ======== تنظیمات ========
+WHALE_PERCENTILE = float(os.getenv('WHALE_PERCENTILE', '0.999'))       # صدک ارزش معامله
+WHALE_MIN_USD = float(os.getenv('WHALE_MIN_USD', '100000'))            # کف آستانه صدکی
+WHALE_ABSOLUTE_USD = float(os.getenv('WHALE_ABSOLUTE_USD', '1000000'))  # همیشه نهنگ
+WHALE_MIN_SAMPLES = int(os.getenv('WHALE_MIN_SAMPLES', '1000'))        # قبل از این، فقط آستانه مطلق
+WHALE_WINDOW = int(os.getenv('WHALE_WINDOW', '3600'))                  # ثانیه؛ پنجره چرخشی توزیع
+WHALE_COOLDOWN = int(os.getenv('WHALE_COOLDOWN', '60'))                # ثانیه برای هر نماد
+TDIGEST_COMPRESSION = int(os.getenv('TDIGEST_COMPRESSION', '400'))
+
+
+class TDigest:
+    """t-digest ادغامی: حافظه O(compression)، افزودن O(1) سرشکن (مرتب‌سازی بافر)، صدک O(compression)
+    (پیمایش خطی centroidها)"""
+
+    __slots__ = ('compression', 'means', 'weights', 'total', 'buffer', 'buffer_size', 'min', 'max')
+
+    def __init__(self, compression=TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.total = 0.0
+        self.buffer = []
+        self.buffer_size = compression * 5
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return int(self.total + len(self.buffer))
+
+    def add(self, x, w=1.0):
+        self.buffer.append((x, w))
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if len(self.buffer) >= self.buffer_size:
+            self._merge()
+
+    def merge_from(self, other):
+        other._merge()
+        self.buffer.extend(zip(other.means, other.weights))
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._merge()
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k):
+        return (math.sin(min(max(k * 2 * math.pi / self.compression, -math.pi / 2), math.pi / 2)) + 1) / 2
+
+    def _merge(self):
+        if not self.buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        total = sum(w for _, w in items)
+        means, weights = [], []
+        cur_mean, cur_w = items[0]
+        w_so_far = 0.0
+        q_limit = self._k_inv(self._k(0.0) + 1)
+        for x, w in items[1:]:
+            if (w_so_far + cur_w + w) / total <= q_limit:
+                cur_w += w
+                cur_mean += (x - cur_mean) * w / cur_w
+            else:
+                means.append(cur_mean)
+                weights.append(cur_w)
+                w_so_far += cur_w
+                q_limit = self._k_inv(self._k(w_so_far / total) + 1)
+                cur_mean, cur_w = x, w
+        means.append(cur_mean)
+        weights.append(cur_w)
+        self.means, self.weights, self.total = means, weights, total
+
+    def quantile(self, q):
+        self._merge()
+        n = len(self.means)
+        if n == 0:
+            return None
+        if n == 1:
+            return self.means[0]
+        target = q * self.total
+        cum = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, w in zip(self.means, self.weights):
+            center = cum + w / 2
+            if target <= center:
+                span = center - prev_center
+                frac = (target - prev_center) / span if span > 0 else 0.0
+                return prev_mean + frac * (mean - prev_mean)
+            prev_center, prev_mean = center, mean
+            cum += w
+        span = self.total - prev_center
+        frac = (target - prev_center) / span if span > 0 else 1.0
+        return prev_mean + frac * (self.max - prev_mean)
+
+
+class WindowedDigest:
+    """دو digest چرخشی؛ صدک روی پنجره فعلی + قبلی (حدود 1 تا 2 برابر WHALE_WINDOW)"""
+
+    def __init__(self, window=WHALE_WINDOW):
+        self.window = window
+        self.started = None
+        self.current = TDigest()
+        self.previous = None
+
+    def add(self, x, ts):
+        if self.started is None:
+            self.started = ts
+        elif ts - self.started >= self.window:
+            self.previous, self.current = self.current, TDigest()
+            self.started = ts
+        self.current.add(x)
+
+    def count(self):
+        return len(self.current) + (len(self.previous) if self.previous is not None else 0)
+
+    def quantile(self, q):
+        # هر فراخوانی یک digest ادغامی می‌سازد (O(compression log compression))؛ WhaleDetector آستانه را
+        # حداکثر هر ثانیه یکبار برای هر نماد حساب می‌کند
+        if self.previous is None:
+            return self.current.quantile(q)
+        combined = TDigest(self.current.compression)
+        combined.merge_from(self.previous)
+        combined.merge_from(self.current)
+        return combined.quantile(q)
+
+
+class WhaleDetector:
+    """تشخیص معاملات بزرگ روی aggTrade با آستانه صدکی پویا یا مقدار مطلق دلاری"""
+
+    def __init__(self, percentile=WHALE_PERCENTILE, min_usd=WHALE_MIN_USD, absolute_usd=WHALE_ABSOLUTE_USD,
+                 min_samples=WHALE_MIN_SAMPLES, window=WHALE_WINDOW, history=200):
+        self.percentile = percentile
+        self.min_usd = min_usd
+        self.absolute_usd = absolute_usd
+        self.min_samples = min_samples
+        self.window = window
+        self.digests = {}
+        self.thresholds = {}   # symbol -> (threshold, computed_at)
+        self.recent = deque(maxlen=history)
+
+    def threshold(self, symbol, ts):
+        """آستانه صدکی کش‌شده؛ حداکثر هر ثانیه یکبار دوباره محاسبه می‌شود"""
+        cached = self.thresholds.get(symbol)
+        if cached is not None and ts - cached[1] < 1.0:
+            return cached[0]
+        digest = self.digests.get(symbol)
+        value = None
+        if digest is not None and digest.count() >= self.min_samples:
+            value = max(self.min_usd, digest.quantile(self.percentile))
+        self.thresholds[symbol] = (value, ts)
+        return value
+
+    def on_trade(self, symbol, price, qty, ts, buyer_is_maker=False):
+        """رویداد نهنگ (dict) یا None"""
+        notional = price * qty
+        threshold = self.threshold(symbol, ts)
+        digest = self.digests.get(symbol)
+        if digest is None:
+            digest = self.digests[symbol] = WindowedDigest(self.window)
+        digest.add(notional, ts)
+        if notional < self.absolute_usd and (threshold is None or notional < threshold):
+            return None
+        event = {
+            'symbol': symbol,
+            'side': 'SELL' if buyer_is_maker else 'BUY',
+            'price': price,
+            'qty': qty,
+            'notional': notional,
+            'threshold': threshold,
+            'ts': ts,
+        }
+        self.recent.append(event)
+        return event
+
+    def drop_symbol(self, symbol):
+        self.digests.pop(symbol, None)
+        self.thresholds.pop(symbol, None)
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import asgi  # noqa: E402
+import ratelimit  # noqa: E402
+
+
+def _call(app, path, method='GET', query=b'', messages=()):
+    """درخواست به اپ ASGI -> (status, headers, body)"""
+    sent = []
+    incoming = list(messages) or [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'client': ('10.0.0.1', 5000)}
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_routes_status_and_content_types():
+    def boom(query):
+        raise RuntimeError('bad state')
+    app = asgi.AsgiApp({
+        '/': lambda q: '<h1>ok</h1>',
+        '/api/market': lambda q: {'symbol': q.get('symbol')},
+        '/health': lambda q: ({'status': 'stale'}, 503),
+        '/boom': boom,
+    })
+    status, headers, body = _call(app, '/')
+    assert status == 200 and headers[b'content-type'].startswith(b'text/html') and body == b'<h1>ok</h1>'
+    status, headers, body = _call(app, '/api/market', query=b'symbol=BTCUSDT')
+    assert status == 200 and json.loads(body) == {'symbol': 'BTCUSDT'}
+    assert headers[b'content-length'] == str(len(body)).encode()
+    assert _call(app, '/health')[0] == 503
+    assert _call(app, '/boom')[:1] == (500,)
+    assert _call(app, '/missing')[0] == 404
+    assert _call(app, '/', method='POST')[0] == 405
+
+
+def test_lifespan_handshake():
+    sent = []
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+    asyncio.run(asgi.AsgiApp({})({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+
+
+def test_push_hub_sends_only_changed_symbols_and_drops_for_slow_clients():
+    state = {'BTCUSDT': {'price': 1.0}, 'ETHUSDT': {'price': 2.0}}
+    hub = asgi.PushHub(lambda: state, queue_size=2)
+
+    async def main():
+        hub.mark('BTCUSDT')         # بدون کلاینت ثبت نمی‌شود
+        assert not hub.dirty
+        queue = hub.connect()
+        assert json.loads((await queue.get())[6:]) == state         # وضعیت کامل هنگام اتصال
+        hub.mark('ETHUSDT')
+        hub.mark('GONEUSDT')
+        state['ETHUSDT'] = {'price': 3.0}
+        hub.flush()
+        assert json.loads((await queue.get())[6:]) == {'ETHUSDT': {'price': 3.0}}
+        for _ in range(4):
+            hub.mark('BTCUSDT')
+            hub.flush()
+        assert queue.qsize() == 2 and hub.dropped == 2
+        hub.disconnect(queue)
+        assert hub.stats() == {'clients': 0, 'events': 5, 'dropped': 2}
+    asyncio.run(main())
+
+
+def test_stream_delivers_frames_until_disconnect():
+    hub = asgi.PushHub(lambda: {'BTCUSDT': {'price': 1.0}})
+    app = asgi.AsgiApp({}, hub)
+    sent = []
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+        if message.get('more_body'):
+            disconnect.set()
+
+    async def main():
+        await app({'type': 'http', 'method': 'GET', 'path': '/stream'}, receive, send)
+    asyncio.run(main())
+    assert sent[0]['status'] == 200 and dict(sent[0]['headers'])[b'content-type'] == b'text/event-stream'
+    assert sent[1]['body'].startswith(b'data: {"BTCUSDT"')
+    assert hub.clients == set()
+
+
+def test_rate_limit_and_shared_cache():
+    calls = []
+
+    def status(query):
+        calls.append(query)
+        return {'ok': True}
+    limiter = ratelimit.RateLimiter({'/status': (1.0, 2), '/api/market': None})
+    cache = ratelimit.TTLCache(60)
+    app = asgi.AsgiApp({'/status': status, '/api/market': lambda q: {}}, limiter=limiter, cache=cache,
+                       cached=('/status',))
+    assert _call(app, '/status')[0] == 200
+    assert _call(app, '/status')[0] == 200
+    status_code, headers, body = _call(app, '/status')
+    assert status_code == 429 and headers[b'retry-after'] == b'1'
+    assert json.loads(body)['error'] == 'rate limited'
+    assert all(_call(app, '/api/market')[0] == 200 for _ in range(5))
+    # پاسخ کش‌شده یک بار ساخته می‌شود و کلیدش مثل request.full_path در Flask است
+    assert len(calls) == 1
+    assert cache.entries['/status?'][1][1:] == (200, 'application/json')
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import backtest  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'fixtures')
+
+
+def _write_csv(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('timestamp,symbol,price,volume,price_change_percent\n')
+        for i in range(600):        # یک تیک در دقیقه، 10 ساعت
+            minute = i % 60
+            change = 8.0 if i % 90 == 45 else (4.0 if i % 30 == 15 else 0.5)
+            f.write(f'2025-08-14T{i // 60:02d}:{minute:02d}:00,BTCUSDT,{60000 + i * 10},{1000 + i},{change}\n')
+            f.write(f'2025-08-14T{i // 60:02d}:{minute:02d}:30,ETHUSDT,{2500 + i},{500 + i},-0.2\n')
+
+
+def test_load_ticks_csv_and_jsonl(tmp_path):
+    path = str(tmp_path / 'market_data.csv')
+    _write_csv(path)
+    ticks = backtest.load_ticks(path, ['ETHUSDT'])
+    assert len(ticks) == 600 and {t.symbol for t in ticks} == {'ETHUSDT'}
+    assert all(a.ts < b.ts for a, b in zip(ticks, ticks[1:]))
+    recorded = backtest.load_ticks(os.path.join(FIXTURES, 'ws_tickers.jsonl'))
+    assert recorded and recorded[0].symbol == 'BTCUSDT' and recorded[0].ts == 1760000000.0
+
+
+def test_grid_runs_each_combination_in_worker_processes(tmp_path):
+    path = str(tmp_path / 'market_data.csv')
+    _write_csv(path)
+    grid = {'ALERT_THRESHOLD': [3.0, 7.0], 'ALERT_COOLDOWN': [60, 3600],
+            'MIN_CHANGE_PERCENT': [0.1], 'MIN_CHANGE_VOLUME': [0.01]}
+    results = backtest.run_grid(path, grid, workers=2)
+    assert len(results) == 4
+    by = {(r['alert_threshold'], r['alert_cooldown']): r for r in results}
+    assert all(r['ticks'] == 1200 for r in results)
+    assert by[(3.0, 60)]['alerts'] == 20          # هر جهش 4% و 8%
+    assert by[(7.0, 60)]['alerts'] == 7           # فقط جهش‌های 8%
+    assert by[(3.0, 3600)]['alerts'] == 10        # کول‌داون با زمان شبیه‌سازی: ساعتی یکی
+    assert by[(3.0, 60)]['alerts_by_symbol'] == {'BTCUSDT': 20, 'ETHUSDT': 0}
+    assert by[(3.0, 60)]['reports_hourly'] == 10
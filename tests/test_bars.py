@@ -0,0 +1,81 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import bars  # noqa: E402
+
+T0 = 1760000040.0       # ابتدای یک دقیقه
+
+
+def test_on_trade_builds_ohlcv_and_closes_on_next_interval():
+    builder = bars.BarBuilder(intervals=('1m',))
+    closed = []
+    builder.listeners.append(lambda symbol, interval, bar: closed.append((symbol, interval, bar)))
+    for offset, price, qty in ((1, 100.0, 1.0), (10, 105.0, 2.0), (20, 95.0, 0.5), (59, 101.0, 1.5)):
+        builder.on_trade('BTCUSDT', price, qty, T0 + offset)
+    assert closed == []
+    builder.on_trade('BTCUSDT', 102.0, 1.0, T0 + 61)
+    assert closed == [('BTCUSDT', '1m', (T0, 100.0, 105.0, 95.0, 101.0, 5.0, 4))]
+    assert builder.ring('BTCUSDT', '1m').last() == [(T0, 100.0, 105.0, 95.0, 101.0, 5.0, 4.0)]
+    assert builder.current[('BTCUSDT', '1m')][0] == T0 + 60
+
+
+def test_flush_idle_waits_for_grace_then_drops_later_trades():
+    builder = bars.BarBuilder(intervals=('1m',), grace=2)
+    builder.on_trade('BTCUSDT', 100.0, 1.0, T0 + 5)
+    builder.flush_idle(T0 + 61)                 # بازه تمام شده ولی هنوز در مهلت
+    assert builder.ring('BTCUSDT', '1m').count == 0
+    builder.on_trade('BTCUSDT', 110.0, 1.0, T0 + 59.9)     # معامله دیررس در مهلت حساب می‌شود
+    builder.flush_idle(T0 + 62)
+    assert builder.ring('BTCUSDT', '1m').last() == [(T0, 100.0, 110.0, 100.0, 110.0, 2.0, 2.0)]
+    builder.on_trade('BTCUSDT', 120.0, 1.0, T0 + 59.95)    # بعد از بستن: دور ریخته می‌شود
+    assert builder.late == 1
+    assert ('BTCUSDT', '1m') not in builder.current
+    assert builder.ring('BTCUSDT', '1m').count == 1
+
+
+def test_ring_keeps_last_capacity_bars():
+    ring = bars.BarRing(3)
+    for i in range(5):
+        ring.append((float(i), 1.0, 1.0, 1.0, 1.0, 1.0, 1.0))
+    assert [bar[0] for bar in ring.last()] == [2.0, 3.0, 4.0]
+    assert [bar[0] for bar in ring.last(2)] == [3.0, 4.0]
+    assert ring.column('open_time', 10) == [2.0, 3.0, 4.0]
+
+
+def test_on_kline_only_closed_and_not_trade_intervals():
+    builder = bars.BarBuilder(intervals=('1m',))
+    k = {'t': 1760000000000, 'i': '1h', 'o': '1', 'h': '3', 'l': '0.5', 'c': '2', 'v': '10', 'n': 7, 'x': False}
+    builder.on_kline('BTCUSDT', k)
+    assert ('BTCUSDT', '1h') not in builder.rings
+    builder.on_kline('BTCUSDT', dict(k, x=True))
+    builder.on_kline('BTCUSDT', dict(k, i='1m', x=True))       # 1m از معاملات ساخته می‌شود
+    assert builder.ring('BTCUSDT', '1h').last() == [(1760000000.0, 1.0, 3.0, 0.5, 2.0, 10.0, 7.0)]
+    assert builder.ring('BTCUSDT', '1m').count == 0
+
+
+def test_drop_symbol_forgets_all_state():
+    builder = bars.BarBuilder(intervals=('1s', '1m'), grace=0)
+    builder.on_trade('ETHUSDT', 1.0, 1.0, T0)
+    builder.flush_idle(T0 + 1)
+    builder.drop_symbol('ETHUSDT')
+    assert not builder.rings and not builder.current and not builder.closed
+
+
+def test_bar_store_appends_only_configured_intervals(tmp_path):
+    store = bars.BarStore(str(tmp_path), intervals=('1m',))
+    bar = (T0, 100.0, 105.0, 95.0, 101.0, 5.0, 4)
+    store.on_close('BTCUSDT', '1m', bar)
+    store.on_close('BTCUSDT', '1s', bar)
+    assert store.flush() == 1
+    store.on_close('ETHUSDT', '1m', bar)
+    assert store.flush() == 1
+    assert store.flush() == 0
+    assert not os.path.exists(tmp_path / 'bars_1s.csv')
+    with open(tmp_path / 'bars_1m.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:2] == ['open_time', 'symbol']
+    assert [r[1] for r in rows[1:]] == ['BTCUSDT', 'ETHUSDT']
+    assert rows[1][0] == str(int(T0)) and rows[1][-1] == '4'
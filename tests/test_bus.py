@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import bus  # noqa: E402
+from ticks import TICK_SIZE, Tick, decode_tick, encode_tick  # noqa: E402
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_tick_frame_round_trip():
+    tick = Tick('BTCUSDT', 67000.5, 12.25, -1.5, 1760000000.125, 1)
+    frame = encode_tick(tick)
+    assert len(frame) == TICK_SIZE
+    assert decode_tick(frame) == tick
+
+
+def test_handlers_and_filtered_subscription():
+    tick_bus = bus.TickBus()
+    seen, got = [], []
+    tick_bus.add_handler(lambda t: 1 / 0)              # خطای یک handler بقیه را متوقف نمی‌کند
+    tick_bus.add_handler(seen.append)
+    sub = tick_bus.subscribe(got.append, symbols=['ETHUSDT'])
+    tick_bus.publish(Tick('BTCUSDT', 1.0, 1.0, 0.0, 1.0))
+    tick_bus.publish(Tick('ETHUSDT', 2.0, 1.0, 0.0, 1.0))
+    assert [t.symbol for t in seen] == ['BTCUSDT', 'ETHUSDT']
+    assert _wait(lambda: len(got) == 1) and got[0].symbol == 'ETHUSDT'
+    tick_bus.unsubscribe(sub)
+    assert tick_bus.subscriptions == []
+
+
+def test_slow_subscriber_drops_oldest():
+    gate = threading.Event()
+    got = []
+    sub = bus.Subscription(lambda t: (gate.wait(), got.append(t)), maxlen=2)
+    for i in range(5):
+        sub.offer(Tick('BTCUSDT', float(i), 1.0, 0.0, 1.0))
+    gate.set()
+    assert _wait(lambda: sub.dropped + len(got) + len(sub.queue) >= 5 and not sub.queue)
+    assert sub.dropped >= 2
+    assert got[-1].price == 4.0
+    sub.close()
+
+
+def _run_server(path, handshakes):
+    async def scenario():
+        server = await bus.BusServer(path).start()
+        results = []
+        for line in handshakes:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(line)
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            server.publish(Tick('BTCUSDT', 1.0, 1.0, 0.0, 1.0))
+            try:
+                data = await asyncio.wait_for(reader.read(TICK_SIZE), timeout=1)
+            except asyncio.TimeoutError:
+                data = None
+            results.append((data, len(server.clients)))
+            writer.close()
+            await asyncio.sleep(0.05)
+        server.close()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_bus_server_rejects_non_object_handshake(tmp_path):
+    path = str(tmp_path / 'bus.sock')
+    results = _run_server(path, [b'[]\n', b'"x"\n', b'{"symbols": "BTCUSDT"}\n', b'{"symbols": [1]}\n'])
+    for data, clients in results:
+        assert data == b''                 # اتصال بسته شد، بدون AttributeError در handler
+        assert clients == 0
+
+
+def test_bus_server_delivers_frames(tmp_path):
+    path = str(tmp_path / 'bus.sock')
+    (data, clients), (other, _) = _run_server(path, [b'{"symbols": ["BTCUSDT"]}\n', b'{"symbols": ["ETHUSDT"]}\n'])
+    assert clients == 1 and decode_tick(data).symbol == 'BTCUSDT'
+    assert other is None                   # فیلتر نماد
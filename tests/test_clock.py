@@ -0,0 +1,48 @@
+import os
+import sys
+from datetime import timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import clock  # noqa: E402
+
+
+def test_sim_clock_only_moves_forward():
+    sim = clock.SimClock(100)
+    sim.set(90)                 # تیک خارج از ترتیب ساعت را عقب نمی‌برد
+    assert sim.time() == 100.0
+    sim.set(150.5)
+    sim.advance(10)
+    assert sim.time() == 160.5
+    assert sim.now(timezone.utc).timestamp() == 160.5
+
+
+def test_use_swaps_global_clock():
+    sim = clock.SimClock(1760000000)
+    previous = clock.use(sim)
+    try:
+        assert clock.current() is sim
+        assert clock.time() == 1760000000.0
+        assert clock.now(timezone.utc).year == 2025
+    finally:
+        assert clock.use(previous) is sim
+    assert isinstance(clock.current(), clock.RealClock)
+
+
+@pytest.mark.parametrize('text, offset, label', [
+    ('', timedelta(0), '+00:00'),
+    ('UTC', timedelta(0), '+00:00'),
+    ('+03:30', timedelta(hours=3, minutes=30), '+03:30'),
+    ('-0500', timedelta(hours=-5), '-05:00'),
+])
+def test_parse_tz(text, offset, label):
+    tz = clock.parse_tz(text)
+    assert tz.utcoffset(None) == offset
+    assert clock.tz_label(tz) == label
+
+
+def test_parse_tz_rejects_names():
+    with pytest.raises(ValueError):
+        clock.parse_tz('Asia/Tehran')
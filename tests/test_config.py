@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import config  # noqa: E402
+
+ENV = ('TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID', 'BINANCE_STREAMS', 'BINANCE_WS_BASE', 'ALERT_THRESHOLD',
+       'ALERT_COOLDOWN', 'REPORT_TZ', 'CSV_FILE', 'CSV_SAVE_INTERVAL')
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ENV:
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_repo_config_loads():
+    cfg = config.load_config()
+    assert 'BTCUSDT' in cfg.binance.symbols
+    assert cfg.binance.websocket_base.endswith('streams=')     # لیست استریم‌های websocket_url قدیمی حذف می‌شود
+    assert 'ticker' in cfg.binance.streams
+
+
+def test_parse_config_normalizes_and_applies_env(monkeypatch):
+    monkeypatch.setenv('ALERT_THRESHOLD', '7.5')
+    cfg = config.parse_config({
+        'telegram': {'chat_id': '1, 2,'},
+        'binance': {'symbols': [' btcusdt', 'BTCUSDT', 'ethusdt'], 'websocket_base': 'ws://127.0.0.1:9000'},
+    })
+    assert cfg.telegram.chat_ids == ('1', '2')
+    assert cfg.binance.symbols == ('BTCUSDT', 'ETHUSDT')
+    assert cfg.binance.websocket_base == 'ws://127.0.0.1:9000/stream?streams='
+    assert cfg.alerts.threshold == 7.5
+    assert cfg.reports == config.ReportConfig()
+
+
+@pytest.mark.parametrize('data', [
+    [],
+    {'binance': {'symbols': ['BTC-USDT']}},
+    {'binance': {'symbols': ['BTCUSDT'], 'streams': ['aggTrade']}},      # ticker الزامی است
+    {'binance': {'streams': ['kline_2m', 'ticker']}},
+    {'alerts': {'threshold': 'high'}},
+    {'alerts': {'cooldown': -1}},
+    {'reports': {'interval': 0}},
+    {'reports': {'timezone': 'Mars/Base'}},
+    {'csv': 'market_data.csv'},
+])
+def test_parse_config_rejects_invalid(data):
+    with pytest.raises(config.ConfigError):
+        config.parse_config(data)
+
+
+def test_load_config_reports_yaml_errors(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text('binance: [unclosed\n', encoding='utf-8')
+    with pytest.raises(config.ConfigError, match='YAML parse error'):
+        config.load_config(str(path))
+
+
+def test_watcher_applies_valid_changes_and_keeps_current_on_invalid(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text('binance:\n  symbols: [BTCUSDT]\n', encoding='utf-8')
+    changes = []
+    watcher = config.ConfigWatcher(str(path), lambda new, old: changes.append((new, old)),
+                                   current=config.load_config(str(path)))
+    assert not watcher.check()                  # بدون تغییر
+
+    path.write_text('binance:\n  symbols: [BTCUSDT, ETHUSDT]\n', encoding='utf-8')
+    os.utime(path, ns=(1, 1))                   # mtime متفاوت حتی با دقت پایین فایل‌سیستم
+    assert watcher.check()
+    assert changes[-1][0].binance.symbols == ('BTCUSDT', 'ETHUSDT')
+    assert changes[-1][1].binance.symbols == ('BTCUSDT',)
+
+    path.write_text('binance:\n  symbols: [not a symbol]\n', encoding='utf-8')
+    os.utime(path, ns=(2, 2))
+    assert not watcher.check()
+    assert watcher.current.binance.symbols == ('BTCUSDT', 'ETHUSDT')
+    assert len(changes) == 1
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import correlation  # noqa: E402
+
+
+def test_rolling_covariance_matches_numpy():
+    rng = np.random.default_rng(40)
+    data = rng.normal(size=(200, 4)) @ rng.normal(size=(4, 4))
+    stats = correlation.RollingCovariance(4, window=30)
+    for t, x in enumerate(data):
+        stats.push(x)
+        window = data[max(0, t - 29):t + 1]
+        if len(window) < 2:
+            assert stats.covariance() is None
+            continue
+        np.testing.assert_allclose(stats.mean, window.mean(axis=0), atol=1e-9)
+        np.testing.assert_allclose(stats.covariance(), np.cov(window, rowvar=False), atol=1e-9)
+        np.testing.assert_allclose(stats.total, window.sum(axis=0), atol=1e-9)
+    np.testing.assert_allclose(stats.correlation(), np.corrcoef(data[-30:], rowvar=False), atol=1e-9)
+
+
+def test_window_of_one_and_constant_column():
+    stats = correlation.RollingCovariance(2, window=1)
+    for x in ([1.0, 2.0], [3.0, 4.0]):
+        stats.push(np.array(x))
+    np.testing.assert_allclose(stats.mean, [3.0, 4.0])
+    stats = correlation.RollingCovariance(2, window=5)
+    for v in (1.0, 2.0, 3.0):
+        stats.push(np.array([v, 0.0]))
+    corr = stats.correlation()
+    assert corr[0, 0] == pytest.approx(1.0) and np.isnan(corr[0, 1])
+
+
+def test_select_keeps_columns_consistent():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(20, 3))
+    stats = correlation.RollingCovariance(3, window=10)
+    for x in data:
+        stats.push(x)
+    stats.select([2, 0], 1)
+    window = np.column_stack([data[-10:, 2], data[-10:, 0], np.zeros(10)])
+    np.testing.assert_allclose(stats.covariance(), np.cov(window, rowvar=False), atol=1e-9)
+    for x in rng.normal(size=(5, 3)):
+        stats.push(x)
+        window = np.vstack([window[1:], x])
+    np.testing.assert_allclose(stats.covariance(), np.cov(window, rowvar=False), atol=1e-9)
+
+
+def test_engine_buckets_and_relative_strength():
+    engine = correlation.CorrelationEngine(['BTCUSDT', 'ETHUSDT'], bucket=60, window=20, long_window=40)
+    price = {'BTCUSDT': 100.0, 'ETHUSDT': 10.0}
+    for b in range(30):
+        price['BTCUSDT'] *= 1.01 if b % 2 else 0.995
+        price['ETHUSDT'] *= 1.02 if b % 2 else 0.99     # بتای حدود 2 نسبت به BTC
+        for symbol, p in price.items():
+            engine.on_tick(symbol, p, b * 60 + 1)
+    assert engine.buckets == 29 and engine.ready
+    rs = engine.relative_strength()
+    assert rs['BTCUSDT']['beta'] == pytest.approx(1.0)
+    assert rs['ETHUSDT']['corr'] > 0.99 and rs['ETHUSDT']['beta'] == pytest.approx(2.0, rel=0.05)
+    engine.set_symbols(['ETHUSDT', 'SOLUSDT'])
+    assert engine.symbols == ['ETHUSDT', 'SOLUSDT'] and engine.short.mean.shape == (2,)
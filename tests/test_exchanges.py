@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import exchanges  # noqa: E402
+from ticks import EXCHANGES  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'fixtures')
+
+
+def _messages(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_binance_normalize():
+    adapter = exchanges.make_adapter('binance', 'ws://x/')
+    msg = _messages('ws_tickers.jsonl')[0]
+    tick = adapter.normalize(msg, 1760000000.5)
+    assert tick == ('BTCUSDT', 66972.79, 9832376.99, -1.411, 1760000000.5, EXCHANGES.index('binance'))
+    assert adapter.normalize(msg['data'], 1.0).symbol == 'BTCUSDT'     # پیام تک‌استریمی بدون پوشش
+    assert adapter.normalize({'data': {'e': 'aggTrade'}}, 1.0) is None
+    assert adapter.is_control({'result': None, 'id': 1})
+
+
+def test_bybit_normalize_percent_and_controls():
+    adapter = exchanges.make_adapter('bybit', 'ws://y')
+    tick = adapter.normalize(_messages('ws_bybit_tickers.jsonl')[0], 5.0)
+    assert tick.symbol == 'BTCUSDT' and tick.price == 66961.12
+    assert tick.price_change_percent == pytest.approx(-0.63)      # price24hPcnt کسری است
+    assert tick.exchange == EXCHANGES.index('bybit')
+    assert adapter.normalize({'topic': 'orderbook.1.BTCUSDT', 'data': {}}, 5.0) is None
+    pong = {'success': True, 'ret_msg': 'pong', 'op': 'ping'}
+    assert adapter.is_control(pong) and adapter.normalize(pong, 5.0) is None
+    assert adapter.streams_for('btcusdt', ('ticker', 'aggTrade')) == ['tickers.BTCUSDT']
+    assert json.loads(adapter.control_message('SUBSCRIBE', ['tickers.BTCUSDT'], 7)) == {
+        'op': 'subscribe', 'args': ['tickers.BTCUSDT'], 'req_id': '7'}
+
+
+def test_make_adapter_defaults_and_unknown():
+    assert exchanges.make_adapter('bybit').base_url == exchanges.BYBIT_WS_BASE
+    with pytest.raises(ValueError, match='unknown exchange'):
+        exchanges.make_adapter('kraken')
+
+
+def test_spread_consumer_alerts_once_per_cooldown(monkeypatch):
+    import main
+    from ticks import Tick
+    alerts = []
+    monkeypatch.setattr(main, 'venue_prices', {})
+    monkeypatch.setattr(main, 'last_spread_alert', {})
+    monkeypatch.setattr(main, 'send_alert_nonblocking', alerts.append)
+    bybit = EXCHANGES.index('bybit')
+    main.spread_consumer(Tick('BTCUSDT', 100.0, 1.0, 0.0, 1000.0))
+    main.spread_consumer(Tick('BTCUSDT', 100.1, 1.0, 0.0, 1000.0, bybit))      # زیر آستانه
+    assert alerts == []
+    main.spread_consumer(Tick('BTCUSDT', 102.0, 1.0, 0.0, 1001.0, bybit))
+    assert len(alerts) == 1 and 'BTCUSDT' in alerts[0]
+    main.spread_consumer(Tick('BTCUSDT', 103.0, 1.0, 0.0, 1002.0, bybit))      # کول‌داون
+    assert len(alerts) == 1
+    main.spread_consumer(Tick('ETHUSDT', 10.0, 1.0, 0.0, 1000.0))
+    main.spread_consumer(Tick('ETHUSDT', 20.0, 1.0, 0.0, 1000.0 + main.SPREAD_MAX_AGE + 1, bybit))
+    assert len(alerts) == 1             # قیمت بایننس قدیمی است
@@ -0,0 +1,79 @@
+import gzip
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import export  # noqa: E402
+
+SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'SOLUSDT')
+
+
+def _write_csv(path, rows=3000):
+    rng = random.Random(50)
+    t = datetime(2025, 8, 14)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('timestamp,symbol,price,volume,price_change_percent\n')
+        for _ in range(rows):
+            t += timedelta(milliseconds=rng.randint(0, 3000))
+            f.write(f'{t.isoformat()},{rng.choice(SYMBOLS)},{rng.uniform(1, 70000):.2f},{rng.uniform(0, 1e6):.3f},0.5\n')
+    return t
+
+
+def _reference(path, symbols, start, end):
+    """فیلتر سطر به سطر بدون seek و تکه‌بندی"""
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    out = [lines[0]]
+    for line in lines[1:]:
+        t, symbol = line.decode().split(',')[:2]
+        if start and t < start or end and t >= end:
+            continue
+        if not symbols or symbol in symbols:
+            out.append(line)
+    return b''.join(out)
+
+
+def test_iter_csv_matches_reference(tmp_path, monkeypatch):
+    path = str(tmp_path / 'market_data.csv')
+    last = _write_csv(path)
+    first = datetime(2025, 8, 14)
+    span = (last - first).total_seconds()
+    cases = [(None, None, None), (['ETHUSDT'], None, None)]
+    for frac_start, frac_end in ((0.1, 0.9), (0.5, None), (None, 0.3), (0.33, 0.34)):
+        start = (first + timedelta(seconds=span * frac_start)).isoformat() if frac_start else None
+        end = (first + timedelta(seconds=span * frac_end)).isoformat() if frac_end else None
+        cases += [(None, start, end), (['BTCUSDT', 'SOLUSDT'], start, end)]
+    for chunk in (37, 64, 100, 1024, 4096, 1 << 20):
+        monkeypatch.setattr(export, 'EXPORT_CHUNK', chunk)
+        for symbols, start, end in cases:
+            got = b''.join(export.iter_csv(path, symbols, start, end))
+            assert got == _reference(path, symbols, start, end), (chunk, symbols, start, end)
+
+
+def test_resume_rebuilds_same_bytes_after_growth(tmp_path):
+    path = str(tmp_path / 'market_data.csv')
+    _write_csv(path)
+    directory = str(tmp_path / 'exports')
+    st = os.stat(path)
+    key = export.export_key(path, ['BTCUSDT'], None, None, 'csv.gz', st)
+    export.save_params(key, path, ['BTCUSDT'], None, None, 'csv.gz', st.st_size, directory)
+    stream = export.spool(export.iter_export(path, ['BTCUSDT'], fmt='csv.gz', size=st.st_size), key, 'csv.gz',
+                          directory)
+    first = next(stream)
+    stream.close()                      # دانلود قطع شد
+    assert export.find_spool(key, 'csv.gz', directory) is None
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('2030-01-01T00:00:00,BTCUSDT,1.0,1.0,0.0\n')
+    params = export.load_params(key, 'csv.gz', directory)
+    rebuilt = export.build_spool(export.iter_export(**params), key, 'csv.gz', directory)
+    with open(rebuilt, 'rb') as f:
+        data = f.read()
+    assert data.startswith(first)
+    with open(path, 'rb') as f:
+        original = f.read(st.st_size)
+    expected = b''.join(line for line in original.splitlines(keepends=True)
+                        if line.startswith(b'timestamp') or line.split(b',')[1] == b'BTCUSDT')
+    assert gzip.decompress(data) == expected
@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import ingest_http  # noqa: E402
+
+flask = pytest.importorskip('flask')
+
+
+def _serve(tmp_path):
+    app = flask.Flask(__name__)
+
+    @app.route('/echo', methods=['GET', 'POST'])
+    def echo():
+        return flask.jsonify({
+            'args': flask.request.args.to_dict(),
+            'body': flask.request.get_json(silent=True),
+            'token': flask.request.headers.get('X-Admin-Token'),
+            'cookie': flask.request.headers.get('Cookie'),
+            'internal': bool(flask.request.environ.get(ingest_http.INTERNAL)),
+        }), 201
+
+    path = str(tmp_path / 'ingest.sock')
+    threading.Thread(target=ingest_http.serve, args=(app, path), daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.02)
+    return path
+
+
+def test_forward_round_trip(tmp_path):
+    path = _serve(tmp_path)
+    status, headers, body = ingest_http.forward(
+        'POST', '/echo?symbol=BTCUSDT', {'X-Admin-Token': 't', 'Cookie': 'x', 'Content-Type': 'application/json'},
+        b'{"add": ["SOLUSDT"]}', socket_path=path)
+    assert status == 201
+    assert dict(headers)['Content-Type'] == 'application/json'
+    data = flask.json.loads(body)
+    assert data == {'args': {'symbol': 'BTCUSDT'}, 'body': {'add': ['SOLUSDT']}, 'token': 't',
+                    'cookie': None, 'internal': True}
+
+
+def test_forward_without_ingest_raises_oserror(tmp_path):
+    with pytest.raises(OSError):
+        ingest_http.forward('GET', '/echo', {}, socket_path=str(tmp_path / 'missing.sock'))
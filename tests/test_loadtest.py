@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import loadtest  # noqa: E402
+
+
+def test_percentiles():
+    assert loadtest.percentiles([]) == {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+    stats = loadtest.percentiles([float(v) for v in range(100, 0, -1)])
+    assert stats == {'p50_ms': 51.0, 'p90_ms': 91.0, 'p99_ms': 100.0, 'max_ms': 100.0}
+
+
+def test_recording_symbols_in_first_seen_order(tmp_path):
+    path = tmp_path / 'rec.jsonl'
+    path.write_text('\n'.join([
+        '{"stream":"ethusdt@ticker","data":{"e":"24hrTicker","s":"ETHUSDT"}}',
+        '{"e":"24hrTicker","s":"BTCUSDT"}',
+        '',
+        '{"stream":"btcusdt@aggTrade","data":{"e":"aggTrade","s":"SOLUSDT"}}',
+        '{"stream":"ethusdt@ticker","data":{"e":"24hrTicker","s":"ETHUSDT"}}',
+    ]), encoding='utf-8')
+    assert loadtest.recording_symbols(str(path)) == ['ETHUSDT', 'BTCUSDT']
+    fixture = os.path.join(loadtest.FIXTURES, 'ws_tickers.jsonl')
+    assert loadtest.recording_symbols(fixture)[:2] == ['BTCUSDT', 'ETHUSDT']
+
+
+def test_status_sampler_window():
+    sampler = loadtest.StatusSampler('localhost', 1)
+    sampler.samples = [(10.0, 5.0, 100), (11.0, None, 150), (12.0, 9.0, 300), (20.0, 50.0, 1000)]
+    assert sampler.window(10.0, 12.0) == {'samples': 3, 'messages_per_s': 100.0,
+                                          'lag_ms_p50': 9.0, 'lag_ms_p99': 9.0, 'lag_ms_max': 9.0}
+
+
+def test_compare_matches_levels_by_concurrency():
+    def run(git, rps, p99):
+        return {'meta': {'git': git}, 'levels': [
+            {'concurrency': 8, 'rps': rps, 'ingest': {'lag_ms_p99': 3.0},
+             'endpoints': {'/api/market': {'p99_ms': p99}}},
+            {'concurrency': 64, 'rps': rps, 'ingest': {'lag_ms_p99': 3.0}, 'endpoints': {}},
+        ][:2 if git == 'new' else 1]}
+    text = loadtest.compare(run('old', 900, 12.5), run('new', 1000, 8.0))
+    assert text.splitlines() == ['old -> new',
+                                 'c=8: rps 900 -> 1000, ingest lag p99 3.0 -> 3.0 ms',
+                                 '  /api/market: p99 12.5 -> 8.0 ms']
@@ -0,0 +1,55 @@
+import json
+import logging
+import os
+import queue
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import logs  # noqa: E402
+
+
+def _record(msg, args, created, level=logging.ERROR):
+    record = logging.LogRecord('whale_ws', level, __file__, 1, msg, args, None)
+    record.created = created
+    return record
+
+
+def test_repeated_exception_args_are_suppressed():
+    dedup = logs.DedupFilter(window=10)
+    # هر رکورد یک نمونه تازه از استثنا دارد (مثل except Exception as e: logger.error(..., e))
+    passed = [dedup.filter(_record('WebSocket error: %s', (ConnectionResetError('reset by peer'),), 100 + i * 0.1))
+              for i in range(50)]
+    assert passed == [True] + [False] * 49
+    assert dedup.filter(_record('WebSocket error: %s', (TimeoutError('reset by peer'),), 101))    # نوع دیگر
+    late = _record('WebSocket error: %s', (ConnectionResetError('reset by peer'),), 111)
+    assert dedup.filter(late)
+    assert late.suppressed == 49
+
+
+def test_distinct_args_and_unhashable_args():
+    dedup = logs.DedupFilter(window=10)
+    assert dedup.filter(_record('price %s', ('BTCUSDT',), 1))
+    assert dedup.filter(_record('price %s', ('ETHUSDT',), 1))
+    assert not dedup.filter(_record('price %s', ('BTCUSDT',), 2))
+    assert dedup.filter(_record('batch %s', (['a', 'b'],), 1))
+    assert not dedup.filter(_record('batch %s', (['a', 'b'],), 2))
+    assert dedup.filter(_record('batch %s', (['a', 'b'],), 2, level=logging.WARNING))    # سطح دیگر
+    assert logs.DedupFilter(window=0).filter(_record('price %s', ('BTCUSDT',), 1))
+
+
+def test_lazy_queue_handler_drops_when_full():
+    handler = logs.LazyQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(_record('tick %d', (i,), i))
+    assert handler.queue.qsize() == 2
+    record = handler.queue.get_nowait()
+    assert record.msg == 'tick %d' and record.args == (0,)      # فرمت نشده در thread فراخواننده
+
+
+def test_json_formatter_includes_extra_fields():
+    record = _record('%s control error: %s', ('bybit', 'bad'), 1.5)
+    record.exchange = 'bybit'
+    entry = json.loads(logs.JsonFormatter().format(record))
+    assert entry == {'ts': 1.5, 'level': 'ERROR', 'logger': 'whale_ws', 'msg': 'bybit control error: bad',
+                     'exchange': 'bybit'}
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# در subprocess تا ماژول‌هایی که تست‌های دیگر وارد کرده‌اند نتیجه را خراب نکنند
+CHECK = '''
+import sys, threading
+import main
+heavy = sorted(m for m in ('flask', 'pandas', 'numpy', 'matplotlib', 'requests', 'websockets') if m in sys.modules)
+print(threading.active_count(), ','.join(heavy) or '-')
+'''
+
+
+def test_import_main_is_lazy(tmp_path):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run([sys.executable, '-c', CHECK], cwd=str(tmp_path), env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    threads, heavy = out.stdout.split()[-2:]
+    assert threads == '1'           # هیچ thread پس‌زمینه‌ای هنگام import
+    assert heavy == '-'
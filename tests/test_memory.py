@@ -0,0 +1,43 @@
+import os
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import memory  # noqa: E402
+
+
+def test_bounded_dict_evicts_oldest_inserted_key():
+    d = memory.BoundedDict(maxlen=3)
+    for key in 'abc':
+        d[key] = 1
+    d['a'] = 2                  # به‌روزرسانی کلید موجود چیزی را بیرون نمی‌کند
+    d.update({'d': 1, 'e': 1})
+    assert list(d) == ['c', 'd', 'e'] and d.evicted == 2
+    assert len(d) == 3
+
+
+def test_buffer_sizes_reports_caps_and_evictions():
+    monitor = memory.MemoryMonitor(history=10, trace=False)
+    bounded = monitor.register('bounded', memory.BoundedDict(maxlen=2))
+    bounded.update({'a': 1, 'b': 2, 'c': 3})
+    monitor.register('recent', deque([1, 2], maxlen=5))
+    monitor.register('ids', lambda: 7, cap=256)
+    monitor.register('broken', lambda: 1 / 0)
+    assert monitor.buffer_sizes() == {
+        'bounded': {'size': 2, 'cap': 2, 'evicted': 1},
+        'recent': {'size': 2, 'cap': 5},
+        'ids': {'size': 7, 'cap': 256},
+        'broken': {'size': None, 'cap': None},
+    }
+
+
+def test_growth_per_hour_uses_second_half(monkeypatch):
+    monitor = memory.MemoryMonitor(history=20, trace=False)
+    rss = iter([100 * 2**20] * 4 + [100 * 2**20 + i * 2**20 for i in range(8)])
+    monkeypatch.setattr(memory, 'rss_bytes', lambda: next(rss))
+    for i in range(12):
+        monitor.sample(now_ts=i * 300.0)
+    # نیمه دوم: 1 MB در هر 5 دقیقه = 12 MB در ساعت
+    assert abs(monitor.growth_per_hour() / 2**20 - 12.0) < 1e-6
+    assert memory.MemoryMonitor().growth_per_hour() is None
@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import orderbook  # noqa: E402
+
+SNAPSHOT = {'lastUpdateId': 100,
+            'bids': [['99.0', '1.0'], ['100.0', '2.0'], ['98.0', '3.0']],
+            'asks': [['101.0', '1.5'], ['102.0', '0.5']]}
+
+
+def _diff(first, final, bids=(), asks=()):
+    return {'U': first, 'u': final, 'b': [list(b) for b in bids], 'a': [list(a) for a in asks]}
+
+
+def test_book_side_keeps_levels_sorted():
+    bids = orderbook.BookSide(descending=True)
+    for price, qty in ((99.0, 1.0), (101.0, 2.0), (100.0, 3.0)):
+        bids.set(price, qty)
+    assert bids.top(3) == [(101.0, 2.0), (100.0, 3.0), (99.0, 1.0)]
+    bids.set(100.0, 5.0)
+    bids.set(101.0, 0)          # حذف سطح
+    bids.set(50.0, 0)           # حذف سطح ناموجود: بی‌اثر
+    assert bids.top(5) == [(100.0, 5.0), (99.0, 1.0)]
+    assert bids.best() == 100.0 and bids.qty(1) == 5.0
+    bids.trim(1)
+    assert len(bids) == 1
+
+
+def test_buffered_diffs_applied_after_snapshot():
+    book = orderbook.LocalOrderBook('BTCUSDT')
+    assert book.on_diff(_diff(95, 99, bids=[('100.0', '9.0')]))        # قدیمی‌تر از snapshot
+    assert book.on_diff(_diff(100, 102, bids=[('100.0', '4.0')]))      # U <= 101 <= u
+    assert book.on_diff(_diff(103, 103, asks=[('101.0', '0')]))
+    assert book.apply_snapshot(SNAPSHOT)
+    assert book.last_update_id == 103
+    assert book.bids.top(1) == [(100.0, 4.0)]
+    assert book.asks.best() == 102.0
+    assert book.spread() == 2.0 and book.mid() == 101.0
+
+
+def test_sequence_gap_requires_resync():
+    book = orderbook.LocalOrderBook('BTCUSDT')
+    assert book.apply_snapshot(SNAPSHOT)
+    assert not book.on_diff(_diff(105, 106))            # اولین diff باید 101 را پوشش دهد
+    assert book.on_diff(_diff(99, 101))
+    assert book.on_diff(_diff(102, 104))
+    assert not book.on_diff(_diff(106, 107))            # شکاف 105
+    book.reset()
+    assert not book.synced and book.resyncs == 1
+    assert book.on_diff(_diff(106, 107))                # بافر تا snapshot بعدی
+    assert book.buffer
+
+
+def test_buffered_gap_fails_snapshot():
+    book = orderbook.LocalOrderBook('BTCUSDT')
+    book.on_diff(_diff(101, 102))
+    book.on_diff(_diff(104, 105))
+    assert not book.apply_snapshot(SNAPSHOT)
+
+
+def test_imbalance_and_walls():
+    book = orderbook.LocalOrderBook('BTCUSDT')
+    book.apply_snapshot(SNAPSHOT)
+    assert book.imbalance(levels=2) == (3.0 - 2.0) / 5.0
+    walls = book.walls(min_notional=250, levels=3)
+    assert [(w['side'], w['price']) for w in walls] == [('bid', 98.0)]
+    summary = book.summary(levels=1)
+    assert summary['best_bid'] == 100.0 and summary['asks'] == [(101.0, 1.5)]
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import profiler  # noqa: E402
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_only_selected_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name='spinner', daemon=True)
+    worker.start()
+    try:
+        stacks, samples = profiler.sample(0.1, interval=0.005, threads={'spinner'})
+    finally:
+        stop.set()
+        worker.join()
+    assert samples > 5
+    assert stacks and all(stack.startswith('spinner;') for stack in stacks)
+    assert any('_spin (test_profiler.py:' in stack for stack in stacks)
+
+
+def test_only_one_profile_at_a_time():
+    results = []
+    runner = threading.Thread(target=lambda: results.append(profiler.sample(0.3, interval=0.01)))
+    runner.start()
+    time.sleep(0.05)
+    with pytest.raises(profiler.Busy):
+        profiler.sample(0.01)
+    runner.join()
+    assert results
+
+
+def test_format_collapsed_and_top_functions():
+    stacks = Counter({'main;a;b': 5, 'main;a;c': 3, 'io;c': 4})
+    assert profiler.format_collapsed(stacks) == 'main;a;b 5\nio;c 4\nmain;a;c 3\n'
+    assert profiler.top_functions(stacks) == [('c', 7), ('b', 5)]
+    assert profiler.top_functions(stacks, n=1) == [('c', 7)]
+
+
+class BlockingWatchdog(profiler.LoopWatchdog):
+    """درست بعد از سومین heartbeat حلقه را block_for ثانیه بلاک می‌کند"""
+
+    block_for = 0.3
+
+    def __init__(self, loop, threshold_ms):
+        super().__init__(loop, threshold_ms=threshold_ms, cooldown=0)
+        self.beats = 0
+
+    def _beat(self):
+        super()._beat()
+        self.beats += 1
+        if self.beats == 3:
+            time.sleep(self.block_for)
+
+
+def test_watchdog_reports_delay_past_scheduled_beat():
+    async def main():
+        watchdog = BlockingWatchdog(asyncio.get_running_loop(), threshold_ms=100).start()
+        await asyncio.sleep(0.6)
+        watchdog.stop()
+        return watchdog
+    watchdog = asyncio.run(main())
+    assert watchdog.stalls == 1
+    # بلاک 300ms از لحظه heartbeat؛ heartbeat بعدی 50ms بعد موعد داشت -> حداکثر 250ms تأخیر
+    assert 0.1 <= watchdog.max_stall <= 0.255
+    assert watchdog.stats()['stalls'] == 1
@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import ratelimit  # noqa: E402
+
+
+def test_parse_limit():
+    assert ratelimit.parse_limit('5/1') == (5.0, 5.0)
+    assert ratelimit.parse_limit('2/60') == (2 / 60, 2.0)
+    assert ratelimit.parse_limit('10') == (10.0, 10.0)
+    assert ratelimit.parse_limit('') is None and ratelimit.parse_limit('off') is None
+
+
+def test_client_ip_trusts_only_proxy_hops():
+    assert ratelimit.client_ip('1.1.1.1', '6.6.6.6, 2.2.2.2', hops=0) == '1.1.1.1'
+    assert ratelimit.client_ip('1.1.1.1', '6.6.6.6, 2.2.2.2', hops=1) == '2.2.2.2'
+    assert ratelimit.client_ip('1.1.1.1', '6.6.6.6, 2.2.2.2', hops=2) == '6.6.6.6'
+    assert ratelimit.client_ip('1.1.1.1', '2.2.2.2', hops=3) == '2.2.2.2'
+    assert ratelimit.client_ip(None, None, hops=1) == '-'
+
+
+def test_token_bucket_burst_refill_and_retry_after():
+    limiter = ratelimit.RateLimiter({'/status': (2.0, 3)})
+    assert [limiter.check('ip', '/status', now=0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.check('ip', '/status', now=0) == pytest.approx(0.5)
+    assert limiter.check('other', '/status', now=0) == 0          # هر IP bucket خودش را دارد
+    assert limiter.check('ip', '/status', now=0.5) == 0
+    assert limiter.check('ip', '/unlimited', now=0) == 0          # default=None
+    assert limiter.stats()['rejected'] == 1
+
+
+def test_ttl_cache_hits_and_expiry():
+    cache = ratelimit.TTLCache(0.05)
+    calls = []
+    assert cache.get_or_compute('k', lambda: calls.append(1) or len(calls)) == 1
+    assert cache.get_or_compute('k', lambda: calls.append(1) or len(calls)) == 1
+    time.sleep(0.06)
+    assert cache.get_or_compute('k', lambda: calls.append(1) or len(calls)) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_ttl_cache_coalesces_concurrent_callers():
+    cache = ratelimit.TTLCache(60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'v'
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+    first.start()
+    started.wait(5)
+    others = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow))) for _ in range(4)]
+    for t in others:
+        t.start()
+    time.sleep(0.05)
+    # حلقه asyncio منتظر نمی‌ماند و خودش محاسبه می‌کند
+    assert cache.get_or_compute('k', lambda: 'direct', wait=False) == 'direct'
+    release.set()
+    for t in [first, *others]:
+        t.join(5)
+    assert results == ['v'] * 5 and len(calls) == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_ttl_cache_does_not_cache_errors():
+    cache = ratelimit.TTLCache(60)
+
+    def boom():
+        raise RuntimeError('x')
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', boom)
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+    assert not cache.inflight
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import main  # noqa: E402
+from ticks import Tick  # noqa: E402
+
+
+@pytest.fixture
+def reports(monkeypatch):
+    sent = []
+    monkeypatch.setattr(main, 'SYMBOLS', ['BTCUSDT', 'ETHUSDT'])
+    for name, value in (('report_dirty', set()), ('last_report_data', {}), ('current_data', {}),
+                        ('market_state', {}), ('last_report_time', 0), ('last_hourly_report_time', 1e12),
+                        ('REPORT_INTERVAL', 900), ('MIN_CHANGE_PERCENT', 0.5), ('MIN_CHANGE_VOLUME', 0.05)):
+        monkeypatch.setattr(main, name, value)
+    monkeypatch.setattr(main, 'publish_shared', lambda *args: None)
+    monkeypatch.setattr(main, 'send_to_telegram', lambda text: sent.append(text) or True)
+    return sent
+
+
+def _tick(symbol, change, volume, ts):
+    main.update_market_state(Tick(symbol, 100.0, volume, change, ts))
+    main.report_consumer(Tick(symbol, 100.0, volume, change, ts))
+
+
+def test_report_lists_only_dirty_symbols(reports):
+    _tick('BTCUSDT', 1.0, 1000.0, 1000.0)
+    assert reports == []                        # هنوز همه نمادها داده ندارند
+    _tick('ETHUSDT', 2.0, 500.0, 1001.0)
+    assert len(reports) == 1 and '2/2 changed' in reports[0]
+    assert main.report_dirty == set()
+
+    _tick('BTCUSDT', 1.2, 1010.0, 1500.0)       # زیر آستانه درصد و حجم
+    _tick('ETHUSDT', 2.6, 500.0, 1600.0)        # تغییر 0.6 درصد
+    assert main.report_dirty == {'ETHUSDT'}
+    assert len(reports) == 1                    # قبل از REPORT_INTERVAL
+    _tick('BTCUSDT', 1.2, 1100.0, 2000.0)       # حجم +8.9%
+    assert len(reports) == 2 and '2/2 changed' in reports[1]
+    assert main.last_report_data['ETHUSDT']['price_change_percent'] == 2.6
+
+
+def test_failed_send_keeps_symbols_dirty(reports, monkeypatch):
+    monkeypatch.setattr(main, 'send_to_telegram', lambda text: False)
+    _tick('BTCUSDT', 1.0, 1000.0, 1000.0)
+    _tick('ETHUSDT', 2.0, 500.0, 1001.0)
+    assert main.report_dirty == {'BTCUSDT', 'ETHUSDT'}
+    assert main.last_report_time == 0 and main.last_report_data == {}
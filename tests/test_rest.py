@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import rest  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'fixtures', 'ticker_24hr.json')
+
+
+def _fake_get_json(calls):
+    with open(FIXTURE, encoding='utf-8') as f:
+        everything = json.load(f)
+
+    def get_json(path, params=None, base=None, timeout=None):
+        calls.append(params)
+        if params and 'symbols' in params:
+            wanted = set(json.loads(params['symbols']))
+            return [t for t in everything if t['symbol'] in wanted]
+        return everything
+    return get_json, {t['symbol'] for t in everything}
+
+
+def test_batch_mode_uses_one_request_per_batch(monkeypatch):
+    calls = []
+    get_json, known = _fake_get_json(calls)
+    monkeypatch.setattr(rest, 'get_json', get_json)
+    monkeypatch.setattr(rest, 'TICKER_BATCH_SIZE', 2)
+    symbols = sorted(known)[:3] + ['NOPEUSDT']
+    tickers = rest.fetch_tickers(symbols, mode='batch')
+    assert set(tickers) == set(symbols[:3])
+    assert len(calls) == 2
+    assert json.loads(calls[0]['symbols']) == sorted(symbols)[:2]
+
+
+def test_all_and_auto_modes(monkeypatch):
+    calls = []
+    get_json, known = _fake_get_json(calls)
+    monkeypatch.setattr(rest, 'get_json', get_json)
+    one = sorted(known)[:1]
+    assert set(rest.fetch_tickers(one, mode='all')) == set(one)
+    assert calls == [None]                          # یک درخواست بدون symbol، فیلتر محلی
+    monkeypatch.setattr(rest, 'TICKER_BATCH_SIZE', 1)
+    calls.clear()
+    rest.fetch_tickers(sorted(known)[:2], mode='auto')
+    assert calls == [None]                          # بیش از سقف دسته: حالت all
+    calls.clear()
+    rest.fetch_tickers(one, mode='auto')
+    assert 'symbols' in calls[0]
+    assert rest.fetch_tickers([], mode='all') == {}
+
+
+def test_session_is_shared():
+    assert rest.get_session() is rest.get_session()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import main  # noqa: E402
+from bus import TickBus  # noqa: E402
+
+
+def test_websocket_stale(monkeypatch):
+    monkeypatch.setattr(main.stream_manager, 'connections', [])
+    monkeypatch.setattr(main, 'last_ws_tick', 1000.0)
+    assert main.websocket_stale(1001.0)                 # هیچ اتصالی باز نیست
+
+    class Live:
+        ws = object()
+    monkeypatch.setattr(main.stream_manager, 'connections', [Live()])
+    assert not main.websocket_stale(1000.0 + main.FALLBACK_STALE_AFTER)
+    assert main.websocket_stale(1000.1 + main.FALLBACK_STALE_AFTER)     # وصل ولی بی‌داده
+
+
+def test_publish_rest_tickers_feeds_tick_bus(monkeypatch):
+    bus = TickBus()
+    ticks = []
+    bus.add_handler(ticks.append)
+    monkeypatch.setattr(main, 'tick_bus', bus)
+    monkeypatch.setattr(main, 'SYMBOLS', ['BTCUSDT'])
+    main.publish_rest_tickers({
+        'BTCUSDT': {'lastPrice': '67000.5', 'volume': '12.5', 'priceChangePercent': '-1.25'},
+        'DOGEUSDT': {'lastPrice': '0.1', 'volume': '1', 'priceChangePercent': '0'},    # نماد تحت نظر نیست
+    }, 1760000000.0)
+    assert [(t.symbol, t.price, t.volume, t.price_change_percent, t.ts) for t in ticks] == [
+        ('BTCUSDT', 67000.5, 12.5, -1.25, 1760000000.0)]
@@ -0,0 +1,75 @@
+import os
+import sys
+from multiprocessing import resource_tracker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import shared_state  # noqa: E402
+
+
+def _pair(capacity=4):
+    name = f'wp_test_{os.getpid()}'
+    writer = shared_state.SharedMarketWriter(name, capacity)
+    reader = shared_state.SharedMarketReader(name)
+    # خواننده در همین پروسه ثبت نویسنده را از resource_tracker برداشته است؛ unlink نویسنده KeyError می‌داد
+    resource_tracker.register(writer.shm._name, 'shared_memory')
+    return writer, reader
+
+
+def test_publish_and_read_all():
+    writer, reader = _pair()
+    try:
+        assert writer.publish(0, 'BTCUSDT', 67000.0, 12.5, 1.2, 1760000000.0)
+        assert writer.publish(3, 'ETHUSDT', 2600.0, 3.0, -0.5, 1760000001.0)
+        state = reader.read_all()
+        assert set(state) == {'BTCUSDT', 'ETHUSDT'}
+        assert state['BTCUSDT']['price'] == 67000.0
+        assert state['ETHUSDT']['price_change_percent'] == -0.5
+        writer.set_status(42, 1760000002.0, True)
+        status = reader.status()
+        assert status['messages_processed'] == 42 and status['websocket_connected']
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_odd_sequence_is_never_returned():
+    writer, reader = _pair()
+    try:
+        writer.publish(1, 'SOLUSDT', 150.0, 1.0, 0.0, 1760000000.0)
+        off = shared_state.HEADER_SIZE + shared_state.SLOT_SIZE
+        seq = shared_state.SEQ.unpack_from(writer.buf, off)[0]
+        shared_state.SEQ.pack_into(writer.buf, off, seq + 1)     # نویسنده وسط نوشتن
+        assert reader.read_slot(1, retries=5) == (None, None)
+        assert 'SOLUSDT' not in reader.read_all()
+        shared_state.SEQ.pack_into(writer.buf, off, seq + 2)
+        assert reader.read_all()['SOLUSDT']['price'] == 150.0
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_clear_removes_symbol_and_bumps_generation():
+    writer, reader = _pair()
+    try:
+        writer.publish(2, 'XRPUSDT', 0.5, 1.0, 0.0, 1760000000.0)
+        generation = reader.status()['generation']
+        writer.clear(2)
+        assert 'XRPUSDT' not in reader.read_all()
+        assert reader.status()['generation'] == generation + 1
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_publish_beyond_capacity_fails_loudly(caplog):
+    writer, reader = _pair(capacity=2)
+    try:
+        with caplog.at_level('ERROR', logger='whale_ws'):
+            assert not writer.publish(2, 'DOGEUSDT', 0.1, 1.0, 0.0, 1760000000.0)
+            assert not writer.publish(2, 'DOGEUSDT', 0.1, 1.0, 0.0, 1760000001.0)
+        assert len([r for r in caplog.records if 'SHARED_STATE_CAPACITY' in r.getMessage()]) == 1
+        assert reader.read_all() == {}
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import snapshot  # noqa: E402
+
+STATE = {'market_data': {'BTCUSDT': {'price': 67000.5, 'volume': 12.0, 'history': [1.0, 2.0]}},
+         'alerts': {'BTCUSDT': 1760000000.0}, 'messages_processed': 42, 'last': None}
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / 'state.bin')
+    assert snapshot.save_snapshot(STATE, path) == os.path.getsize(path)
+    assert not os.path.exists(path + '.tmp')
+    saved_at, state = snapshot.load_snapshot(path)
+    assert state == STATE
+    assert abs(saved_at - time.time()) < 5
+
+
+def test_marshal_codec_without_msgpack(monkeypatch):
+    monkeypatch.setattr(snapshot, '_codec', lambda: (snapshot.CODEC_MARSHAL, None))
+    blob = snapshot.encode_snapshot(STATE, saved_at=123.0)
+    assert blob[5] == snapshot.CODEC_MARSHAL
+    assert snapshot.decode_snapshot(blob) == (123.0, STATE)
+
+
+def test_old_missing_and_corrupt_snapshots_are_ignored(tmp_path):
+    path = str(tmp_path / 'state.bin')
+    assert snapshot.load_snapshot(path) is None
+    with open(path, 'wb') as f:
+        f.write(snapshot.encode_snapshot(STATE, saved_at=time.time() - 3600))
+    assert snapshot.load_snapshot(path, max_age=60) is None
+    assert snapshot.load_snapshot(path, max_age=0)[1] == STATE      # 0 = بدون محدودیت سن
+    with open(path, 'wb') as f:
+        f.write(b'WPS1garbage')
+    assert snapshot.load_snapshot(path) is None
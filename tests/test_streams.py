@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import streams  # noqa: E402
+from exchanges import make_adapter  # noqa: E402
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+
+def test_set_symbols_splits_connections_at_max_streams():
+    manager = streams.StreamManager(make_adapter('binance', 'ws://x/'), kinds=('ticker',), max_streams=2)
+    manager.set_symbols(['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+    assert [len(c.streams) for c in manager.connections] == [2, 1]
+    assert manager.all_streams() == {'btcusdt@ticker', 'ethusdt@ticker', 'solusdt@ticker'}
+    assert manager.url_for(manager.connections[0]) == 'ws://x/btcusdt@ticker/ethusdt@ticker'
+
+    # نماد جدید جای خالی اتصال موجود را پر می‌کند، نه اتصال تازه
+    manager.set_symbols(['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT'])
+    assert [len(c.streams) for c in manager.connections] == [2, 2]
+
+
+def test_empty_connection_is_retired():
+    manager = streams.StreamManager(make_adapter('binance', 'ws://x/'), max_streams=2)
+    manager.set_symbols(['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+    last = manager.connections[1]
+    manager.set_symbols(['BTCUSDT', 'ETHUSDT'])
+    assert last.closed and last not in manager.connections
+    assert manager.snapshot() == [{'index': 0, 'streams': ['btcusdt@ticker', 'ethusdt@ticker'],
+                                   'connected': False}]
+
+
+def test_sync_sends_only_the_difference(monkeypatch):
+    monkeypatch.setattr(streams, 'MAX_CONTROL_MESSAGES_PER_SEC', 1e9)
+    manager = streams.StreamManager(make_adapter('binance', 'ws://x/'))
+    manager.set_symbols(['BTCUSDT', 'ETHUSDT'])
+    conn = manager.connections[0]
+    ws = FakeWS()
+    asyncio.run(manager.attach(conn, ws, manager.initial_streams(conn)))
+    assert ws.sent == []                # بایننس: استریم‌ها در خود آدرس
+
+    conn.streams = {'btcusdt@ticker', 'solusdt@ticker'}
+    asyncio.run(manager.sync(conn))
+    assert [(m['method'], m['params']) for m in ws.sent] == [('UNSUBSCRIBE', ['ethusdt@ticker']),
+                                                            ('SUBSCRIBE', ['solusdt@ticker'])]
+    assert conn.live_streams == conn.streams
+
+
+def test_bybit_subscribes_after_connect_in_batches(monkeypatch):
+    monkeypatch.setattr(streams, 'MAX_CONTROL_MESSAGES_PER_SEC', 1e9)
+    manager = streams.StreamManager(make_adapter('bybit', 'ws://y'))
+    symbols = [f'S{i:02d}USDT' for i in range(25)]
+    manager.set_symbols(symbols)
+    conn = manager.connections[0]
+    assert manager.url_for(conn) == 'ws://y'
+    assert manager.initial_streams(conn) == set()
+    ws = FakeWS()
+    asyncio.run(manager.attach(conn, ws, manager.initial_streams(conn)))
+    assert [m['op'] for m in ws.sent] == ['subscribe'] * 3
+    assert [len(m['args']) for m in ws.sent] == [10, 10, 5]
+    assert {a for m in ws.sent for a in m['args']} == {f'tickers.{s}' for s in symbols}
+
+
+def test_detach_ignores_superseded_socket():
+    manager = streams.StreamManager(make_adapter('binance', 'ws://x/'))
+    manager.set_symbols(['BTCUSDT'])
+    conn = manager.connections[0]
+    old, new = FakeWS(), FakeWS()
+    conn.ws = new
+    manager.detach(conn, old)
+    assert conn.ws is new
+    manager.detach(conn, new)
+    assert conn.ws is None
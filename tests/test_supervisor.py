@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import supervisor  # noqa: E402
+
+
+class Conn:
+    index = 0
+
+    def __init__(self):
+        self.closed = False
+        self.ws = None
+        self.live_streams = set()
+        self.send_lock = None
+
+
+class FakeWS:
+    count = 0
+
+    def __init__(self):
+        FakeWS.count += 1
+        self.id = FakeWS.count
+        self.closed = False
+        self.queue = asyncio.Queue()
+
+    async def close(self):
+        self.closed = True
+        await self.queue.put(None)
+
+
+class Exchange:
+    """connect جعلی: هر سوکت هر 10ms یک پیام می‌دهد؛ fail(n) رفتار تلاش n ام را تعیین می‌کند"""
+
+    def __init__(self, fail=lambda n: None):
+        self.fail = fail
+        self.calls = 0
+        self.sockets = []
+        self.received = []
+
+    async def connect(self, conn, sup):
+        self.calls += 1
+        mode = self.fail(self.calls)
+        if mode == 'refuse':
+            raise OSError('connection refused')
+        ws = FakeWS()
+        self.sockets.append(ws)
+        conn.ws, conn.live_streams, conn.send_lock = ws, {f'streams-{ws.id}'}, object()   # مثل manager.attach
+        sup.connected(ws)
+        if mode == 'silent':
+            ws.closed = True        # وصل شد ولی قبل از اولین پیام افتاد
+            conn.ws = None
+            return
+        feeder = asyncio.ensure_future(self._feed(ws))
+        try:
+            while True:
+                message = await ws.queue.get()
+                if message is None or not sup.on_message(ws):
+                    break
+                self.received.append(message)
+        finally:
+            feeder.cancel()
+            ws.closed = True
+            if conn.ws is ws:       # مثل manager.detach(conn, ws)
+                conn.ws = None
+
+    async def _feed(self, ws):
+        i = 0
+        while not ws.closed:
+            await asyncio.sleep(0.01)
+            i += 1
+            await ws.queue.put((ws.id, i))
+
+
+def _run(exchange, seconds, **kwargs):
+    conn = Conn()
+    sup = supervisor.ConnectionSupervisor(conn, exchange.connect, stale_after=100, **kwargs)
+    sup.backoff = supervisor.DecorrelatedJitter(0.05, 0.1)
+
+    async def main():
+        task = asyncio.ensure_future(sup.run())
+        await asyncio.sleep(seconds)
+        conn.closed = True
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(main())
+    return conn, sup
+
+
+def test_rotation_hands_over_without_gap(monkeypatch):
+    monkeypatch.setattr(supervisor, 'WATCH_INTERVAL', 0.02)
+    exchange = Exchange()
+    conn, sup = _run(exchange, 0.35, rotate_after=0.1)
+    assert sup.rotations >= 2
+    assert all(ws.closed for ws in exchange.sockets[:-1])
+    assert sup.missed_windows == 0
+    ids = [ws_id for ws_id, _ in exchange.received]
+    assert ids == sorted(ids)           # هر سوکت فقط تا تحویل به بعدی داده می‌دهد
+
+
+def test_failed_replacement_keeps_old_socket_and_retries(monkeypatch):
+    monkeypatch.setattr(supervisor, 'WATCH_INTERVAL', 0.02)
+    exchange = Exchange(fail=lambda n: {2: 'refuse', 3: 'silent'}.get(n))
+    conn, sup = _run(exchange, 0.6, rotate_after=0.1)
+    first, silent, third = exchange.sockets[:3]
+    assert exchange.calls >= 4
+    assert silent.closed
+    assert first.closed                 # فقط بعد از تحویل به سوکت سوم
+    assert max(i for ws_id, i in exchange.received if ws_id == first.id) > 15   # تا تحویل داده داد
+    assert any(ws_id == third.id for ws_id, _ in exchange.received)
+    assert sup.missed_windows == 0 and sup.attempts == 0
+
+
+def test_restores_conn_after_attached_replacement_fails(monkeypatch):
+    monkeypatch.setattr(supervisor, 'WATCH_INTERVAL', 0.02)
+    exchange = Exchange(fail=lambda n: 'silent' if n > 1 else None)
+    seen = []
+
+    async def probe(conn, sup):
+        # بعد از هر شکست جایگزین، conn دوباره به سوکت قدیمی و استریم‌های زنده‌اش اشاره می‌کند
+        while not conn.closed:
+            await asyncio.sleep(0.005)
+            rotating = sup._retiring is not None
+            if not conn.closed and sup.state == supervisor.CONNECTED and exchange.calls > 1 and not rotating:
+                seen.append((conn.ws, set(conn.live_streams)))
+    conn = Conn()
+    sup = supervisor.ConnectionSupervisor(conn, exchange.connect, stale_after=100, rotate_after=0.1)
+    sup.backoff = supervisor.DecorrelatedJitter(0.05, 0.1)
+
+    async def main():
+        task = asyncio.ensure_future(sup.run())
+        watcher = asyncio.ensure_future(probe(conn, sup))
+        await asyncio.sleep(0.4)
+        conn.closed = True
+        task.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
+    asyncio.run(main())
+    first = exchange.sockets[0]
+    assert exchange.calls >= 3
+    assert seen and all(ws is first and streams == {f'streams-{first.id}'} for ws, streams in seen)
+    assert sup.missed_windows == 0 and sup.attempts == 0
+
+
+def test_hard_limit_closes_old_socket(monkeypatch):
+    monkeypatch.setattr(supervisor, 'WATCH_INTERVAL', 0.02)
+    exchange = Exchange(fail=lambda n: 'refuse' if n > 1 else None)
+    conn, sup = _run(exchange, 0.5, rotate_after=0.1, hard_limit=0.25)
+    first = exchange.sockets[0]
+    assert first.closed
+    assert sup.attempts >= 1            # بعد از سقف: اتصال دوباره عادی با backoff
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import symbols  # noqa: E402
+
+PAYLOAD = {'symbols': [
+    {'symbol': 'BTCUSDT', 'baseAsset': 'BTC', 'quoteAsset': 'USDT', 'status': 'TRADING', 'filters': [
+        {'filterType': 'PRICE_FILTER', 'tickSize': '0.01000000'},
+        {'filterType': 'LOT_SIZE', 'stepSize': '0.00001000'}]},
+    {'symbol': 'XRPUSDT', 'baseAsset': 'XRP', 'quoteAsset': 'USDT', 'status': 'TRADING', 'filters': [
+        {'filterType': 'PRICE_FILTER', 'tickSize': '0.00010000'},
+        {'filterType': 'LOT_SIZE', 'stepSize': '1.00000000'}]},
+]}
+
+
+def test_decimals_from_step():
+    assert symbols.decimals_from_step('0.01000000') == 2
+    assert symbols.decimals_from_step('0.00010000') == 4
+    assert symbols.decimals_from_step('1.00000000') == 0
+    assert symbols.decimals_from_step('0') == 0
+
+
+def test_registry_from_exchange_info():
+    registry = symbols.SymbolRegistry.from_exchange_info(PAYLOAD, ['XRPUSDT', 'NEWUSDT'])
+    assert 'BTCUSDT' not in registry                    # فقط نمادهای خواسته‌شده
+    xrp = registry.get('XRPUSDT')
+    assert (xrp.price_decimals, xrp.qty_decimals, xrp.base) == (4, 0, 'XRP')
+    new = registry.get('NEWUSDT')
+    assert new.status == 'UNKNOWN'
+    assert sorted(m.id for m in registry) == [0, 1]
+    assert registry.by_id(new.id) is new
+    assert registry.ensure('NEWUSDT') is new
+
+
+def test_load_exchange_info_prefers_fresh_cache(tmp_path, monkeypatch):
+    cache = str(tmp_path / 'cache.json')
+    calls = []
+    monkeypatch.setattr(symbols, '_fetch_exchange_info', lambda syms: calls.append(syms) or PAYLOAD)
+    assert symbols.load_exchange_info(['BTCUSDT'], cache_file=cache, ttl=60, fixture='') == PAYLOAD
+    assert symbols.load_exchange_info(['BTCUSDT'], cache_file=cache, ttl=60, fixture='') == PAYLOAD
+    assert len(calls) == 1
+    # نماد تازه‌ای که در کش نیست -> دوباره از شبکه
+    symbols.load_exchange_info(['DOGEUSDT'], cache_file=cache, ttl=60, fixture='')
+    assert len(calls) == 2
+
+
+def test_load_exchange_info_falls_back_to_stale_cache(tmp_path, monkeypatch):
+    cache = str(tmp_path / 'cache.json')
+    with open(cache, 'w', encoding='utf-8') as f:
+        json.dump({'fetched_at': time.time() - 10 ** 6, 'payload': PAYLOAD}, f)
+
+    def fail(syms):
+        raise OSError('offline')
+    monkeypatch.setattr(symbols, '_fetch_exchange_info', fail)
+    assert symbols.load_exchange_info(['BTCUSDT'], cache_file=cache, ttl=60, fixture='') == PAYLOAD
+    assert symbols.load_exchange_info(['BTCUSDT'], cache_file=str(tmp_path / 'none.json'), ttl=60,
+                                      fixture='') is None
+
+
+def test_removed_ids_are_recycled():
+    registry = symbols.SymbolRegistry.from_exchange_info(PAYLOAD, ['BTCUSDT', 'XRPUSDT'])
+    btc = registry.get('BTCUSDT')
+    for i in range(1000):       # چرخش مداوم نمادها نباید idها را بی‌نهایت بالا ببرد
+        meta = registry.ensure(f'TMP{i}USDT')
+        assert registry.remove(f'TMP{i}USDT') is meta
+    assert registry.id_span == 3
+    assert len(registry) == 2 and 'TMP5USDT' not in registry
+    assert registry.remove('NOPEUSDT') is None
+
+    registry.remove('BTCUSDT')
+    assert [m.symbol for m in registry] == ['XRPUSDT']
+    new = registry.ensure('NEWUSDT')
+    assert new.id == btc.id and registry.by_id(btc.id) is new
+    again = registry.ensure('BTCUSDT')          # دقت exchangeInfo بعد از افزودن دوباره حفظ می‌شود
+    assert again.id == 2 and again.price_decimals == 2 and again.status == 'TRADING'
+    assert registry.id_span == 3
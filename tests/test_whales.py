@@ -0,0 +1,75 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import whales  # noqa: E402
+
+
+def _exact(sorted_values, q):
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def test_tdigest_quantiles_close_to_exact():
+    rng = random.Random(34)
+    values = [rng.lognormvariate(8, 1.5) for _ in range(50000)]
+    digest = whales.TDigest(200)
+    for v in values:
+        digest.add(v)
+    values.sort()
+    assert len(digest) == len(values)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        # خطا بر حسب رتبه: صدک تقریبی باید بین صدک‌های دقیق کمی پایین‌تر و بالاتر باشد
+        lo, hi = _exact(values, q - 0.002), _exact(values, min(q + 0.002, 0.99999))
+        assert lo <= digest.quantile(q) <= hi, q
+    assert len(digest.means) <= 200
+
+
+def test_tdigest_edges():
+    digest = whales.TDigest()
+    assert digest.quantile(0.5) is None
+    digest.add(5.0)
+    assert digest.quantile(0.999) == 5.0
+    for v in (1.0, 9.0):
+        digest.add(v)
+    assert 1.0 <= digest.quantile(0.0) <= digest.quantile(1.0) <= 9.0
+
+
+def test_windowed_digest_rotates_and_combines():
+    windowed = whales.WindowedDigest(window=10)
+    for i in range(100):
+        windowed.add(1.0, i * 0.05)
+    for i in range(100):
+        windowed.add(1000.0, 10 + i * 0.05)     # پنجره دوم
+    assert windowed.previous is not None and windowed.count() == 200
+    assert 1.0 < windowed.quantile(0.5) <= 1000.0
+    windowed.add(5.0, 21)                       # چرخش دوباره: پنجره اول کنار رفت
+    assert windowed.count() == 101
+    assert windowed.quantile(0.25) == 1000.0
+
+
+def test_whale_detector_absolute_then_percentile_threshold():
+    detector = whales.WhaleDetector(percentile=0.99, min_usd=500, absolute_usd=1e6, min_samples=100, window=3600)
+    assert detector.on_trade('BTCUSDT', 100.0, 5.0, 0.0) is None      # نمونه کم: فقط آستانه مطلق
+    event = detector.on_trade('BTCUSDT', 100000.0, 20.0, 0.1, buyer_is_maker=True)
+    assert event['side'] == 'SELL' and event['threshold'] is None
+    for i in range(1000):
+        detector.on_trade('BTCUSDT', 100.0, 1.0 + i % 10, 1.0 + i * 0.001)
+    threshold = detector.threshold('BTCUSDT', 10.0)
+    assert 900 <= threshold <= 1000             # ارزش معاملات 100 تا 1000 دلار
+    assert detector.threshold('BTCUSDT', 10.5) == threshold     # کش یک‌ثانیه‌ای
+    assert detector.on_trade('BTCUSDT', 100.0, 4.0, 12.0) is None
+    event = detector.on_trade('BTCUSDT', 100.0, 30.0, 12.1)
+    assert event['side'] == 'BUY' and event['notional'] == 3000.0
+    assert list(detector.recent)[-1] is event
+    detector.drop_symbol('BTCUSDT')
+    assert detector.threshold('BTCUSDT', 20.0) is None
+
+
+def test_whale_detector_threshold_floor():
+    detector = whales.WhaleDetector(percentile=0.99, min_usd=5000, min_samples=10)
+    for i in range(100):
+        detector.on_trade('ETHUSDT', 10.0, 1.0 + i % 10, i * 0.01)
+    assert detector.threshold('ETHUSDT', 5.0) == 5000
+    assert detector.on_trade('ETHUSDT', 10.0, 400.0, 5.1) is None